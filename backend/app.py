@@ -4,30 +4,55 @@ Wraps the existing Python CLI and provides REST API + SSE for progress updates.
 """
 
 import asyncio
-import json
+import io
 import os
 import random
+import secrets
+import signal
 import sys
+import time
 import zipfile
-from datetime import datetime
-
+from collections import OrderedDict
 from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 
-from backend.db import init_db, save_job, get_job, check_alphacode_exists
+from backend import warm_pool
+from backend.db import (
+    init_db, save_job, get_job, check_alphacode_exists,
+    fail_interrupted_jobs, list_jobs, job_stats, warm_pool_tokens,
+)
+from backend.responses import CodecJSONResponse, CompressionMiddleware
+from backend.storage import copy_job, ingest_job, list_job_files, materialize_job, read_job_file
+from t3_content_library.bundle import BUNDLE_FILENAME
+from t3_content_library.generator import LANGUAGES, PRICING, RESPONSE_MODES, SOURCE_LANGUAGE
+from t3_content_library.jsoncodec import dumps, loads
+from t3_content_library.loader import load_styles
+from t3_content_library.profiling import RunProfiler
+from t3_content_library.search import SearchIndex
+from t3_content_library.similarity import CompanyIndex
 
 
 @asynccontextmanager
 async def lifespan(app):
     await init_db()
+    # Jobs only run inside this process, whatever was running is gone
+    await fail_interrupted_jobs()
+    worker = asyncio.create_task(warm_pool.run_worker(WARM_POOL, _idle))
     yield
+    worker.cancel()
 
 
-app = FastAPI(title="T3 Content Library API", version="1.0.0", lifespan=lifespan)
+app = FastAPI(
+    title="T3 Content Library API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=CodecJSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -35,11 +60,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
+app.add_middleware(CompressionMiddleware)
 
-# In-memory job store
+# In-memory job store. A job's "events" are the SSE payloads of its CLI
+# output lines, encoded once when read and sent as is to every client.
 jobs: dict = {}
 
+# Running jobs by request key, so identical submissions attach to them
+inflight: dict = {}
+
+# Statuses of finished jobs read from the DB (jobs of earlier server runs),
+# least recently used first. Entries are reloaded after JOB_CACHE_TTL_SEC,
+# as `backend.manage gc` marks jobs expired from another process.
+JOB_CACHE_SIZE = int(os.environ.get("JOB_CACHE_SIZE", "1024"))
+JOB_CACHE_TTL_SEC = 60
+job_cache: OrderedDict = OrderedDict()
+
+# Serializes the regenerations of a job, one lock per job ever regenerated
+regenerate_locks: dict = {}
+
+# Longest a status request may wait for a change (?wait=)
+LONG_POLL_MAX_SEC = 60
+
+# Element regenerations in progress, they keep the warm pool from starting
+regenerations = [0]
+
 # Alphacode alphabet: no O/0, I/1/L to avoid confusion
 ALPHACODE_CHARS = "ABCDEFGHJKMNPQRSTUVWXYZ23456789"
 
@@ -55,19 +102,58 @@ async def generate_alphacode() -> str:
 # Path to the t3-content-library repo root (backend/ is inside the repo)
 T3_LIB_PATH = os.environ.get("T3_LIB_PATH", os.path.join(os.path.dirname(__file__), ".."))
 OUTPUT_BASE = os.environ.get("OUTPUT_BASE", "/tmp/t3-outputs")
+PAGE_CACHE_DIR = os.environ.get("PAGE_CACHE_DIR", os.path.join(OUTPUT_BASE, "page-cache"))
+SEARCH_INDEX_DB = os.environ.get("SEARCH_INDEX_DB", os.path.join(OUTPUT_BASE, "search.db"))
+# Jaccard similarity above which company-agnostic pages of an earlier,
+# near-identical company are reused; the CLI keeps its company index in the cache dir
+REUSE_THRESHOLD = float(os.environ.get("REUSE_SIMILARITY_THRESHOLD", "0.7"))
+COMPANY_INDEX_DB = os.path.join(PAGE_CACHE_DIR, "companies.db")
+# Seconds a cancelled CLI run gets to exit after SIGTERM before it is killed
+CANCEL_GRACE_SEC = float(os.environ.get("CANCEL_GRACE_SEC", "10"))
+# Enables /api/debug/*, requests must send it as X-Debug-Token
+DEBUG_TOKEN = os.environ.get("DEBUG_TOKEN", "")
+# Backend profiles, one directory per profiling session
+BACKEND_PROFILE_DIR = os.path.join(OUTPUT_BASE, "profiles")
+
+# The backend's own profiler while profiling is switched on
+profiler: list = []
+
+# Opened on first use, the CLI subprocesses write to the same file
+search_index: list = []
+
+
+def _search_index() -> SearchIndex:
+    if not search_index:
+        search_index.append(SearchIndex(SEARCH_INDEX_DB))
+    return search_index[0]
 
 
 PAGE_SET_COUNTS = {"small": 8, "medium": 15, "full": 20}
 
+STYLES = load_styles(os.path.join(T3_LIB_PATH, "config", "styles"))
+
+# Industry archetypes pre-generated while idle, see backend/warm_pool.py
+WARM_POOL = warm_pool.load_config()
+
 
 class GenerateRequest(BaseModel):
     company: str
     page_set: str = "full"
+    response_mode: str = "markers"
+    reuse_similar: bool = True
+    languages: list[str] = [SOURCE_LANGUAGE]
+    # Style keys from /api/styles; all variants of a page come from one API call
+    variants: list[str] = []
+    # Serve from a pre-generated industry library if one matches (opt-in)
+    use_warm_pool: bool = False
+    # Generate every page anew instead of taking it from the page cache; the
+    # new pages replace the cached ones. Implies no reuse and no warm pool.
+    fresh: bool = False
 
 
 class JobStatus(BaseModel):
     job_id: str
-    status: str  # pending, running, completed, failed
+    status: str  # pending, running, completed, failed, cancelled
     progress: int  # 0-100
     current_page: str | None = None
     pages_done: int = 0
@@ -79,17 +165,147 @@ class JobStatus(BaseModel):
     output_tokens: int = 0
     cost_usd: float = 0.0
     duration_sec: float = 0.0
+    reused_pages: int = 0
+    saved_input_tokens: int = 0
+    saved_output_tokens: int = 0
+    saved_cost_usd: float = 0.0
+    languages: list[str] = [SOURCE_LANGUAGE]
+    variants: list[str] = []
+    response_mode: str = "markers"
+    coalesced_with: str | None = None
+    # Incremented on every change; pass it as ?since= to wait for the next one
+    version: int = 0
+
+
+class Style(BaseModel):
+    key: str
+    name: str
+    description: str
+    address: str
+
+
+class JobListItem(JobStatus):
+    company: str
+    page_set: str
+
+
+class JobList(BaseModel):
+    jobs: list[JobListItem]
+    next_cursor: str | None = None
+
+
+class DailyStats(BaseModel):
+    day: str
+    page_set: str
+    jobs: int
+    completed: int
+    failed: int
+    input_tokens: int
+    output_tokens: int
+    cost_usd: float
+    avg_duration_sec: float
+
+
+class StatsTotals(BaseModel):
+    jobs: int = 0
+    completed: int = 0
+    failed: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    avg_duration_sec: float = 0.0
+
+
+class JobStats(BaseModel):
+    days: list[DailyStats]
+    totals: StatsTotals
+
+
+def _request_key(
+    company: str,
+    page_set: str,
+    response_mode: str,
+    reuse_similar: bool = True,
+    languages: tuple = (SOURCE_LANGUAGE,),
+    variants: tuple = (),
+    library: str | None = None,
+    fresh: bool = False,
+) -> tuple:
+    """Identify generation requests that would produce identical API calls."""
+    model = os.environ.get("ANTHROPIC_MODEL", "claude-sonnet-4-5-20250929")
+    return (
+        " ".join(company.split()).casefold(), page_set, model, response_mode, reuse_similar, languages, variants,
+        library, fresh,
+    )
+
+
+def _idle() -> bool:
+    """Whether no job or regeneration is using the API right now."""
+    if regenerations[0]:
+        return False
+    return not any(job["run_status"].status in ("pending", "running") for job in jobs.values())
+
+
+def _languages(requested: list[str]) -> list[str]:
+    """Known languages of a request, source language first."""
+    languages = [SOURCE_LANGUAGE]
+    for language in requested:
+        language = language.strip().lower()
+        if language in LANGUAGES and language not in languages:
+            languages.append(language)
+    return languages
+
+
+def _variants(requested: list[str]) -> list[str]:
+    """Known style keys of a request, in the order of /api/styles."""
+    requested = {key.strip().lower() for key in requested}
+    return [key for key in STYLES if key in requested]
+
+
+@app.get("/api/styles", response_model=list[Style])
+async def list_styles():
+    """Content styles that can be requested as variants."""
+    return [
+        Style(key=key, name=style["name"], description=style["description"], address=style["address"])
+        for key, style in STYLES.items()
+    ]
 
 
 @app.post("/api/generate", response_model=JobStatus)
 async def start_generation(req: GenerateRequest):
-    """Start a new content generation job."""
+    """Start a new content generation job.
+
+    If an identical request (same company, page set, model, response mode,
+    reuse setting, languages and variants) is still running, the new job
+    attaches to it instead of starting a second generation: it shares the
+    running job's event stream and receives a copy of its output on completion.
+    A single-language request that opts in with use_warm_pool and matches a
+    pre-generated industry library (see /api/warm-pool) is served by
+    personalizing that library.
+    """
     job_id = await generate_alphacode()
     output_dir = os.path.join(OUTPUT_BASE, job_id)
-    os.makedirs(output_dir, exist_ok=True)
 
     page_set = req.page_set if req.page_set in PAGE_SET_COUNTS else "full"
-    pages_total = PAGE_SET_COUNTS[page_set]
+    response_mode = req.response_mode if req.response_mode in RESPONSE_MODES else "markers"
+    languages = _languages(req.languages)
+    variants = _variants(req.variants)
+    if variants and (len(languages) > 1 or response_mode != "markers"):
+        raise HTTPException(
+            status_code=400, detail="Variants need a single language and the markers response mode"
+        )
+    # Every language and every variant counts as its own set of pages in the progress
+    pages_total = PAGE_SET_COUNTS[page_set] * len(languages) * max(len(variants), 1)
+    reuse_similar = req.reuse_similar and not req.fresh
+    library = None
+    if req.use_warm_pool and not req.fresh and len(languages) == 1 and not variants:
+        library = warm_pool.find_library(WARM_POOL, req.company, page_set)
+        if library:
+            # Released when its run ends; a follower never runs, see below
+            warm_pool.acquire_library(library)
+    key = _request_key(
+        req.company, page_set, response_mode, reuse_similar, tuple(languages), tuple(variants), library, req.fresh
+    )
 
     job = JobStatus(
         job_id=job_id,
@@ -98,24 +314,121 @@ async def start_generation(req: GenerateRequest):
         pages_total=pages_total,
         output_dir=output_dir,
         created_at=datetime.now().isoformat(),
+        languages=languages,
+        variants=variants,
+        response_mode=response_mode,
+        version=1,
     )
     jobs[job_id] = {
         "status": job,
+        # What the CLI run reports; replaced by a copy in "status" when a
+        # leader is cancelled while other jobs still need its run
+        "run_status": job,
         "company": req.company,
         "page_set": page_set,
+        "response_mode": response_mode,
+        "reuse_similar": reuse_similar,
+        "fresh": req.fresh,
+        "library": library,
         "events": [],
+        "followers": [],
+        # Set and replaced on every status change, wakes long-polling requests
+        "changed": asyncio.Event(),
     }
 
+    leader_id = inflight.get(key)
+    if leader_id in jobs and not jobs[leader_id].get("cancel_requested"):
+        leader = jobs[leader_id]
+        jobs[job_id]["events"] = leader["events"]
+        job.coalesced_with = leader_id
+        leader["followers"].append(job_id)
+        if library:
+            warm_pool.release_library(library)
+        _sync_followers(leader_id)
+        await save_job(job_id, req.company, page_set, job)
+        return job
+
+    inflight[key] = job_id
+    # Interactive jobs come first, pre-generation continues when idle again
+    warm_pool.yield_to_jobs()
+    os.makedirs(output_dir, exist_ok=True)
+    # Persist right away so the job shows up in the history while it runs
+    await save_job(job_id, req.company, page_set, job)
+
     # Start background task
-    asyncio.create_task(_run_generation(job_id, req.company, output_dir, page_set))
+    jobs[job_id]["task"] = asyncio.create_task(
+        _run_generation(job_id, req.company, output_dir, page_set, response_mode)
+    )
 
     return job
 
 
-async def _run_generation(job_id: str, company: str, output_dir: str, page_set: str = "full"):
+def _log_frame(line: str, evt: dict | None = None) -> str:
+    """SSE payload for one CLI output line; a JSON event line is embedded without re-encoding."""
+    if evt is not None:
+        return '{"type":"log","event":' + line + "}"
+    return dumps({"type": "log", "message": line})
+
+
+def _changed(job_id: str):
+    """Record a change of the job's status: bump its version, wake waiting requests."""
+    job_data = jobs[job_id]
+    job_data["status"].version += 1
+    job_data["changed"].set()
+    job_data["changed"] = asyncio.Event()
+
+
+PROGRESS_FIELDS = ("status", "progress", "current_page", "pages_done", "pages_total", "error", "duration_sec")
+
+
+def _sync_followers(job_id: str, follower_ids: list[str] | None = None):
+    """Mirror a running job's progress onto the jobs attached to it.
+
+    Token counts and cost stay at zero for followers, they made no API calls.
+    """
+    status = jobs[job_id]["run_status"]
+    for follower_id in jobs[job_id]["followers"] if follower_ids is None else follower_ids:
+        follower = jobs[follower_id]["status"]
+        for field in PROGRESS_FIELDS:
+            setattr(follower, field, getattr(status, field))
+        _changed(follower_id)
+
+
+async def _finish_followers(job_id: str):
+    """Share the finished job's output with its followers and persist them.
+
+    The final status is mirrored only after the copy, so a follower never
+    reports "completed" before its pages exist.
+    """
+    job_data = jobs[job_id]
+    run_status = job_data["run_status"]
+    for follower_id in job_data["followers"]:
+        follower = jobs[follower_id]
+        if run_status.status == "completed":
+            await asyncio.to_thread(copy_job, run_status.output_dir, follower["status"].output_dir)
+            await asyncio.to_thread(
+                _search_index().copy_source, run_status.output_dir, follower["status"].output_dir
+            )
+        _sync_followers(job_id, [follower_id])
+        await save_job(follower_id, follower["company"], follower["page_set"], follower["status"])
+
+
+async def _run_generation(
+    job_id: str, company: str, output_dir: str, page_set: str = "full", response_mode: str = "markers"
+):
     """Run the generation process in background."""
     job_data = jobs[job_id]
-    job_data["status"].status = "running"
+    status = job_data["run_status"]
+    status.status = "running"
+    _changed(job_id)
+    reuse_similar = job_data["reuse_similar"] and REUSE_THRESHOLD > 0
+    reuse_args = ["--reuse-similar", "--reuse-threshold", str(REUSE_THRESHOLD)] if reuse_similar else []
+    variants = status.variants
+    variant_args = ["--variants", ",".join(variants)] if variants else []
+    # Jobs started while profiling is on write their profile next to their output
+    profile_args = ["--profile"] if profiler else []
+    library_args = ["--personalize", job_data["library"]] if job_data["library"] else []
+    cache_args = ["--cache-dir", PAGE_CACHE_DIR] + (["--refresh-cache"] if job_data["fresh"] else [])
 
     try:
         # Call the CLI with --jsonl for structured output
@@ -124,11 +437,24 @@ async def _run_generation(job_id: str, company: str, output_dir: str, page_set:
             "--company", company,
             "--output-dir", output_dir,
             "--set", page_set,
+            "--response-mode", response_mode,
+            *cache_args,
+            "--index-db", SEARCH_INDEX_DB,
+            *reuse_args,
+            "--languages", ",".join(status.languages),
+            *variant_args,
+            *library_args,
+            *profile_args,
+            "--format", "both",
             "--jsonl",
             cwd=T3_LIB_PATH,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
         )
+        job_data["process"] = process
+        if job_data.get("cancel_requested"):
+            # Cancelled while the process was starting
+            process.send_signal(signal.SIGTERM)
 
         while True:
             line = await process.stdout.readline()
@@ -139,13 +465,12 @@ async def _run_generation(job_id: str, company: str, output_dir: str, page_set:
                 continue
 
             try:
-                evt = json.loads(decoded)
-            except json.JSONDecodeError:
-                job_data["events"].append(decoded)
+                evt = loads(decoded)
+            except ValueError:
+                job_data["events"].append(_log_frame(decoded))
                 continue
 
-            job_data["events"].append(decoded)
-            status = job_data["status"]
+            job_data["events"].append(_log_frame(decoded, evt))
 
             if evt.get("event") == "page_done":
                 status.pages_done = evt["done"]
@@ -158,38 +483,267 @@ async def _run_generation(job_id: str, company: str, output_dir: str, page_set:
                 status.output_tokens = evt.get("total_output_tokens", status.output_tokens)
                 status.cost_usd = evt.get("cost_usd", 0.0)
                 status.duration_sec = evt.get("duration_sec", 0.0)
+                status.reused_pages = evt.get("reused_pages", 0)
+                status.saved_input_tokens = evt.get("saved_input_tokens", 0)
+                status.saved_output_tokens = evt.get("saved_output_tokens", 0)
+                status.saved_cost_usd = evt.get("saved_cost_usd", 0.0)
+            elif evt.get("event") == "cancelled":
+                status.input_tokens = evt.get("total_input_tokens", status.input_tokens)
+                status.output_tokens = evt.get("total_output_tokens", status.output_tokens)
+                status.cost_usd = evt.get("cost_usd", 0.0)
+                status.duration_sec = evt.get("duration_sec", 0.0)
+            else:
+                continue
+            _changed(job_id)
+            _sync_followers(job_id)
 
         await process.wait()
 
-        if process.returncode == 0:
-            job_data["status"].status = "completed"
-            job_data["status"].progress = 100
-            job_data["status"].pages_done = job_data["status"].pages_total
+        if job_data.get("cancel_requested"):
+            if not status.cost_usd:
+                # Killed before its cancelled event, the page_done tokens are all we know
+                status.cost_usd = round(
+                    status.input_tokens / 1_000_000 * PRICING["input"]
+                    + status.output_tokens / 1_000_000 * PRICING["output"], 6
+                )
+            status.status = "cancelled"
+        elif process.returncode == 0:
+            status.status = "completed"
+            status.progress = 100
+            status.pages_done = status.pages_total
         else:
             stderr = await process.stderr.read()
-            job_data["status"].status = "failed"
-            job_data["status"].error = stderr.decode()[:2000]
+            status.status = "failed"
+            status.error = stderr.decode()[:2000]
 
     except Exception as e:
-        job_data["status"].status = "failed"
-        job_data["status"].error = str(e)
+        status.status = "failed"
+        status.error = str(e)
+    _changed(job_id)
+    if job_data["library"]:
+        warm_pool.release_library(job_data["library"])
+
+    key = _request_key(
+        company, page_set, response_mode, job_data["reuse_similar"],
+        tuple(status.languages), tuple(status.variants), job_data["library"],
+        job_data["fresh"],
+    )
+    if inflight.get(key) == job_id:
+        del inflight[key]
+
+    # Move output into the content-addressed store
+    try:
+        await asyncio.to_thread(ingest_job, output_dir)
+    except OSError as e:
+        job_data["events"].append(_log_frame(f"Output ingest failed: {e}"))
 
-    # Persist final state to SQLite
+    # Persist final state to SQLite, as cancelled if the job's own user cancelled it
     await save_job(
         job_id, job_data["company"], job_data["page_set"], job_data["status"]
     )
-
-
+    await _finish_followers(job_id)
+
+
+@app.get("/api/jobs", response_model=JobList)
+async def list_job_history(
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    status: str | None = None,
+    page_set: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    company: str | None = Query(None, description="Company prefix, case-insensitive"),
+):
+    """List jobs newest first. Pass next_cursor back as cursor for the next page.
+
+    date_from and date_to are inclusive days. Jobs still running in this
+    process report their live progress.
+    """
+    try:
+        rows, next_cursor = await list_jobs(
+            limit=limit,
+            cursor=cursor,
+            status=status,
+            page_set=page_set,
+            created_from=date_from.isoformat() if date_from else None,
+            created_to=(date_to + timedelta(days=1)).isoformat() if date_to else None,
+            company_prefix=company,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    items = []
+    for row in rows:
+        status_obj = jobs[row["job_id"]]["status"] if row["job_id"] in jobs else _status_from_row(row)
+        items.append(JobListItem(**status_obj.model_dump(), company=row["company"], page_set=row["page_set"]))
+    return JobList(jobs=items, next_cursor=next_cursor)
+
+
+@app.get("/api/jobs/stats", response_model=JobStats)
+async def get_job_stats(
+    date_from: date | None = None,
+    date_to: date | None = None,
+    page_set: str | None = None,
+):
+    """Tokens, cost and average duration per page set and day (inclusive range)."""
+    rows = await job_stats(
+        day_from=date_from.isoformat() if date_from else None,
+        day_to=date_to.isoformat() if date_to else None,
+        page_set=page_set,
+    )
+    days = []
+    totals = StatsTotals()
+    total_duration = 0.0
+    for row in rows:
+        days.append(DailyStats(
+            day=row["day"],
+            page_set=row["page_set"],
+            jobs=row["jobs"],
+            completed=row["completed"],
+            failed=row["failed"],
+            input_tokens=row["input_tokens"],
+            output_tokens=row["output_tokens"],
+            cost_usd=round(row["cost_usd"], 4),
+            avg_duration_sec=round(row["duration_sec"] / row["completed"], 1) if row["completed"] else 0.0,
+        ))
+        totals.jobs += row["jobs"]
+        totals.completed += row["completed"]
+        totals.failed += row["failed"]
+        totals.input_tokens += row["input_tokens"]
+        totals.output_tokens += row["output_tokens"]
+        totals.cost_usd += row["cost_usd"]
+        total_duration += row["duration_sec"]
+    totals.cost_usd = round(totals.cost_usd, 4)
+    if totals.completed:
+        totals.avg_duration_sec = round(total_duration / totals.completed, 1)
+    return JobStats(days=days, totals=totals)
+
+
+@app.delete("/api/jobs/{job_id}", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    """Cancel a pending or running job.
+
+    The CLI gets SIGTERM: it drops queued pages, aborts API calls in flight
+    and reports the tokens spent so far; finished pages are kept. If it has
+    not exited after CANCEL_GRACE_SEC it is killed. The CLI run is shared
+    with coalesced jobs, so it is stopped only once none of them needs it:
+    a job attached to another one only detaches from it, and a job others
+    are attached to is marked cancelled while its run goes on for them.
+    Returns the final status.
+    """
+    if job_id not in jobs:
+        if not await _stored_status(job_id):
+            raise HTTPException(status_code=404, detail="Job not found")
+        raise HTTPException(status_code=409, detail="Job is not running")
+    job_data = jobs[job_id]
+    status = job_data["status"]
+    if status.status not in ("pending", "running"):
+        raise HTTPException(status_code=409, detail="Job is not running")
+
+    leader_id = status.coalesced_with
+    leader = jobs.get(leader_id)
+    if leader and job_id in leader["followers"]:
+        leader["followers"].remove(job_id)
+        await _cancel_detached(job_id)
+        if leader["status"].status == "cancelled" and not leader["followers"]:
+            # The last job the cancelled leader was still running for
+            await _stop_run(leader)
+        return status
+
+    if job_data["followers"]:
+        job_data["status"] = status.model_copy()
+        await _cancel_detached(job_id)
+        return job_data["status"]
+
+    await _stop_run(job_data)
+    if "task" in job_data:
+        # Wait until the final status and the followers are persisted
+        await asyncio.shield(job_data["task"])
+    return job_data["status"]
+
+
+async def _cancel_detached(job_id: str):
+    """Mark a job cancelled that no longer follows the run it was part of."""
+    job_data = jobs[job_id]
+    job_data["status"].status = "cancelled"
+    _changed(job_id)
+    await save_job(job_id, job_data["company"], job_data["page_set"], job_data["status"])
+
+
+async def _stop_run(job_data: dict):
+    """SIGTERM the job's CLI process, kill it if it is still alive after CANCEL_GRACE_SEC."""
+    job_data["cancel_requested"] = True
+    process = job_data.get("process")
+    if process and process.returncode is None:
+        try:
+            process.send_signal(signal.SIGTERM)
+            await asyncio.wait_for(process.wait(), CANCEL_GRACE_SEC)
+        except ProcessLookupError:
+            pass
+        except asyncio.TimeoutError:
+            process.kill()
+
+
+# Declared after /api/jobs/stats, otherwise "stats" would match as a job id
 @app.get("/api/jobs/{job_id}", response_model=JobStatus)
-async def get_job_status(job_id: str):
-    """Get current job status. Falls back to DB if not in memory."""
+async def get_job_status(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=LONG_POLL_MAX_SEC),
+    since: int | None = None,
+    if_none_match: str | None = Header(None),
+):
+    """Get current job status. Falls back to DB if not in memory.
+
+    The ETag changes with every change of the status; a request whose
+    If-None-Match matches gets 304 without a body. With since=<version>
+    and wait=<seconds> the request is held until the version differs from
+    since or wait runs out (long poll), then returns the status.
+    """
     if job_id in jobs:
-        return jobs[job_id]["status"]
+        job_data = jobs[job_id]
+        if wait and since == job_data["status"].version:
+            try:
+                await asyncio.wait_for(job_data["changed"].wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+        status = job_data["status"]
+    else:
+        status = await _stored_status(job_id)
+        if status is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+    # Versions of a job running at a restart go back to the last saved one,
+    # the status (now "failed") keeps such tags apart
+    etag = f'W/"{status.version}-{status.status}"'
+    # no-cache: browsers revalidate with If-None-Match instead of refetching
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and (etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"):
+        return Response(status_code=304, headers=headers)
+    return CodecJSONResponse(status.model_dump(), headers=headers)
+
+
+async def _stored_status(job_id: str) -> JobStatus | None:
+    """Status of a job that is not in memory, through job_cache. None if unknown."""
+    cached = job_cache.get(job_id)
+    if cached and time.monotonic() - cached[1] < JOB_CACHE_TTL_SEC:
+        job_cache.move_to_end(job_id)
+        return cached[0]
 
     row = await get_job(job_id)
     if not row:
-        raise HTTPException(status_code=404, detail="Job not found")
-
+        job_cache.pop(job_id, None)
+        return None
+    status = _status_from_row(row)
+    if status.status not in ("pending", "running"):
+        job_cache[job_id] = (status, time.monotonic())
+        job_cache.move_to_end(job_id)
+        while len(job_cache) > JOB_CACHE_SIZE:
+            job_cache.popitem(last=False)
+    return status
+
+
+def _status_from_row(row: dict) -> JobStatus:
+    """Build a JobStatus from a persisted jobs row."""
     return JobStatus(
         job_id=row["job_id"],
         status=row["status"],
@@ -203,6 +757,14 @@ async def get_job_status(job_id: str):
         output_tokens=row["output_tokens"],
         cost_usd=row["cost_usd"],
         duration_sec=row["duration_sec"],
+        reused_pages=row["reused_pages"],
+        saved_input_tokens=row["saved_input_tokens"],
+        saved_output_tokens=row["saved_output_tokens"],
+        saved_cost_usd=row["saved_cost_usd"],
+        languages=row["languages"].split(","),
+        variants=row["variants"].split(",") if row["variants"] else [],
+        version=row["version"],
+        response_mode=row["response_mode"],
     )
 
 
@@ -222,21 +784,25 @@ async def stream_events(job_id: str):
             status = job_data["status"]
             events = job_data["events"]
 
-            # Send new events
-            if len(events) > last_idx:
-                for evt_raw in events[last_idx:]:
-                    try:
-                        evt = json.loads(evt_raw)
-                        yield f"data: {json.dumps({'type': 'log', 'event': evt})}\n\n"
-                    except json.JSONDecodeError:
-                        yield f"data: {json.dumps({'type': 'log', 'message': evt_raw})}\n\n"
-                last_idx = len(events)
-
-            # Send status update
-            yield f"data: {json.dumps({'type': 'status', 'status': status.status, 'progress': status.progress, 'pages_done': status.pages_done, 'current_page': status.current_page, 'input_tokens': status.input_tokens, 'output_tokens': status.output_tokens, 'cost_usd': status.cost_usd})}\n\n"
-
-            if status.status in ("completed", "failed"):
-                yield f"data: {json.dumps({'type': 'done', 'status': status.status, 'error': status.error, 'input_tokens': status.input_tokens, 'output_tokens': status.output_tokens, 'cost_usd': status.cost_usd, 'duration_sec': status.duration_sec})}\n\n"
+            # New events and the status go out as one chunk, one compressor flush per tick
+            frames = events[last_idx:]
+            last_idx += len(frames)
+            frames.append(dumps({
+                "type": "status", "status": status.status, "progress": status.progress,
+                "pages_done": status.pages_done, "current_page": status.current_page,
+                "input_tokens": status.input_tokens, "output_tokens": status.output_tokens,
+                "cost_usd": status.cost_usd,
+            }))
+            done = status.status in ("completed", "failed", "cancelled")
+            if done:
+                frames.append(dumps({
+                    "type": "done", "status": status.status, "error": status.error,
+                    "input_tokens": status.input_tokens, "output_tokens": status.output_tokens,
+                    "cost_usd": status.cost_usd, "duration_sec": status.duration_sec,
+                    "reused_pages": status.reused_pages, "saved_cost_usd": status.saved_cost_usd,
+                }))
+            yield "".join(f"data: {frame}\n\n" for frame in frames)
+            if done:
                 break
 
             await asyncio.sleep(1)
@@ -244,56 +810,163 @@ async def stream_events(job_id: str):
     return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 
+def _page_entry(rel_path: str, content: str) -> dict:
+    """Build a page listing entry, splitting off the YAML frontmatter."""
+    f = os.path.basename(rel_path)
+
+    # Parse YAML frontmatter
+    meta = {}
+    body = content
+    if content.startswith("---"):
+        parts = content.split("---", 2)
+        if len(parts) >= 3:
+            import yaml
+            try:
+                meta = yaml.safe_load(parts[1]) or {}
+            except Exception:
+                pass
+            body = parts[2].strip()
+
+    return {
+        "filename": f,
+        "path": rel_path,
+        "title": meta.get("title", f.replace(".md", "").replace("-", " ").title()),
+        "slug": meta.get("slug", ""),
+        "layout": meta.get("layout", ""),
+        "meta": meta,
+        "content": body,
+        "raw": content,
+    }
+
+
+def _read_pages(output_dir: str, filename: str | None = None) -> list[dict]:
+    """Read all Markdown pages of a job (or only those named filename)."""
+    pages = []
+    for rel_path in list_job_files(output_dir):
+        f = os.path.basename(rel_path)
+        if f.endswith(".md") and filename in (None, f):
+            content = read_job_file(output_dir, rel_path).decode("utf-8")
+            pages.append(_page_entry(rel_path, content))
+    return pages
+
+
 @app.get("/api/jobs/{job_id}/pages")
-async def list_pages(job_id: str):
-    """List all generated pages for a job."""
+async def list_pages(job_id: str, raw: bool = True):
+    """List all generated pages for a job.
+
+    Every page has its body twice, as content (without frontmatter) and as
+    raw (the whole file); raw=false leaves raw out.
+    """
     output_dir = None
     if job_id in jobs:
         output_dir = jobs[job_id]["status"].output_dir
     else:
-        row = await get_job(job_id)
-        if not row:
+        stored = await _stored_status(job_id)
+        if not stored:
             raise HTTPException(status_code=404, detail="Job not found")
-        output_dir = row["output_dir"]
+        output_dir = stored.output_dir
     if not output_dir or not os.path.exists(output_dir):
         return {"pages": []}
 
-    pages = []
-    for root, dirs, files in os.walk(output_dir):
-        for f in sorted(files):
-            if f.endswith(".md"):
-                filepath = os.path.join(root, f)
-                rel_path = os.path.relpath(filepath, output_dir)
-                with open(filepath, "r", encoding="utf-8") as fh:
-                    content = fh.read()
-
-                # Parse YAML frontmatter
-                meta = {}
-                body = content
-                if content.startswith("---"):
-                    parts = content.split("---", 2)
-                    if len(parts) >= 3:
-                        import yaml
-                        try:
-                            meta = yaml.safe_load(parts[1]) or {}
-                        except Exception:
-                            pass
-                        body = parts[2].strip()
-
-                pages.append({
-                    "filename": f,
-                    "path": rel_path,
-                    "title": meta.get("title", f.replace(".md", "").replace("-", " ").title()),
-                    "slug": meta.get("slug", ""),
-                    "layout": meta.get("layout", ""),
-                    "meta": meta,
-                    "content": body,
-                    "raw": content,
-                })
-
+    pages = await asyncio.to_thread(_read_pages, output_dir)
+    if not raw:
+        for page in pages:
+            del page["raw"]
     return {"pages": pages}
 
 
+@app.post("/api/jobs/{job_id}/pages/{slug:path}/elements/{n}/regenerate")
+async def regenerate_element(job_id: str, slug: str, n: int):
+    """Re-generate a single content element (1-based) of a generated page.
+
+    Only the targeted element is sent to the API; the rest of the page is
+    read back from disk and kept as is. Regenerations of the same job run
+    one after another: each writes the job's files back to disk, lets the
+    CLI edit them and ingests them again, which would otherwise remove
+    files another regeneration's CLI is still reading.
+    """
+    if job_id not in jobs and not await _stored_status(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    async with regenerate_locks.setdefault(job_id, asyncio.Lock()):
+        return await _regenerate_element(job_id, slug, n)
+
+
+async def _regenerate_element(job_id: str, slug: str, n: int):
+    if job_id in jobs:
+        job_data = jobs[job_id]
+        status = job_data["status"]
+        company = job_data["company"]
+        page_set = job_data["page_set"]
+        response_mode = job_data.get("response_mode", "markers")
+    else:
+        row = await get_job(job_id)
+        if not row:
+            raise HTTPException(status_code=404, detail="Job not found")
+        status = _status_from_row(row)
+        company = row["company"]
+        page_set = row["page_set"]
+        response_mode = status.response_mode
+
+    if status.status in ("pending", "running"):
+        raise HTTPException(status_code=409, detail="Job is still running")
+    if not status.output_dir or not os.path.exists(status.output_dir):
+        raise HTTPException(status_code=404, detail="No output files found")
+
+    # The CLI edits the page files in place
+    await asyncio.to_thread(materialize_job, status.output_dir)
+    regenerations[0] += 1
+    warm_pool.yield_to_jobs()
+    try:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "generate.py",
+            "--company", company,
+            "--output-dir", status.output_dir,
+            "--regenerate", f"{slug}:{n}",
+            "--response-mode", response_mode,
+            # The regenerated page replaces its cached copy, later identical jobs get the fix
+            "--cache-dir", PAGE_CACHE_DIR,
+            "--index-db", SEARCH_INDEX_DB,
+            "--jsonl",
+            cwd=T3_LIB_PATH,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await process.communicate()
+    finally:
+        regenerations[0] -= 1
+    await asyncio.to_thread(ingest_job, status.output_dir)
+    if process.returncode != 0:
+        raise HTTPException(status_code=400, detail=stderr.decode()[-2000:] or "Regeneration failed")
+
+    page_evt = None
+    for line in stdout.decode().splitlines():
+        try:
+            evt = loads(line)
+        except ValueError:
+            continue
+        if evt.get("event") == "page_done":
+            page_evt = evt
+        elif evt.get("event") == "complete":
+            status.input_tokens += evt.get("total_input_tokens", 0)
+            status.output_tokens += evt.get("total_output_tokens", 0)
+            status.cost_usd = round(status.cost_usd + evt.get("cost_usd", 0.0), 6)
+
+    if job_id in jobs:
+        _changed(job_id)
+    else:
+        status.version += 1
+    await save_job(job_id, company, page_set, status)
+    job_cache.pop(job_id, None)
+
+    page = None
+    if page_evt:
+        filename = f"{page_evt['slug'].strip('/').replace('/', '-') or 'index'}.md"
+        found = await asyncio.to_thread(_read_pages, status.output_dir, filename)
+        page = found[0] if found else None
+
+    return {"page": page, "job": status}
+
+
 @app.get("/api/jobs/{job_id}/download")
 async def download_zip(job_id: str):
     """Download all generated files as ZIP."""
@@ -313,21 +986,185 @@ async def download_zip(job_id: str):
         raise HTTPException(status_code=404, detail="No output files found")
     safe_name = "".join(c if c.isalnum() or c in "-_ " else "" for c in company).strip().replace(" ", "-")
 
-    zip_path = f"/tmp/t3-{safe_name}-{job_id}.zip"
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-        for root, dirs, files in os.walk(output_dir):
-            for f in files:
-                filepath = os.path.join(root, f)
-                arcname = os.path.relpath(filepath, output_dir)
-                zf.write(filepath, arcname)
+    def build_zip() -> bytes:
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            for rel_path in list_job_files(output_dir):
+                zf.writestr(rel_path, read_job_file(output_dir, rel_path))
+        return buffer.getvalue()
 
-    return FileResponse(
-        zip_path,
+    return Response(
+        await asyncio.to_thread(build_zip),
         media_type="application/zip",
-        filename=f"t3-content-{safe_name}.zip",
+        headers={"Content-Disposition": f'attachment; filename="t3-content-{safe_name}.zip"'},
     )
 
 
+@app.get("/api/jobs/{job_id}/bundle")
+async def download_bundle(job_id: str, lang: str | None = None, style: str | None = None):
+    """Download the TYPO3 import bundle (JSON Lines, one record per page).
+
+    Multilingual jobs write one bundle per language, variant jobs one per
+    style; lang or style selects one of them, otherwise all are streamed one
+    after another. Their records tell them apart by the "language" and
+    "style" fields of the page.
+    """
+    if job_id in jobs:
+        status = jobs[job_id]["status"]
+    else:
+        status = await _stored_status(job_id)
+        if not status:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+    rel_paths = [
+        p for p in await asyncio.to_thread(list_job_files, status.output_dir)
+        if os.path.basename(p) == BUNDLE_FILENAME
+    ]
+    suffix = ""
+    if lang is not None:
+        if lang not in status.languages:
+            raise HTTPException(status_code=404, detail=f"No bundle for language {lang}")
+        if len(status.languages) > 1:
+            # <company>/<lang>/bundle.jsonl
+            rel_paths = [p for p in rel_paths if os.path.basename(os.path.dirname(p)) == lang]
+        suffix = f"-{lang}"
+    if style is not None:
+        if style not in status.variants:
+            raise HTTPException(status_code=404, detail=f"No bundle for style {style}")
+        # <company>/<style>/bundle.jsonl
+        rel_paths = [p for p in rel_paths if os.path.basename(os.path.dirname(p)) == style]
+        suffix += f"-{style}"
+    if not rel_paths:
+        raise HTTPException(status_code=404, detail="No bundle found")
+
+    async def stream():
+        for rel_path in rel_paths:
+            yield await asyncio.to_thread(read_job_file, status.output_dir, rel_path)
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="t3-content-{job_id}{suffix}.jsonl"'},
+    )
+
+
+@app.get("/api/search")
+async def search_pages(
+    q: str,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    """Full-text search over all generated pages, best match first.
+
+    Every word of q must match (as a word prefix, umlauts folded) in the
+    title, company, CE types, content or image keywords of a page. Snippets
+    mark the matches with <mark>.
+    """
+    hits = await asyncio.to_thread(_search_index().search, q, limit, offset)
+    results = []
+    for hit in hits:
+        # Sources are <job_id>/<company slug> below OUTPUT_BASE
+        job_id, _, subdir = hit["source"].partition(os.sep)
+        results.append({
+            "job_id": job_id,
+            "path": os.path.join(subdir, hit["filename"]),
+            "slug": hit["slug"],
+            "title": hit["title"],
+            "company": hit["company"],
+            "ce_types": hit["ce_types"].split(),
+            "snippet": hit["snippet"],
+            "score": round(hit["score"], 3),
+        })
+    return {"results": results}
+
+
+@app.get("/api/similar")
+async def similar_companies(company: str, threshold: float = Query(REUSE_THRESHOLD, ge=0, le=1)):
+    """Earlier companies similar enough that a new job would reuse their company-agnostic pages."""
+    if not os.path.exists(COMPANY_INDEX_DB):
+        return {"similar": []}
+
+    def find():
+        index = CompanyIndex(COMPANY_INDEX_DB)
+        try:
+            return index.find(company, threshold)
+        finally:
+            index.close()
+
+    matches = await asyncio.to_thread(find)
+    return {"similar": [{"company": c, "similarity": score} for c, score in matches]}
+
+
+@app.get("/api/warm-pool")
+async def warm_pool_status():
+    """Pre-generated industry libraries, today's token budget and the library being built."""
+    libraries = []
+    for page_set in WARM_POOL.get("page_sets", ["full"]):
+        for archetype, spec in (WARM_POOL.get("archetypes") or {}).items():
+            manifest = warm_pool.read_manifest(warm_pool.library_dir(archetype, page_set))
+            libraries.append({
+                "archetype": archetype,
+                "page_set": page_set,
+                "company": spec["company"],
+                "keywords": spec.get("keywords", []),
+                "ready": manifest is not None,
+                "created_at": manifest["created_at"] if manifest else None,
+            })
+    return {
+        "daily_token_budget": WARM_POOL.get("daily_token_budget", 0),
+        "tokens_today": await warm_pool_tokens(date.today().isoformat()),
+        "building": bool(warm_pool.current),
+        "libraries": libraries,
+    }
+
+
+class ProfileToggle(BaseModel):
+    enabled: bool
+
+
+def _check_debug_token(token: str | None):
+    # Without a configured token the debug endpoints do not exist
+    if not DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not token or not secrets.compare_digest(token, DEBUG_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
+
+
+@app.get("/api/debug/profile")
+async def get_profiling(x_debug_token: str | None = Header(None)):
+    """Whether profiling is on."""
+    _check_debug_token(x_debug_token)
+    return {"enabled": bool(profiler)}
+
+
+@app.post("/api/debug/profile")
+async def toggle_profiling(toggle: ProfileToggle, x_debug_token: str | None = Header(None)):
+    """Switch profiling on or off.
+
+    While on, every new job runs the CLI with --profile (pstats, collapsed
+    stacks and memory stats in <job output>/_profile/, hot spots in the
+    complete event), and the backend profiles itself: cProfile on the event
+    loop, stack samples of all threads and tracemalloc. Switching off writes
+    the backend profile to $OUTPUT_BASE/profiles/<timestamp>/ and returns
+    its summary.
+    """
+    _check_debug_token(x_debug_token)
+    if toggle.enabled:
+        if not profiler:
+            # Enabled from a request handler, so cProfile sees the event loop thread
+            profiler.append(RunProfiler())
+            profiler[0].start()
+        return {"enabled": True}
+    if not profiler:
+        return {"enabled": False, "profile": None}
+    backend_profiler = profiler.pop()
+    # Stopped in the event loop thread that started it
+    backend_profiler.stop()
+    directory = os.path.join(BACKEND_PROFILE_DIR, datetime.now().strftime("%Y%m%d-%H%M%S"))
+    summary = await asyncio.to_thread(backend_profiler.write, directory)
+    return {"enabled": False, "profile": summary}
+
+
 @app.get("/api/health")
 async def health():
     model = os.environ.get("ANTHROPIC_MODEL", "claude-sonnet-4-5-20250929")
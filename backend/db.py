@@ -3,6 +3,8 @@ SQLite persistence for job metadata.
 DB file lives alongside output files in the Docker volume.
 """
 
+import base64
+import json
 import os
 
 import aiosqlite
@@ -25,16 +27,152 @@ CREATE TABLE IF NOT EXISTS jobs (
     input_tokens INTEGER NOT NULL DEFAULT 0,
     output_tokens INTEGER NOT NULL DEFAULT 0,
     cost_usd REAL NOT NULL DEFAULT 0.0,
-    duration_sec REAL NOT NULL DEFAULT 0.0
+    duration_sec REAL NOT NULL DEFAULT 0.0,
+    reused_pages INTEGER NOT NULL DEFAULT 0,
+    saved_input_tokens INTEGER NOT NULL DEFAULT 0,
+    saved_output_tokens INTEGER NOT NULL DEFAULT 0,
+    saved_cost_usd REAL NOT NULL DEFAULT 0.0,
+    languages TEXT NOT NULL DEFAULT 'de',
+    variants TEXT NOT NULL DEFAULT '',
+    version INTEGER NOT NULL DEFAULT 0,
+    response_mode TEXT NOT NULL DEFAULT 'markers'
 );
 """
 
+# Columns added after the first release; init_db adds them to older databases
+ADDED_COLUMNS = {
+    "jobs": {
+        "reused_pages": "INTEGER NOT NULL DEFAULT 0",
+        "saved_input_tokens": "INTEGER NOT NULL DEFAULT 0",
+        "saved_output_tokens": "INTEGER NOT NULL DEFAULT 0",
+        "saved_cost_usd": "REAL NOT NULL DEFAULT 0.0",
+        "languages": "TEXT NOT NULL DEFAULT 'de'",
+        "variants": "TEXT NOT NULL DEFAULT ''",
+        "version": "INTEGER NOT NULL DEFAULT 0",
+        "response_mode": "TEXT NOT NULL DEFAULT 'markers'",
+    },
+}
+
+# Newest-first listing, optionally filtered, walks one of these in order.
+# The NOCASE index serves case-insensitive company prefix LIKE queries.
+CREATE_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at, job_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at, job_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_page_set_created ON jobs (page_set, created_at, job_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_company ON jobs (company COLLATE NOCASE);
+"""
+
+# Per day and page set totals, kept current by the triggers below so stats
+# queries read a few hundred rows instead of aggregating the whole jobs table.
+# duration_sec sums completed jobs only, avg = duration_sec / completed.
+CREATE_STATS_TABLE = """
+CREATE TABLE IF NOT EXISTS job_stats_daily (
+    day TEXT NOT NULL,
+    page_set TEXT NOT NULL,
+    jobs INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    cost_usd REAL NOT NULL DEFAULT 0.0,
+    duration_sec REAL NOT NULL DEFAULT 0.0,
+    PRIMARY KEY (day, page_set)
+);
+"""
+
+STATS_COLUMNS = "day, page_set, jobs, completed, failed, input_tokens, output_tokens, cost_usd, duration_sec"
+
+
+def _stats_values(row: str, sign: str = "") -> str:
+    """SQL expressions for one job's contribution to job_stats_daily."""
+    return (
+        f"substr({row}.created_at, 1, 10), {row}.page_set, {sign}1, "
+        f"{sign}({row}.status = 'completed'), {sign}({row}.status = 'failed'), "
+        f"{sign}{row}.input_tokens, {sign}{row}.output_tokens, {sign}{row}.cost_usd, "
+        f"{sign}(CASE WHEN {row}.status = 'completed' THEN {row}.duration_sec ELSE 0 END)"
+    )
+
+
+def _stats_upsert(row: str, sign: str = "") -> str:
+    return f"""
+    INSERT INTO job_stats_daily ({STATS_COLUMNS}) VALUES ({_stats_values(row, sign)})
+    ON CONFLICT (day, page_set) DO UPDATE SET
+        jobs = jobs + excluded.jobs, completed = completed + excluded.completed,
+        failed = failed + excluded.failed, input_tokens = input_tokens + excluded.input_tokens,
+        output_tokens = output_tokens + excluded.output_tokens,
+        cost_usd = cost_usd + excluded.cost_usd, duration_sec = duration_sec + excluded.duration_sec;"""
+
+
+# Expiry only drops a job's output; it keeps counting as it did before.
+CREATE_STATS_TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS jobs_stats_insert AFTER INSERT ON jobs BEGIN{_stats_upsert("NEW")}
+END;
+CREATE TRIGGER IF NOT EXISTS jobs_stats_update AFTER UPDATE ON jobs
+WHEN NEW.status IS NOT 'expired' BEGIN{_stats_upsert("OLD", "-")}{_stats_upsert("NEW")}
+END;
+CREATE TRIGGER IF NOT EXISTS jobs_stats_delete AFTER DELETE ON jobs BEGIN{_stats_upsert("OLD", "-")}
+END;
+"""
+
+BACKFILL_STATS = f"""
+INSERT INTO job_stats_daily ({STATS_COLUMNS})
+SELECT substr(created_at, 1, 10), page_set, count(*),
+       sum(status = 'completed'), sum(status = 'failed'),
+       sum(input_tokens), sum(output_tokens), sum(cost_usd),
+       sum(CASE WHEN status = 'completed' THEN duration_sec ELSE 0 END)
+FROM jobs GROUP BY 1, 2
+"""
+
+
+# Tokens spent per day by the idle-time pre-generation (backend/warm_pool.py)
+CREATE_WARM_POOL_USAGE = """
+CREATE TABLE IF NOT EXISTS warm_pool_usage (
+    day TEXT PRIMARY KEY,
+    input_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+async def _add_missing_columns(db, table: str, columns: dict):
+    cursor = await db.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in await cursor.fetchall()}
+    for name, definition in columns.items():
+        if name not in existing:
+            await db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
 
 async def init_db():
-    """Create jobs table if it doesn't exist."""
+    """Create tables, indexes and stats triggers if they don't exist."""
     os.makedirs(OUTPUT_BASE, exist_ok=True)
     async with aiosqlite.connect(DB_PATH) as db:
         await db.execute(CREATE_TABLE)
+        for table, columns in ADDED_COLUMNS.items():
+            await _add_missing_columns(db, table, columns)
+        await db.executescript(CREATE_INDEXES)
+        cursor = await db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'job_stats_daily'"
+        )
+        if await cursor.fetchone() is None:
+            # First start with stats: seed them from existing jobs before the
+            # triggers take over
+            await db.execute(CREATE_STATS_TABLE)
+            await db.execute(BACKFILL_STATS)
+        await db.executescript(CREATE_STATS_TRIGGERS)
+        await db.execute(CREATE_WARM_POOL_USAGE)
+        await db.commit()
+
+
+async def fail_interrupted_jobs():
+    """Mark jobs that were still pending or running when the server stopped."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(
+            """
+            UPDATE jobs SET status = 'failed', error = 'Interrupted by server restart',
+                version = version + 1
+            WHERE status IN ('pending', 'running')
+            """
+        )
         await db.commit()
 
 
@@ -46,14 +184,20 @@ async def save_job(job_id: str, company: str, page_set: str, status: dict):
             INSERT INTO jobs (
                 job_id, company, page_set, status, progress,
                 pages_done, pages_total, output_dir, error, created_at,
-                input_tokens, output_tokens, cost_usd, duration_sec
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                input_tokens, output_tokens, cost_usd, duration_sec,
+                reused_pages, saved_input_tokens, saved_output_tokens, saved_cost_usd,
+                languages, variants, version, response_mode
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ON CONFLICT(job_id) DO UPDATE SET
                 status=excluded.status, progress=excluded.progress,
                 pages_done=excluded.pages_done, pages_total=excluded.pages_total,
                 output_dir=excluded.output_dir, error=excluded.error,
                 input_tokens=excluded.input_tokens, output_tokens=excluded.output_tokens,
-                cost_usd=excluded.cost_usd, duration_sec=excluded.duration_sec
+                cost_usd=excluded.cost_usd, duration_sec=excluded.duration_sec,
+                reused_pages=excluded.reused_pages,
+                saved_input_tokens=excluded.saved_input_tokens,
+                saved_output_tokens=excluded.saved_output_tokens,
+                saved_cost_usd=excluded.saved_cost_usd, version=excluded.version
             """,
             (
                 job_id, company, page_set,
@@ -62,6 +206,10 @@ async def save_job(job_id: str, company: str, page_set: str, status: dict):
                 status.output_dir, status.error, status.created_at,
                 status.input_tokens, status.output_tokens,
                 status.cost_usd, status.duration_sec,
+                status.reused_pages, status.saved_input_tokens,
+                status.saved_output_tokens, status.saved_cost_usd,
+                ",".join(status.languages), ",".join(status.variants),
+                status.version, status.response_mode,
             ),
         )
         await db.commit()
@@ -78,15 +226,108 @@ async def get_job(job_id: str) -> dict | None:
         return dict(row)
 
 
-async def list_jobs(limit: int = 20) -> list[dict]:
-    """Fetch recent jobs ordered by creation time."""
+def encode_cursor(row: dict) -> str:
+    """Opaque pagination cursor pointing just past row."""
+    raw = json.dumps([row["created_at"], row["job_id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """Inverse of encode_cursor. Raises ValueError for malformed cursors."""
+    try:
+        created_at, job_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    return str(created_at), str(job_id)
+
+
+def _like_prefix(prefix: str) -> str:
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+async def list_jobs(
+    limit: int = 20,
+    cursor: str | None = None,
+    status: str | None = None,
+    page_set: str | None = None,
+    created_from: str | None = None,
+    created_to: str | None = None,
+    company_prefix: str | None = None,
+) -> tuple[list[dict], str | None]:
+    """Fetch jobs newest first, one page at a time.
+
+    Uses keyset pagination on (created_at, job_id): cursor is the
+    next_cursor of the previous page, so deep pages cost the same as the
+    first one. created_from is inclusive, created_to exclusive (ISO strings).
+    Returns (rows, next_cursor), next_cursor is None on the last page.
+    """
+    where, params = [], []
+    if cursor:
+        where.append("(created_at, job_id) < (?, ?)")
+        params.extend(decode_cursor(cursor))
+    if status:
+        where.append("status = ?")
+        params.append(status)
+    if page_set:
+        where.append("page_set = ?")
+        params.append(page_set)
+    if created_from:
+        where.append("created_at >= ?")
+        params.append(created_from)
+    if created_to:
+        where.append("created_at < ?")
+        params.append(created_to)
+    if company_prefix:
+        where.append("company LIKE ? ESCAPE '\\'")
+        params.append(_like_prefix(company_prefix))
+
+    sql = "SELECT * FROM jobs"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY created_at DESC, job_id DESC LIMIT ?"
+    # One extra row tells whether another page follows
+    params.append(limit + 1)
+
     async with aiosqlite.connect(DB_PATH) as db:
         db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
-            "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
-        )
-        rows = await cursor.fetchall()
-        return [dict(r) for r in rows]
+        result = await db.execute(sql, params)
+        rows = [dict(r) for r in await result.fetchall()]
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+async def job_stats(
+    day_from: str | None = None,
+    day_to: str | None = None,
+    page_set: str | None = None,
+) -> list[dict]:
+    """Daily totals per page set from the rollup table, newest day first.
+
+    day_from and day_to (YYYY-MM-DD) are inclusive.
+    """
+    where, params = [], []
+    if day_from:
+        where.append("day >= ?")
+        params.append(day_from)
+    if day_to:
+        where.append("day <= ?")
+        params.append(day_to)
+    if page_set:
+        where.append("page_set = ?")
+        params.append(page_set)
+
+    sql = f"SELECT {STATS_COLUMNS} FROM job_stats_daily WHERE jobs > 0"
+    if where:
+        sql += " AND " + " AND ".join(where)
+    sql += " ORDER BY day DESC, page_set"
+
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        result = await db.execute(sql, params)
+        return [dict(r) for r in await result.fetchall()]
 
 
 async def check_alphacode_exists(code: str) -> bool:
@@ -96,3 +337,54 @@ async def check_alphacode_exists(code: str) -> bool:
             "SELECT 1 FROM jobs WHERE job_id = ?", (code,)
         )
         return await cursor.fetchone() is not None
+
+
+async def list_jobs_created_before(cutoff: str) -> list[dict]:
+    """Fetch finished jobs created before cutoff (ISO timestamp) that still have output."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            """
+            SELECT * FROM jobs
+            WHERE created_at < ? AND output_dir IS NOT NULL
+              AND status NOT IN ('pending', 'running')
+            """,
+            (cutoff,),
+        )
+        rows = await cursor.fetchall()
+        return [dict(r) for r in rows]
+
+
+async def mark_job_expired(job_id: str):
+    """Mark a job whose output was removed by retention."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(
+            "UPDATE jobs SET status = 'expired', output_dir = NULL, version = version + 1 WHERE job_id = ?",
+            (job_id,),
+        )
+        await db.commit()
+
+
+async def add_warm_pool_usage(day: str, input_tokens: int, output_tokens: int):
+    """Count tokens spent by the pre-generation on day (YYYY-MM-DD)."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(
+            """
+            INSERT INTO warm_pool_usage (day, input_tokens, output_tokens) VALUES (?, ?, ?)
+            ON CONFLICT (day) DO UPDATE SET
+                input_tokens = input_tokens + excluded.input_tokens,
+                output_tokens = output_tokens + excluded.output_tokens
+            """,
+            (day, input_tokens, output_tokens),
+        )
+        await db.commit()
+
+
+async def warm_pool_tokens(day: str) -> int:
+    """Tokens (input + output) the pre-generation spent on day."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(
+            "SELECT input_tokens + output_tokens FROM warm_pool_usage WHERE day = ?", (day,)
+        )
+        row = await cursor.fetchone()
+        return row[0] if row else 0
@@ -0,0 +1,141 @@
+"""
+Maintenance commands for the output volume.
+
+    python -m backend.manage ingest           # move loose job files into the blob store
+    python -m backend.manage gc [--dry-run]   # expire old jobs and reclaim space
+    python -m backend.manage reindex          # rebuild the search index from stored output
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+from backend.db import get_job, init_db, list_jobs_created_before, mark_job_expired
+from backend.storage import (
+    BLOB_DIR, OUTPUT_BASE, delete_job_files, ingest_job, list_job_files, read_job_file, sweep_blobs,
+)
+from backend.warm_pool import WARM_POOL_DIR
+from t3_content_library.renderer import parse_page
+from t3_content_library.search import SearchIndex
+
+RETENTION_DAYS = int(os.environ.get("OUTPUT_RETENTION_DAYS", "90"))
+PAGE_CACHE_DIR = os.environ.get("PAGE_CACHE_DIR", os.path.join(OUTPUT_BASE, "page-cache"))
+SEARCH_INDEX_DB = os.environ.get("SEARCH_INDEX_DB", os.path.join(OUTPUT_BASE, "search.db"))
+
+
+def _job_dirs() -> list[str]:
+    # Besides job directories, OUTPUT_BASE holds these (profiles: backend profiling sessions)
+    reserved = {
+        os.path.basename(BLOB_DIR), os.path.basename(PAGE_CACHE_DIR), os.path.basename(WARM_POOL_DIR), "profiles",
+    }
+    return [
+        os.path.join(OUTPUT_BASE, name)
+        for name in sorted(os.listdir(OUTPUT_BASE))
+        if name not in reserved and os.path.isdir(os.path.join(OUTPUT_BASE, name))
+    ]
+
+
+async def ingest():
+    """Convert job directories written before the blob store existed.
+
+    Jobs still pending or running are skipped: their CLI is writing files.
+    """
+    await init_db()
+    for output_dir in _job_dirs():
+        row = await get_job(os.path.basename(output_dir))
+        if row and row["status"] in ("pending", "running"):
+            print(f"skipped {os.path.basename(output_dir)}: job is {row['status']}")
+            continue
+        ingest_job(output_dir)
+        print(f"ingested {os.path.basename(output_dir)}")
+
+
+def _prune_page_cache(cutoff: float, dry_run: bool) -> int:
+    removed = 0
+    if not os.path.isdir(PAGE_CACHE_DIR):
+        return removed
+    for f in os.listdir(PAGE_CACHE_DIR):
+        path = os.path.join(PAGE_CACHE_DIR, f)
+        if f.endswith(".json") and os.path.getmtime(path) < cutoff:
+            removed += 1
+            if not dry_run:
+                os.remove(path)
+    return removed
+
+
+async def reindex():
+    """Index every page of every stored job, e.g. for output from before the index existed."""
+    await init_db()
+    index = SearchIndex(SEARCH_INDEX_DB)
+    for output_dir in _job_dirs():
+        row = await get_job(os.path.basename(output_dir))
+        index.remove_source(output_dir)
+        pages = 0
+        for rel_path in list_job_files(output_dir):
+            if not rel_path.endswith(".md"):
+                continue
+            markdown = read_job_file(output_dir, rel_path).decode("utf-8")
+            try:
+                frontmatter, content_elements, image_keywords = parse_page(markdown)
+            except ValueError as e:
+                print(f"skipped {os.path.basename(output_dir)}/{rel_path}: {e}")
+                continue
+            if row:
+                company = row["company"]
+            else:
+                # seo.title is "<title> - <company>"
+                company = frontmatter.get("seo", {}).get("title", "").removeprefix(f"{frontmatter['title']} - ")
+            subdir, filename = os.path.split(rel_path)
+            index.add_page(
+                os.path.join(output_dir, subdir), filename, frontmatter, content_elements, company, image_keywords
+            )
+            pages += 1
+        print(f"indexed {os.path.basename(output_dir)} ({pages} pages)")
+    index.close()
+
+
+async def gc(retention_days: int, dry_run: bool):
+    """Remove output of jobs older than retention_days, then sweep unreferenced blobs."""
+    await init_db()
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    expired = await list_jobs_created_before(cutoff.isoformat())
+    index = SearchIndex(SEARCH_INDEX_DB) if not dry_run else None
+    for row in expired:
+        if not dry_run:
+            index.remove_source(row["output_dir"])
+            delete_job_files(row["output_dir"])
+            await mark_job_expired(row["job_id"])
+    cache_entries = _prune_page_cache(cutoff.timestamp(), dry_run)
+    blobs, freed_bytes = sweep_blobs(dry_run=dry_run)
+
+    prefix = "would free" if dry_run else "freed"
+    print(
+        f"{len(expired)} expired jobs, {cache_entries} page cache entries, "
+        f"{blobs} blobs ({prefix} {freed_bytes / 1024 / 1024:.1f} MiB)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="T3 Content Library maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("ingest", help="move loose job files into the blob store")
+    sub.add_parser("reindex", help="rebuild the search index from stored output")
+    gc_parser = sub.add_parser("gc", help="expire old jobs and reclaim space")
+    gc_parser.add_argument("--retention-days", type=int, default=RETENTION_DAYS)
+    gc_parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    start = time.time()
+    if args.command == "ingest":
+        asyncio.run(ingest())
+    elif args.command == "reindex":
+        asyncio.run(reindex())
+    elif args.command == "gc":
+        asyncio.run(gc(args.retention_days, args.dry_run))
+    print(f"done in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
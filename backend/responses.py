@@ -0,0 +1,172 @@
+"""
+Response encoding: JSON through the shared codec, and negotiated compression.
+
+JSON responses are compressed as a whole once they reach COMPRESS_MIN_SIZE.
+Streamed bodies (server-sent events, NDJSON downloads) are compressed
+incrementally, chunk by chunk, instead of being buffered; event stream
+chunks are flushed through the compressor right away, so events still
+arrive as they happen. Brotli is preferred when the optional brotli package
+is installed and the client accepts it, gzip otherwise.
+"""
+
+import os
+import zlib
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+from t3_content_library.jsoncodec import dumpb
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+STREAM_TYPE = "text/event-stream"
+
+
+class CodecJSONResponse(JSONResponse):
+    """JSONResponse rendered with the shared codec (orjson when installed)."""
+
+    def render(self, content) -> bytes:
+        return dumpb(content)
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """Best encoding the client accepts: "br", "gzip" or None."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    """Incremental compressor; flush() emits everything compressed so far."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=5)
+        else:
+            # wbits 31: gzip container
+            self._zlib = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.flush()
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing JSON/text responses and SSE streams.
+
+    Responses that already have a Content-Encoding, binary downloads (ZIP)
+    and bodies below COMPRESS_MIN_SIZE pass through unchanged. A body that
+    arrives in several chunks is compressed as it streams, whatever its size.
+    """
+
+    def __init__(self, app, min_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"start": None, "mode": None, "body": [], "compressor": None, "flush": False}
+
+        async def send_compressed(message):
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if "content-encoding" in headers:
+                    state["mode"] = "passthrough"
+                elif content_type.startswith(STREAM_TYPE):
+                    state["mode"] = "stream"
+                elif content_type.startswith(COMPRESSIBLE_TYPES):
+                    state["mode"] = "buffer"
+                else:
+                    state["mode"] = "passthrough"
+                if state["mode"] == "passthrough":
+                    await send(message)
+                    return
+                state["start"] = message
+                if state["mode"] == "stream":
+                    state["flush"] = True
+                    await start_stream()
+                return
+
+            if message["type"] != "http.response.body" or state["mode"] == "passthrough":
+                await send(message)
+                return
+            more_body = message.get("more_body", False)
+            body = message.get("body", b"")
+
+            if state["mode"] == "buffer" and more_body and not state["body"]:
+                # A streamed body: compress it as it comes instead of holding it
+                state["mode"] = "stream"
+                await start_stream()
+
+            if state["mode"] == "stream":
+                compressor = state["compressor"]
+                data = compressor.compress(body)
+                if not more_body:
+                    data += compressor.finish()
+                elif state["flush"]:
+                    # Flushed per chunk, so every event reaches the client immediately
+                    data += compressor.flush()
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                return
+
+            state["body"].append(body)
+            if more_body:
+                return
+            body = b"".join(state["body"])
+            start = state["start"]
+            if len(body) >= self.min_size:
+                compressor = _Compressor(encoding)
+                body = compressor.compress(body) + compressor.finish()
+                _set_encoding(start, encoding)
+                MutableHeaders(raw=start["headers"])["content-length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        async def start_stream():
+            state["compressor"] = _Compressor(encoding)
+            _set_encoding(state["start"], encoding)
+            await send(state["start"])
+
+        await self.app(scope, receive, send_compressed)
+
+
+def _set_encoding(start: dict, encoding: str):
+    start["headers"] = list(start["headers"])
+    headers = MutableHeaders(raw=start["headers"])
+    headers["content-encoding"] = encoding
+    headers.add_vary_header("Accept-Encoding")
+    if "content-length" in headers:
+        del headers["content-length"]
@@ -0,0 +1,204 @@
+"""
+Content-addressed storage for job output files.
+
+After a job finishes, its files are moved into a shared blob store keyed by
+the SHA-256 of their content, so byte-identical pages (e.g. cached AGB or
+Datenschutz pages, or coalesced jobs) are stored once. Each job directory
+keeps only a manifest.json mapping relative paths to blobs. Reads go through
+list_job_files()/read_job_file(), which transparently serve both ingested
+jobs and loose files of jobs that are still running.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+OUTPUT_BASE = os.environ.get("OUTPUT_BASE", "/tmp/t3-outputs")
+BLOB_DIR = os.path.join(OUTPUT_BASE, "blobs")
+MANIFEST = "manifest.json"
+
+# none, gzip or zstd (needs the optional zstandard package, else gzip)
+COMPRESSION = os.environ.get("OUTPUT_COMPRESSION", "gzip")
+if COMPRESSION == "zstd" and zstandard is None:
+    COMPRESSION = "gzip"
+
+SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+# Blobs younger than this are never swept, a job may be ingesting them
+GC_GRACE_SEC = 3600
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(data, mtime=0)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return data
+
+
+def _decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Blob is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def _blob_path(digest: str, encoding: str) -> str:
+    return os.path.join(BLOB_DIR, digest[:2], digest + SUFFIXES[encoding])
+
+
+def put_blob(data: bytes) -> dict:
+    """Store data once per content hash. Returns its manifest entry."""
+    digest = hashlib.sha256(data).hexdigest()
+    for encoding in SUFFIXES:
+        path = _blob_path(digest, encoding)
+        if os.path.exists(path):
+            # Refresh mtime so a concurrent GC sweep keeps it
+            os.utime(path)
+            return {"sha256": digest, "size": len(data), "encoding": encoding}
+
+    path = _blob_path(digest, COMPRESSION)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_compress(data, COMPRESSION))
+    os.replace(tmp_path, path)
+    return {"sha256": digest, "size": len(data), "encoding": COMPRESSION}
+
+
+def read_blob(entry: dict) -> bytes:
+    """Read and decompress the blob referenced by a manifest entry."""
+    with open(_blob_path(entry["sha256"], entry["encoding"]), "rb") as f:
+        return _decompress(f.read(), entry["encoding"])
+
+
+def load_manifest(output_dir: str) -> dict:
+    """Return {relative path: blob entry} for a job, empty if not ingested."""
+    try:
+        with open(os.path.join(output_dir, MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)["files"]
+    except (FileNotFoundError, NotADirectoryError):
+        return {}
+
+
+def _write_manifest(output_dir: str, files: dict):
+    path = os.path.join(output_dir, MANIFEST)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "files": files}, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _loose_files(output_dir: str) -> list[str]:
+    rel_paths = []
+    for root, dirs, files in os.walk(output_dir):
+        for f in files:
+            rel_path = os.path.relpath(os.path.join(root, f), output_dir)
+            if rel_path != MANIFEST and not f.endswith(".tmp"):
+                rel_paths.append(rel_path)
+    return rel_paths
+
+
+def ingest_job(output_dir: str):
+    """Move a job's loose files into the blob store and write its manifest.
+
+    Loose files replace existing manifest entries of the same path, so a job
+    can be materialized, modified and ingested again.
+    """
+    if not os.path.isdir(output_dir):
+        return
+    files = load_manifest(output_dir)
+    loose = _loose_files(output_dir)
+    if not loose:
+        return
+    for rel_path in loose:
+        with open(os.path.join(output_dir, rel_path), "rb") as f:
+            files[rel_path] = put_blob(f.read())
+    _write_manifest(output_dir, files)
+
+    for rel_path in loose:
+        os.remove(os.path.join(output_dir, rel_path))
+    for root, dirs, _ in os.walk(output_dir, topdown=False):
+        for d in dirs:
+            path = os.path.join(root, d)
+            if not os.listdir(path):
+                os.rmdir(path)
+
+
+def materialize_job(output_dir: str):
+    """Write a job's files back to disk (e.g. before the CLI edits them)."""
+    for rel_path, entry in load_manifest(output_dir).items():
+        path = os.path.join(output_dir, rel_path)
+        if os.path.exists(path):
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(read_blob(entry))
+
+
+def copy_job(src_dir: str, dst_dir: str):
+    """Give dst_dir the same files as src_dir; ingested jobs only copy the manifest."""
+    os.makedirs(dst_dir, exist_ok=True)
+    files = load_manifest(src_dir)
+    if files:
+        for entry in files.values():
+            os.utime(_blob_path(entry["sha256"], entry["encoding"]))
+        _write_manifest(dst_dir, files)
+    for rel_path in _loose_files(src_dir):
+        dst = os.path.join(dst_dir, rel_path)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.copy2(os.path.join(src_dir, rel_path), dst)
+
+
+def list_job_files(output_dir: str) -> list[str]:
+    """Relative paths of all files of a job, sorted."""
+    if not output_dir or not os.path.isdir(output_dir):
+        return []
+    return sorted(set(load_manifest(output_dir)) | set(_loose_files(output_dir)))
+
+
+def read_job_file(output_dir: str, rel_path: str) -> bytes:
+    """Read a job file, from disk if present, otherwise from the blob store."""
+    path = os.path.join(output_dir, rel_path)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    return read_blob(load_manifest(output_dir)[rel_path])
+
+
+def delete_job_files(output_dir: str):
+    """Remove a job's directory; its blobs are reclaimed by the next sweep."""
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def sweep_blobs(dry_run: bool = False) -> tuple[int, int]:
+    """Delete blobs that no manifest references. Returns (blobs, bytes) freed."""
+    referenced = set()
+    for name in os.listdir(OUTPUT_BASE) if os.path.isdir(OUTPUT_BASE) else []:
+        for entry in load_manifest(os.path.join(OUTPUT_BASE, name)).values():
+            referenced.add(entry["sha256"])
+
+    freed = freed_bytes = 0
+    cutoff = time.time() - GC_GRACE_SEC
+    for root, dirs, files in os.walk(BLOB_DIR):
+        for f in files:
+            path = os.path.join(root, f)
+            digest = f.split(".", 1)[0]
+            if digest in referenced or os.path.getmtime(path) > cutoff:
+                continue
+            freed += 1
+            freed_bytes += os.path.getsize(path)
+            if not dry_run:
+                os.remove(path)
+    return freed, freed_bytes
@@ -0,0 +1,254 @@
+"""
+Idle-time pre-generation of page libraries for popular industry archetypes.
+
+While no job is running, the worker generates the pages of every archetype
+in config/warm_pool.yaml with the regular CLI, one library per archetype and
+page set. A matching request is then served by `generate.py --personalize`,
+which copies the library's pages with the requested company's name and city
+in place of the archetype's placeholders. Starting a job stops a running
+pre-generation at once; its finished pages stay in the page cache, so the
+next idle period continues where it stopped. Tokens spent count against a
+daily budget.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import signal
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import yaml
+
+from backend.db import add_warm_pool_usage, warm_pool_tokens
+from t3_content_library.cli import LIBRARY_MANIFEST, slugify
+from t3_content_library.jsoncodec import loads
+from t3_content_library.personalize import match_archetype
+
+T3_LIB_PATH = os.environ.get("T3_LIB_PATH", os.path.join(os.path.dirname(__file__), ".."))
+OUTPUT_BASE = os.environ.get("OUTPUT_BASE", "/tmp/t3-outputs")
+PAGE_CACHE_DIR = os.environ.get("PAGE_CACHE_DIR", os.path.join(OUTPUT_BASE, "page-cache"))
+WARM_POOL_CONFIG = os.environ.get("WARM_POOL_CONFIG", os.path.join(T3_LIB_PATH, "config", "warm_pool.yaml"))
+WARM_POOL_DIR = os.path.join(OUTPUT_BASE, "warm-pool")
+# Seconds without any job before pre-generation starts
+IDLE_SEC = float(os.environ.get("WARM_POOL_IDLE_SEC", "60"))
+CHECK_SEC = 5
+# Pause after a library build failed for another reason than a job arriving
+RETRY_SEC = 600
+
+# The pre-generation run in progress: {"process": ..., "stopped": bool};
+# the process is None while it is being started
+current: list = []
+
+# Libraries read by running --personalize jobs, {path: count}. A rebuild
+# replaces a library only while nobody reads it, and find_library() does not
+# hand it out while it is being replaced.
+readers: dict = {}
+swapping: set = set()
+# Pause between checks while a rebuilt library waits for its readers
+READERS_CHECK_SEC = 1
+
+
+def load_config(path: str = WARM_POOL_CONFIG) -> dict:
+    """The warm pool configuration, {} if there is none.
+
+    WARM_POOL_DAILY_TOKENS overrides the configured daily_token_budget,
+    0 turns pre-generation off.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    if "WARM_POOL_DAILY_TOKENS" in os.environ:
+        config["daily_token_budget"] = int(os.environ["WARM_POOL_DAILY_TOKENS"])
+    return config
+
+
+def library_dir(archetype: str, page_set: str) -> str:
+    return os.path.join(WARM_POOL_DIR, f"{archetype}-{page_set}")
+
+
+def read_manifest(path: str) -> dict | None:
+    """Manifest of the library at path, None if it is not built (yet)."""
+    try:
+        with open(os.path.join(path, LIBRARY_MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def find_library(config: dict, company: str, page_set: str) -> str | None:
+    """Directory of a built library that can serve a request, or None."""
+    archetype = match_archetype(company, config.get("archetypes") or {})
+    if archetype is None:
+        return None
+    path = library_dir(archetype, page_set)
+    if path in swapping:
+        return None
+    return path if read_manifest(path) else None
+
+
+def acquire_library(path: str):
+    """Register a job reading the library at path, until release_library()."""
+    readers[path] = readers.get(path, 0) + 1
+
+
+def release_library(path: str):
+    readers[path] -= 1
+    if not readers[path]:
+        del readers[path]
+
+
+def next_target(config: dict) -> tuple[str, str] | None:
+    """(archetype, page set) to build next: missing libraries first, then the oldest stale one."""
+    max_age = timedelta(days=config.get("max_age_days", 30))
+    stale = []
+    for page_set in config.get("page_sets", ["full"]):
+        for archetype in config.get("archetypes") or {}:
+            manifest = read_manifest(library_dir(archetype, page_set))
+            if manifest is None:
+                return archetype, page_set
+            if datetime.fromisoformat(manifest["created_at"]) < datetime.now() - max_age:
+                stale.append((manifest["created_at"], archetype, page_set))
+    if stale:
+        _, archetype, page_set = min(stale)
+        return archetype, page_set
+    return None
+
+
+def yield_to_jobs():
+    """Stop the running pre-generation, an interactive job needs the capacity."""
+    for run in current:
+        run["stopped"] = True
+        if run["process"] and run["process"].returncode is None:
+            try:
+                run["process"].send_signal(signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+def _replace_dir(src: str, dst: str):
+    """Move src to dst, replacing an existing dst."""
+    old = f"{dst}.old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(dst):
+        os.rename(dst, old)
+    os.rename(src, dst)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+async def build_library(config: dict, archetype: str, page_set: str, budget_left: int) -> str:
+    """Generate one library. Returns "completed", "stopped" or "failed".
+
+    The run is stopped (SIGTERM, like a cancelled job) by yield_to_jobs()
+    or once it has spent budget_left tokens. It writes into a build
+    directory that replaces the library only when complete, so requests
+    keep being served from the previous version meanwhile.
+    """
+    spec = config["archetypes"][archetype]
+    target = library_dir(archetype, page_set)
+    build = f"{target}.build"
+    # Registered before the process starts, so a job arriving meanwhile stops it
+    run = {"process": None, "stopped": False}
+    current.append(run)
+    try:
+        await asyncio.to_thread(shutil.rmtree, build, True)
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "generate.py",
+            "--company", spec["company"],
+            "--output-dir", build,
+            "--set", page_set,
+            "--cache-dir", PAGE_CACHE_DIR,
+            "--format", "both",
+            "--jsonl",
+            cwd=T3_LIB_PATH,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+    except BaseException:
+        current.remove(run)
+        raise
+    run["process"] = process
+    if run["stopped"]:
+        process.send_signal(signal.SIGTERM)
+    spent = 0
+    complete = None
+    try:
+        while True:
+            line = await process.stdout.readline()
+            if not line:
+                break
+            try:
+                evt = loads(line)
+            except ValueError:
+                continue
+            if evt.get("event") == "page_done":
+                tokens = evt["input_tokens"] + evt["output_tokens"]
+                if tokens:
+                    await add_warm_pool_usage(date.today().isoformat(), evt["input_tokens"], evt["output_tokens"])
+                    spent += tokens
+                if spent >= budget_left and process.returncode is None:
+                    run["stopped"] = True
+                    process.send_signal(signal.SIGTERM)
+            elif evt.get("event") == "complete":
+                complete = evt
+        await process.wait()
+    finally:
+        if process.returncode is None:
+            # The worker itself was cancelled (server shutdown)
+            process.kill()
+        current.remove(run)
+
+    if process.returncode != 0 or complete is None:
+        return "stopped" if run["stopped"] else "failed"
+
+    manifest = {
+        "archetype": archetype,
+        "company": spec["company"],
+        "page_set": page_set,
+        "pages_dir": slugify(spec["company"]),
+        "placeholders": config.get("placeholders", {}),
+        "pages": complete["total"],
+        # Pages from the page cache cost nothing in this run, so after an
+        # interrupted build this is less than the whole library cost
+        "input_tokens": complete["total_input_tokens"],
+        "output_tokens": complete["total_output_tokens"],
+        "created_at": datetime.now().isoformat(),
+    }
+    with open(os.path.join(build, LIBRARY_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    # Jobs personalizing from the previous version finish reading it first
+    while readers.get(target):
+        await asyncio.sleep(READERS_CHECK_SEC)
+    swapping.add(target)
+    try:
+        await asyncio.to_thread(_replace_dir, build, target)
+    finally:
+        swapping.discard(target)
+    return "completed"
+
+
+async def run_worker(config: dict, is_idle):
+    """Build libraries whenever is_idle() has been true for IDLE_SEC. Runs until cancelled."""
+    if not config.get("archetypes") or config.get("daily_token_budget", 0) <= 0:
+        return
+    idle_since = None
+    while True:
+        await asyncio.sleep(CHECK_SEC)
+        if not is_idle():
+            idle_since = None
+            continue
+        if idle_since is None:
+            idle_since = time.monotonic()
+        if time.monotonic() - idle_since < IDLE_SEC:
+            continue
+        budget_left = config["daily_token_budget"] - await warm_pool_tokens(date.today().isoformat())
+        target = next_target(config)
+        # A job may have started while the budget was looked up
+        if budget_left <= 0 or target is None or not is_idle():
+            continue
+        result = await build_library(config, *target, budget_left)
+        if result == "failed":
+            await asyncio.sleep(RETRY_SEC)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Bytes and CPU per full-job page listing and event stream, per JSON codec and encoding.
+
+Builds the /api/jobs/{id}/pages response of a full job (20 rendered pages
+with German placeholder text) and the SSE payloads of its events, then
+measures for the standard library json and orjson (if installed), with and
+without the raw page bodies, uncompressed, gzip and brotli (if installed):
+serialized bytes and CPU milliseconds per listing. Offline, no API calls:
+
+    python benchmarks/bench_json.py --iterations 200
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend.app import _log_frame, _page_entry  # noqa: E402
+from t3_content_library.loader import load_all_structures  # noqa: E402
+from t3_content_library.renderer import render_page  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+WORDS = (
+    "Seit über Jahren steht unser Familienbetrieb in München für frische ehrliche Küche wir verwenden "
+    "regionale Zutaten backen Brot selbst und freuen uns jeden Gast Team Qualität Service Beratung "
+    "Leistungen Termin Angebot Erfahrung individuell zuverlässig modern Tradition Handwerk Kunden "
+    "Projekte Lösungen nachhaltig persönlich gemeinsam Zukunft Region Öffnungszeiten Kontakt"
+).split()
+
+
+def text(rng: random.Random, sentences: int = 5) -> str:
+    """Placeholder prose that compresses like real text, not like a repeated sentence."""
+    return " ".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 16))).capitalize() + "."
+        for _ in range(sentences)
+    )
+
+
+def listing(structures: list[dict]) -> dict:
+    rng = random.Random(0)
+    pages = []
+    for structure in structures:
+        ces = [dict(ce, content=text(rng)) for ce in structure["content_elements"]]
+        markdown = render_page(structure["page"], ces, "Restaurant La Bella Vista", image_keywords=["restaurant"])
+        pages.append(_page_entry(f"la-bella-vista/{structure['id']}.md", markdown))
+    return {"pages": pages}
+
+
+def events(structures: list[dict]) -> list[str]:
+    lines = [
+        json.dumps({
+            "event": "page_done", "title": s["page"]["title"], "language": "de", "style": None,
+            "done": n, "total": len(structures), "input_tokens": 1200, "output_tokens": 900,
+            "cached": False, "reused_from": None,
+        }, ensure_ascii=False)
+        for n, s in enumerate(structures, 1)
+    ]
+    return lines
+
+
+def codecs():
+    result = {"json": lambda obj: json.dumps(obj, ensure_ascii=False).encode("utf-8")}
+    if orjson is not None:
+        result["orjson"] = orjson.dumps
+    return result
+
+
+def encodings():
+    result = {"identity": lambda data: data, "gzip": lambda data: gzip.compress(data, 6)}
+    if brotli is not None:
+        result["br"] = lambda data: brotli.compress(data, quality=5)
+    return result
+
+
+def cpu_ms(fn, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--set", dest="page_set", default="full")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    structure_dir = os.path.join(os.path.dirname(__file__), "..", "config", "structure")
+    structures = load_all_structures(structure_dir, page_set=args.page_set)
+    full = listing(structures)
+    slim = {"pages": [{k: v for k, v in page.items() if k != "raw"} for page in full["pages"]]}
+
+    print(f"Page listing, {len(structures)} pages, per request")
+    print(f"{'codec':<7} {'raw':<4} {'encoding':<9} {'bytes':>9} {'cpu ms':>8}")
+    for codec, dumps in codecs().items():
+        for label, body in (("yes", full), ("no", slim)):
+            for encoding, compress in encodings().items():
+                size = len(compress(dumps(body)))
+                ms = cpu_ms(lambda: compress(dumps(body)), args.iterations)
+                print(f"{codec:<7} {label:<4} {encoding:<9} {size:>9,} {ms:>8.3f}")
+
+    # Per SSE client: every event parsed and re-encoded, or the payload built once when read
+    lines = events(structures)
+    frames = [_log_frame(line, json.loads(line)) for line in lines]
+    print(f"\nEvent stream, {len(lines)} page_done events, per client")
+    reencode = cpu_ms(
+        lambda: [f"data: {json.dumps({'type': 'log', 'event': json.loads(line)})}\n\n" for line in lines],
+        args.iterations,
+    )
+    prebuilt = cpu_ms(lambda: "".join(f"data: {frame}\n\n" for frame in frames), args.iterations)
+    print(f"parse + json.dumps per client: {reencode:.3f} ms")
+    print(f"payloads encoded once:         {prebuilt:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
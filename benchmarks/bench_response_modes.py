@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Compare the markers and tool response modes against the live API.
+
+For every page of a page set, each mode is requested --runs times. Reported
+per mode: first-pass parse failure rate (pages with at least one missing or
+invalid element before the repair call), tokens and latency.
+
+Needs ANTHROPIC_API_KEY and costs real tokens:
+
+    python benchmarks/bench_response_modes.py --set small --runs 2
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import anthropic  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+
+from t3_content_library.generator import DEFAULT_MODEL, RESPONSE_MODES, _request_elements  # noqa: E402
+from t3_content_library.loader import load_all_structures  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--company", default="Italienisches Restaurant La Bella Vista in München")
+    parser.add_argument("--set", dest="page_set", default="small")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    args = parser.parse_args()
+
+    load_dotenv()
+    structure_dir = os.path.join(os.path.dirname(__file__), "..", "config", "structure")
+    structures = load_all_structures(structure_dir, page_set=args.page_set)
+    client = anthropic.Anthropic()
+
+    print(f"{'mode':<8} {'calls':>5} {'failures':>9} {'missing CEs':>11} {'input tok':>10} "
+          f"{'output tok':>10} {'p50 s':>7} {'p95 s':>7}")
+    for mode in RESPONSE_MODES:
+        failures = missing_total = input_tokens = output_tokens = 0
+        latencies = []
+        for _ in range(args.runs):
+            for structure in structures:
+                numbers = list(range(1, len(structure["content_elements"]) + 1))
+                start = time.perf_counter()
+                texts, _, usage = _request_elements(
+                    structure, args.company, numbers, args.model, client, mode
+                )
+                latencies.append(time.perf_counter() - start)
+                missing = len(numbers) - len(texts)
+                failures += missing > 0
+                missing_total += missing
+                input_tokens += usage["input_tokens"]
+                output_tokens += usage["output_tokens"]
+
+        calls = len(latencies)
+        p95 = sorted(latencies)[max(0, int(calls * 0.95) - 1)]
+        print(f"{mode:<8} {calls:>5} {failures / calls:>8.1%} {missing_total:>11} {input_tokens:>10,} "
+              f"{output_tokens:>10,} {statistics.median(latencies):>7.2f} {p95:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
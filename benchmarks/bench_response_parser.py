@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Throughput benchmark for the ===CE:N=== response parser.
+
+Compares the incremental ResponseParser (whole text and streamed in small
+chunks) against the previous split()-based parsing.
+
+    python benchmarks/bench_response_parser.py
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from t3_content_library.response_parser import ResponseParser, parse_response  # noqa: E402
+
+ELEMENTS = 8
+PARAGRAPH = (
+    "Seit über 20 Jahren steht unser Team für Qualität, Verlässlichkeit und "
+    "persönliche Beratung. **Ihr Erfolg** ist unser Anspruch.\n\n"
+)
+
+
+def build_response(paragraphs: int) -> str:
+    text = ""
+    for n in range(1, ELEMENTS + 1):
+        text += f"===CE:{n}===\n## Abschnitt {n}\n\n" + PARAGRAPH * paragraphs
+    return text + "===IMAGES===\nmodern office team\nbusiness meeting\n"
+
+
+def split_parse(raw: str) -> list[str]:
+    """The split()-based parsing used before ResponseParser."""
+    if "===IMAGES===" in raw:
+        raw, _ = raw.split("===IMAGES===", 1)
+    sections = re.split(r"===CE:\d+===\s*", raw)
+    return [s.strip() for s in sections if s.strip()]
+
+
+def chunked_parse(raw: str, chunk_size: int) -> ResponseParser:
+    parser = ResponseParser(list(range(1, ELEMENTS + 1)))
+    for pos in range(0, len(raw), chunk_size):
+        parser.feed(raw[pos:pos + chunk_size])
+    return parser.close()
+
+
+def measure(fn, raw: str, min_time: float = 0.5) -> float:
+    runs = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_time:
+        fn(raw)
+        runs += 1
+    elapsed = time.perf_counter() - start
+    return len(raw.encode("utf-8")) * runs / elapsed / 1_000_000
+
+
+def main():
+    expected = list(range(1, ELEMENTS + 1))
+    print(f"{'response size':>14}  {'split()':>10}  {'whole':>10}  {'chunks 16':>10}  {'chunks 256':>10}")
+    for paragraphs in (1, 10, 100):
+        raw = build_response(paragraphs)
+        results = [
+            measure(split_parse, raw),
+            measure(lambda r: parse_response(r, expected), raw),
+            measure(lambda r: chunked_parse(r, 16), raw),
+            measure(lambda r: chunked_parse(r, 256), raw),
+        ]
+        size = f"{len(raw) / 1024:.1f} KiB"
+        print(f"{size:>14}  " + "  ".join(f"{mb:>7.1f} MB/s" for mb in results))
+
+
+if __name__ == "__main__":
+    main()
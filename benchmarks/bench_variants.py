@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Compare one variants call against separate calls per style on the live API.
+
+For every page of a page set, all selected styles are requested once via
+generate_variants_for_page and once as one generate_content_for_page call
+per style. Reported per approach: tokens, cost and latency, plus the cost
+of each variant beyond the first.
+
+Needs ANTHROPIC_API_KEY and costs real tokens:
+
+    python benchmarks/bench_variants.py --set small --styles warm,modern,elegant
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import anthropic  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+
+from t3_content_library.generator import (  # noqa: E402
+    DEFAULT_MODEL,
+    PRICING,
+    generate_content_for_page,
+    generate_variants_for_page,
+)
+from t3_content_library.loader import load_all_structures, load_styles  # noqa: E402
+
+
+def cost(input_tokens: int, output_tokens: int) -> float:
+    return input_tokens / 1_000_000 * PRICING["input"] + output_tokens / 1_000_000 * PRICING["output"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--company", default="Italienisches Restaurant La Bella Vista in München")
+    parser.add_argument("--set", dest="page_set", default="small")
+    parser.add_argument("--styles", default="warm,modern,elegant")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    args = parser.parse_args()
+
+    load_dotenv()
+    config_dir = os.path.join(os.path.dirname(__file__), "..", "config")
+    structures = load_all_structures(os.path.join(config_dir, "structure"), page_set=args.page_set)
+    all_styles = load_styles(os.path.join(config_dir, "styles"))
+    styles = {key: all_styles[key] for key in args.styles.split(",")}
+    client = anthropic.Anthropic()
+
+    results = {}
+    for approach in ("variants", "separate"):
+        input_tokens = output_tokens = 0
+        start = time.perf_counter()
+        for structure in structures:
+            if approach == "variants":
+                _, usage, _ = generate_variants_for_page(
+                    structure, args.company, styles, model=args.model, client=client
+                )
+                usages = [usage]
+            else:
+                usages = [
+                    generate_content_for_page(structure, args.company, model=args.model, client=client, style=style)[1]
+                    for style in styles.values()
+                ]
+            input_tokens += sum(u["input_tokens"] for u in usages)
+            output_tokens += sum(u["output_tokens"] for u in usages)
+        results[approach] = (input_tokens, output_tokens, time.perf_counter() - start)
+
+    print(f"{len(structures)} pages x {len(styles)} styles")
+    print(f"{'approach':<9} {'input tok':>10} {'output tok':>10} {'cost $':>8} {'wall s':>8}")
+    for approach, (input_tokens, output_tokens, wall) in results.items():
+        print(f"{approach:<9} {input_tokens:>10,} {output_tokens:>10,} "
+              f"{cost(input_tokens, output_tokens):>8.4f} {wall:>8.1f}")
+
+    together, separate = cost(*results["variants"][:2]), cost(*results["separate"][:2])
+    single = separate / len(styles)
+    if len(styles) > 1:
+        extra = (together - single) / (len(styles) - 1)
+        print(f"\nCost per additional variant: ${extra:.4f} vs ${single:.4f} for a separate job "
+              f"({extra / single:.0%})")
+
+
+if __name__ == "__main__":
+    main()
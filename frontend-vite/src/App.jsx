@@ -55,9 +55,25 @@ const PAGE_SETS = [
 
 const PAGE_SET_COUNTS = { small: 8, medium: 15, full: 20 }
 
+// Backoff of the status poll while the ETag does not change
+const POLL_MIN_DELAY_MS = 1000
+const POLL_MAX_DELAY_MS = 30000
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms))
+
+const LANGUAGE_OPTIONS = [
+  { value: 'de', label: 'Deutsch' },
+  { value: 'de,en', label: 'Deutsch + Englisch' },
+  { value: 'de,en,fr', label: 'Deutsch + Englisch + Französisch' },
+]
+
 export default function App() {
   const [company, setCompany] = useState('')
   const [pageSet, setPageSet] = useState('full')
+  const [languages, setLanguages] = useState('de')
+  const [styles, setStyles] = useState([])
+  const [variants, setVariants] = useState('')
+  const [activeStyle, setActiveStyle] = useState(null)
   const [lookupCode, setLookupCode] = useState('')
   const [lookupError, setLookupError] = useState(null)
   const [lookupLoading, setLookupLoading] = useState(false)
@@ -70,20 +86,23 @@ export default function App() {
   const [pages, setPages] = useState([])
   const [selectedPage, setSelectedPage] = useState(null)
   const [error, setError] = useState(null)
-  const [tokens, setTokens] = useState({ input: 0, output: 0, cost: 0, duration: 0 })
+  const [tokens, setTokens] = useState({ input: 0, output: 0, cost: 0, duration: 0, reused: 0, saved: 0 })
   const [elapsed, setElapsed] = useState(0)
   const [model, setModel] = useState(null)
   const startTimeRef = useRef(null)
   const timerRef = useRef(null)
   const eventSourceRef = useRef(null)
 
+  const variantKeys = variants === 'all' ? styles.map(s => s.key) : variants ? [variants] : []
+
   const loadPages = useCallback(async (jid) => {
     try {
-      const res = await fetch(`${API_BASE}/api/jobs/${jid}/pages`)
+      const res = await fetch(`${API_BASE}/api/jobs/${jid}/pages?raw=false`)
       const data = await res.json()
       if (data.pages?.length > 0) {
         setPages(data.pages)
         setSelectedPage(data.pages[0])
+        setActiveStyle(data.pages[0].meta?.style || null)
       }
     } catch (err) {
       console.error('Failed to load pages:', err)
@@ -91,20 +110,44 @@ export default function App() {
   }, [])
 
   const pollStatus = useCallback(async (jid) => {
-    const interval = setInterval(async () => {
+    // Long poll: the backend holds each request until the status version changes (max. 30 s).
+    // Jobs no longer in the backend's memory answer at once, so an unchanged
+    // ETag (304) that came back right away waits before asking again, longer each time.
+    let version = null
+    let etag = null
+    let delay = POLL_MIN_DELAY_MS
+    while (true) {
       try {
-        const res = await fetch(`${API_BASE}/api/jobs/${jid}`)
+        const query = version === null ? '' : `?wait=30&since=${version}`
+        const started = Date.now()
+        const res = await fetch(`${API_BASE}/api/jobs/${jid}${query}`, {
+          headers: etag ? { 'If-None-Match': etag } : {},
+        })
+        if (res.status === 304) {
+          if (Date.now() - started < delay) {
+            await sleep(delay)
+            delay = Math.min(delay * 2, POLL_MAX_DELAY_MS)
+          }
+          continue
+        }
+        if (!res.ok) { setError(`HTTP ${res.status}`); return }
         const data = await res.json()
+        etag = res.headers.get('ETag')
+        delay = POLL_MIN_DELAY_MS
+        version = data.version
         setStatus(data.status)
         setProgress(data.progress)
         setPagesDone(data.pages_done)
         if (data.current_page) setCurrentPage(data.current_page)
         setTokens(t => ({ ...t, input: data.input_tokens, output: data.output_tokens, cost: data.cost_usd }))
 
-        if (data.status === 'completed') { clearInterval(interval); loadPages(jid) }
-        else if (data.status === 'failed') { clearInterval(interval); setError(data.error || 'Generation fehlgeschlagen') }
-      } catch { clearInterval(interval) }
-    }, 2000)
+        if (data.status === 'pending' || data.status === 'running') continue
+        if (data.status === 'failed') setError(data.error || 'Generation fehlgeschlagen')
+        else if (data.status === 'expired') setError('Ergebnisse wurden bereits gelöscht')
+        else loadPages(jid)
+        return
+      } catch { return }
+    }
   }, [loadPages])
 
   const handleGenerate = useCallback(async () => {
@@ -112,7 +155,7 @@ export default function App() {
 
     setError(null); setStatus('pending'); setProgress(0)
     setPagesDone(0); setCurrentPage(''); setCompletedPages([]); setPages([]); setSelectedPage(null)
-    setTokens({ input: 0, output: 0, cost: 0, duration: 0 })
+    setTokens({ input: 0, output: 0, cost: 0, duration: 0, reused: 0, saved: 0 })
     startTimeRef.current = Date.now()
     setElapsed(0)
 
@@ -124,7 +167,12 @@ export default function App() {
       const res = await fetch(`${API_BASE}/api/generate`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ company: company.trim(), page_set: pageSet }),
+        body: JSON.stringify({
+          company: company.trim(),
+          page_set: pageSet,
+          languages: languages.split(','),
+          variants: variantKeys,
+        }),
       })
 
       if (!res.ok) throw new Error(`HTTP ${res.status}`)
@@ -159,13 +207,20 @@ export default function App() {
         if (msg.type === 'done') {
           es.close()
           clearInterval(timerRef.current)
-          if (msg.status === 'completed') {
+          if (msg.status === 'cancelled') {
+            // Pages finished before the cancel are kept
+            setStatus('cancelled')
+            setTokens(t => ({ ...t, input: msg.input_tokens || 0, output: msg.output_tokens || 0, cost: msg.cost_usd || 0 }))
+            loadPages(data.job_id)
+          } else if (msg.status === 'completed') {
             setStatus('completed'); setProgress(100)
             setTokens({
               input: msg.input_tokens || 0,
               output: msg.output_tokens || 0,
               cost: msg.cost_usd || 0,
               duration: msg.duration_sec || 0,
+              reused: msg.reused_pages || 0,
+              saved: msg.saved_cost_usd || 0,
             })
             loadPages(data.job_id)
           } else {
@@ -181,13 +236,26 @@ export default function App() {
       setError(`Verbindungsfehler: ${err.message}. Läuft das Backend auf ${API_BASE || 'localhost:8000'}?`)
       setStatus(null)
     }
-  }, [company, pageSet, loadPages, pollStatus])
+  }, [company, pageSet, languages, variantKeys, loadPages, pollStatus])
+
+  const handleCancel = useCallback(async () => {
+    if (!jobId) return
+    try {
+      await fetch(`${API_BASE}/api/jobs/${jobId}`, { method: 'DELETE' })
+    } catch (err) {
+      console.error('Failed to cancel job:', err)
+    }
+  }, [jobId])
 
   useEffect(() => {
     fetch(`${API_BASE}/api/health`)
       .then(r => r.json())
       .then(d => { if (d.model) setModel(d.model) })
       .catch(() => {})
+    fetch(`${API_BASE}/api/styles`)
+      .then(r => r.json())
+      .then(setStyles)
+      .catch(() => {})
     return () => {
       if (eventSourceRef.current) eventSourceRef.current.close()
       if (timerRef.current) clearInterval(timerRef.current)
@@ -225,6 +293,8 @@ export default function App() {
         output: data.output_tokens || 0,
         cost: data.cost_usd || 0,
         duration: data.duration_sec || 0,
+        reused: data.reused_pages || 0,
+        saved: data.saved_cost_usd || 0,
       })
       setError(null)
       setCompletedPages([])
@@ -239,7 +309,11 @@ export default function App() {
   }, [lookupCode, loadPages])
 
   const isRunning = status === 'pending' || status === 'running'
-  const isCompleted = status === 'completed'
+  const pagesTotal = PAGE_SET_COUNTS[pageSet] * languages.split(',').length * Math.max(variantKeys.length, 1)
+  // Variants of a page share its slug; the list shows one variant at a time
+  const listedPages = pages.filter(p => !p.meta?.style || p.meta.style === activeStyle)
+  const pageVariants = selectedPage ? pages.filter(p => p.meta?.style && p.slug === selectedPage.slug) : []
+  const isCompleted = status === 'completed' || status === 'cancelled'
 
   return (
     <div className="app-container">
@@ -294,6 +368,28 @@ export default function App() {
               <option key={s.value} value={s.value}>{s.label}</option>
             ))}
           </select>
+          <select
+            className="select-page-set"
+            value={variants}
+            onChange={e => { setVariants(e.target.value); if (e.target.value) setLanguages('de') }}
+            disabled={isRunning || styles.length === 0}
+          >
+            <option value="">Standardstil</option>
+            <option value="all">Alle Stile als Varianten</option>
+            {styles.map(s => (
+              <option key={s.key} value={s.key} title={s.description}>{s.name}</option>
+            ))}
+          </select>
+          <select
+            className="select-page-set"
+            value={languages}
+            onChange={e => setLanguages(e.target.value)}
+            disabled={isRunning || variants !== ''}
+          >
+            {LANGUAGE_OPTIONS.map(l => (
+              <option key={l.value} value={l.value}>{l.label}</option>
+            ))}
+          </select>
           <button className="btn-generate" onClick={handleGenerate} disabled={isRunning || !company.trim()}>
             {isRunning
               ? <><span className="spinner" />Generiert...</>
@@ -310,12 +406,13 @@ export default function App() {
           <div className="progress-header">
             <div className="progress-title"><span className="spinner" />Seiten werden generiert</div>
             <span className="progress-pct">{progress}%</span>
+            <button className="btn-download secondary" onClick={handleCancel} disabled={!jobId}>Abbrechen</button>
           </div>
           <div className="progress-bar-track">
             <div className="progress-bar-fill" style={{ width: `${Math.max(progress, 2)}%` }} />
           </div>
           <div className="progress-stats">
-            <span>{pagesDone}/{PAGE_SET_COUNTS[pageSet]} Seiten</span>
+            <span>{pagesDone}/{pagesTotal} Seiten</span>
             <span>{elapsed}s</span>
             {tokens.input > 0 && <span>{formatTokens(tokens.input + tokens.output)} Tokens</span>}
           </div>
@@ -327,7 +424,7 @@ export default function App() {
                   <IconCheck />{title}
                 </span>
               ))}
-              {pagesDone < PAGE_SET_COUNTS[pageSet] && currentPage && (
+              {pagesDone < pagesTotal && currentPage && (
                 <span className="page-chip active">
                   <span className="spinner-sm" />{currentPage}
                 </span>
@@ -343,12 +440,17 @@ export default function App() {
             <div className="results-title">
               <IconCheck />
               Generierte Seiten
-              <span className="results-count">{pages.length} Seiten</span>
+              <span className="results-count">{listedPages.length} Seiten{status === 'cancelled' && ' · abgebrochen'}</span>
               {jobId && <span className="job-code">{jobId}</span>}
             </div>
-            <a className="btn-download" href={`${API_BASE}/api/jobs/${jobId}/download`} download>
-              <IconDownload />Als ZIP herunterladen
-            </a>
+            <div className="download-group">
+              <a className="btn-download" href={`${API_BASE}/api/jobs/${jobId}/download`} download>
+                <IconDownload />Als ZIP herunterladen
+              </a>
+              <a className="btn-download secondary" href={`${API_BASE}/api/jobs/${jobId}/bundle${activeStyle ? `?style=${encodeURIComponent(activeStyle)}` : ''}`} download>
+                <IconDownload />Import-Bundle (JSONL)
+              </a>
+            </div>
           </div>
 
           <div className="stats-bar">
@@ -368,18 +470,26 @@ export default function App() {
               <span className="stat-label">Kosten</span>
               <span className="stat-value cost">${tokens.cost.toFixed(4)}</span>
             </div>
+            {tokens.reused > 0 && (
+              <div className="stat-item">
+                <span className="stat-label">Übernommen ({tokens.reused} Seiten)</span>
+                <span className="stat-value cost">-${tokens.saved.toFixed(4)}</span>
+              </div>
+            )}
           </div>
 
           <div className="pages-layout">
             <div className="page-list">
-              {pages.map((page, i) => (
+              {listedPages.map((page, i) => (
                 <div
                   key={i}
                   className={`page-item ${selectedPage === page ? 'active' : ''}`}
                   onClick={() => setSelectedPage(page)}
                 >
                   <div className="page-item-title">{page.title}</div>
-                  <div className="page-item-meta">{page.slug || page.filename}</div>
+                  <div className="page-item-meta">
+                    {page.meta?.language && `${page.meta.language.toUpperCase()} · `}{page.slug || page.filename}
+                  </div>
                 </div>
               ))}
             </div>
@@ -393,6 +503,19 @@ export default function App() {
                     {selectedPage.meta?.nav_position != null && <span className="meta-tag">Nav: {selectedPage.meta.nav_position}</span>}
                     <span className="meta-tag">{selectedPage.filename}</span>
                   </div>
+                  {pageVariants.length > 1 && (
+                    <div className="variant-switch">
+                      {pageVariants.map(p => (
+                        <button
+                          key={p.path}
+                          className={`variant-btn ${p === selectedPage ? 'active' : ''}`}
+                          onClick={() => { setSelectedPage(p); setActiveStyle(p.meta.style) }}
+                        >
+                          {styles.find(s => s.key === p.meta.style)?.name || p.meta.style}
+                        </button>
+                      ))}
+                    </div>
+                  )}
                   <h2 className="preview-title">{selectedPage.title}</h2>
                   <div className="preview-content">{renderContent(selectedPage.content)}</div>
                 </>
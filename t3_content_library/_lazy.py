@@ -0,0 +1,24 @@
+import importlib
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    Keeps heavy dependencies (the Anthropic SDK pulls in httpx and pydantic)
+    off the import path of code that never uses them, e.g. `--help` or a run
+    served entirely from the page cache. Tests can still patch the module
+    attribute that holds the proxy.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
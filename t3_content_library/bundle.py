@@ -0,0 +1,55 @@
+import json
+import os
+import threading
+
+BUNDLE_FILENAME = "bundle.jsonl"
+
+
+class BundleWriter:
+    """Append-only JSON Lines bundle, one record per page.
+
+    Records are written and flushed as soon as a page is done, so a large
+    library never has to be held in memory and a partial bundle is usable
+    while generation is still running. Safe to share between threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, record: str) -> None:
+        with self._lock:
+            self._file.write(record)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def read_bundle(path: str):
+    """Yield the records of a bundle one at a time."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def find_bundle_record(path: str, slug: str) -> dict | None:
+    """Return the record of the page with the given slug, or None."""
+    for record in read_bundle(path):
+        if record["page"]["slug"] == slug:
+            return record
+    return None
+
+
+def replace_bundle_record(path: str, slug: str, record: str) -> None:
+    """Replace the record of the page with the given slug, streaming line by line."""
+    tmp_path = f"{path}.tmp"
+    with open(path, "r", encoding="utf-8") as src, open(tmp_path, "w", encoding="utf-8") as dst:
+        for line in src:
+            if line.strip() and json.loads(line)["page"]["slug"] == slug:
+                line = record
+            dst.write(line)
+    os.replace(tmp_path, path)
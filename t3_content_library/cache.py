@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import time
+
+
+def page_cache_key(
+    structure: dict,
+    company_description: str,
+    model: str,
+    response_mode: str,
+    styles: dict[str, dict] | None = None,
+    context: str | None = None,
+) -> str:
+    """Key identifying one generated page: same inputs, same API call.
+
+    styles are the content styles of a variants call; editing a style
+    definition therefore invalidates its pages. context is the summary of the
+    pages this page depends on, so it follows changes to those pages.
+    """
+    inputs = {
+        "structure": structure,
+        "company": " ".join(company_description.split()).casefold(),
+        "model": model,
+        "response_mode": response_mode,
+    }
+    if styles:
+        inputs["styles"] = styles
+    if context:
+        inputs["context"] = context
+    payload = json.dumps(
+        inputs,
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def translation_cache_key(page: dict, content_elements: list[dict], language: str, model: str) -> str:
+    """Key identifying one translated page: same source text, same translation."""
+    payload = json.dumps(
+        {
+            "title": page["title"],
+            "content_elements": content_elements,
+            "language": language,
+            "model": model,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PageCache:
+    """On-disk page cache with single-flight generation.
+
+    Entries are JSON files named by key. While a page is generated, a lock
+    file marks the key as in flight; other threads and processes (e.g. two
+    backend jobs with overlapping page sets) asking for the same key wait for
+    that result instead of making the same API call again. A lock whose
+    process is gone (e.g. a run killed after it ignored SIGTERM) or that is
+    older than lock_timeout seconds is treated as abandoned.
+    """
+
+    def __init__(self, directory: str, lock_timeout: float = 600, poll_interval: float = 0.2):
+        self.directory = directory
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _lock_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.lock")
+
+    def get(self, key: str) -> dict | None:
+        """Return the cached value for key, or None."""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key: str, value: dict) -> None:
+        """Store value for key atomically."""
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+
+    def get_or_create(self, key: str, create, refresh: bool = False) -> tuple[dict, bool]:
+        """Return (value, created). create() runs at most once per key at a time.
+
+        refresh=True ignores a stored value and replaces it with a new one; a
+        flight already in progress is still awaited and its result used.
+        """
+        waited = False
+        while True:
+            value = self.get(key) if waited or not refresh else None
+            if value is not None:
+                return value, False
+            if self._acquire(key):
+                try:
+                    # Another flight may have finished between get() and _acquire()
+                    value = self.get(key) if waited or not refresh else None
+                    if value is not None:
+                        return value, False
+                    value = create()
+                    self.put(key, value)
+                    return value, True
+                finally:
+                    os.remove(self._lock_path(key))
+            self._wait(key)
+            waited = True
+
+    def _acquire(self, key: str) -> bool:
+        try:
+            fd = os.open(self._lock_path(key), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        return True
+
+    def _owner_alive(self, lock_path: str) -> bool:
+        """Whether the process that wrote the lock still runs (True while unknown)."""
+        try:
+            with open(lock_path, "r", encoding="utf-8") as f:
+                pid = int(f.read())
+        except (OSError, ValueError):
+            # Gone, or created but its pid not written yet
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _wait(self, key: str) -> None:
+        lock_path = self._lock_path(key)
+        while True:
+            try:
+                age = time.time() - os.path.getmtime(lock_path)
+            except FileNotFoundError:
+                return
+            if age > self.lock_timeout or not self._owner_alive(lock_path):
+                try:
+                    os.remove(lock_path)
+                except FileNotFoundError:
+                    pass
+                return
+            time.sleep(self.poll_interval)
@@ -1,17 +1,56 @@
 import json
 import os
 import re
+import signal
 import threading
 import time
 
-import anthropic
 import click
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from dotenv import load_dotenv
 
-from t3_content_library.loader import load_all_structures
-from t3_content_library.generator import generate_content_for_page, PRICING
-from t3_content_library.renderer import render_page
+from t3_content_library._lazy import LazyModule
+from t3_content_library.bundle import BUNDLE_FILENAME, BundleWriter, find_bundle_record, replace_bundle_record
+from t3_content_library.cache import PageCache, page_cache_key, translation_cache_key
+from t3_content_library.jsoncodec import dumps
+from t3_content_library.loader import load_all_structures, load_styles, reusable_structure
+from t3_content_library.generator import (
+    generate_content_for_page,
+    generate_variants_for_page,
+    regenerate_elements,
+    summarize_page,
+    translate_page,
+    DEFAULT_MODEL,
+    LANGUAGES,
+    PRICING,
+    RESPONSE_MODES,
+    SOURCE_LANGUAGE,
+)
+from t3_content_library.personalize import extract_company_facts, personalize_page
+from t3_content_library.profiling import PROFILE_DIRNAME, RunProfiler
+from t3_content_library.renderer import PAGE_META_KEYS, render_page, render_bundle_record, parse_page
+from t3_content_library.schedule import critical_path, dependency_graph, run_graph
+from t3_content_library.search import SearchIndex
+from t3_content_library.similarity import CompanyIndex
+
+# Only imported once a page actually has to be generated
+anthropic = LazyModule("anthropic")
+
+# Companies seen by runs using a cache dir, for --reuse-similar
+COMPANY_INDEX = "companies.db"
+
+# Describes a pre-generated library for --personalize, written next to its pages
+LIBRARY_MANIFEST = "library.json"
+
+# Signals that cancel a generation run (Ctrl+C, or DELETE /api/jobs/{id} in the backend)
+CANCEL_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+
+class RunCancelled(Exception):
+    """Raised in the main thread when a cancel signal arrives."""
+
+    def __init__(self, signum: int):
+        super().__init__(f"Cancelled by signal {signum}")
+        self.signum = signum
 
 
 def slugify(text: str) -> str:
@@ -23,6 +62,158 @@ def slugify(text: str) -> str:
     return text[:50].strip("-")
 
 
+def page_filename(page: dict) -> str:
+    """Markdown filename for a page, derived from its slug."""
+    return f"{page['slug'].strip('/').replace('/', '-') or 'index'}.md"
+
+
+def parse_regenerate_target(value: str) -> tuple[str, list[int]]:
+    """Parse a --regenerate value of the form SLUG:N[,N...]."""
+    slug, sep, numbers = value.rpartition(":")
+    if not sep or not slug:
+        raise click.BadParameter(f"'{value}' is not of the form SLUG:N[,N...]", param_hint="--regenerate")
+    try:
+        return slug.strip("/"), [int(n) for n in numbers.split(",") if n.strip()]
+    except ValueError:
+        raise click.BadParameter(f"'{numbers}' is not a list of element numbers", param_hint="--regenerate")
+
+
+def find_structure(structures: list[dict], slug: str) -> dict | None:
+    """Find a page structure by its slug or by its output filename."""
+    for structure in structures:
+        page = structure["page"]
+        if slug in (page["slug"].strip("/"), page_filename(page)[:-3]):
+            return structure
+    return None
+
+
+def parse_languages(value: str) -> list[str]:
+    """Parse a --languages value; the source language always comes first."""
+    languages = [SOURCE_LANGUAGE]
+    for language in value.split(","):
+        language = language.strip().lower()
+        if not language:
+            continue
+        if language not in LANGUAGES:
+            raise click.BadParameter(
+                f"Unknown language '{language}'. Available: {', '.join(LANGUAGES)}", param_hint="--languages"
+            )
+        if language not in languages:
+            languages.append(language)
+    return languages
+
+
+def parse_variants(value: str, styles: dict[str, dict]) -> dict[str, dict]:
+    """Parse a --variants value ('all' or style keys) into {key: style}."""
+    if value.strip().lower() == "all":
+        return dict(styles)
+    selected = {}
+    for key in value.split(","):
+        key = key.strip().lower()
+        if not key:
+            continue
+        if key not in styles:
+            raise click.BadParameter(
+                f"Unknown style '{key}'. Available: {', '.join(styles)}", param_hint="--variants"
+            )
+        selected[key] = styles[key]
+    return selected
+
+
+def new_stage() -> dict:
+    """Counters for one pipeline stage (generate or translate)."""
+    return {"pages": 0, "input_tokens": 0, "output_tokens": 0, "busy_sec": 0.0, "first_start": None, "last_end": None}
+
+
+def record_stage(stage: dict, started: float, usage: dict):
+    """Account one finished page to its stage. Call with the run's lock held."""
+    ended = time.time()
+    stage["pages"] += 1
+    stage["input_tokens"] += usage["input_tokens"]
+    stage["output_tokens"] += usage["output_tokens"]
+    stage["busy_sec"] += ended - started
+    if stage["first_start"] is None or started < stage["first_start"]:
+        stage["first_start"] = started
+    stage["last_end"] = ended
+
+
+def stage_summary(stage: dict) -> dict:
+    """Throughput of a stage over the time it was active."""
+    wall = stage["last_end"] - stage["first_start"] if stage["pages"] else 0.0
+    return {
+        "pages": stage["pages"],
+        "input_tokens": stage["input_tokens"],
+        "output_tokens": stage["output_tokens"],
+        "wall_sec": round(wall, 1),
+        "busy_sec": round(stage["busy_sec"], 1),
+        "pages_per_min": round(stage["pages"] / wall * 60, 1) if wall > 0 else 0.0,
+    }
+
+
+def token_cost(input_tokens: int, output_tokens: int) -> float:
+    """API cost in USD for the given token counts."""
+    return input_tokens / 1_000_000 * PRICING["input"] + output_tokens / 1_000_000 * PRICING["output"]
+
+
+def client_factory():
+    """Return (get_client, close_client) for one shared Anthropic client, created on first use.
+
+    Runs served entirely from the page cache never create a client and thus
+    never import the Anthropic SDK. close_client() closes the client's
+    connections, which aborts requests still in flight; get_client() fails
+    from then on.
+    """
+    lock = threading.Lock()
+    client = []
+    closed = []
+
+    def get_client():
+        with lock:
+            if closed:
+                raise RuntimeError("API client is closed, the run was cancelled")
+            if not client:
+                client.append(anthropic.Anthropic())
+            return client[0]
+
+    def close_client():
+        with lock:
+            closed.append(True)
+            if client:
+                client[0].close()
+
+    return get_client, close_client
+
+
+def handle_cancel_signals(on_cancel):
+    """Call on_cancel(signum) on SIGINT/SIGTERM until the returned restore function is called.
+
+    Signal handlers can only be installed from the main thread; elsewhere
+    (e.g. a run embedded in another program's worker thread) this does nothing.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return lambda: None
+    previous = {sig: signal.signal(sig, lambda signum, frame: on_cancel(signum)) for sig in CANCEL_SIGNALS}
+
+    def restore():
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+    return restore
+
+
+def print_profile(summary: dict):
+    """Short text version of a profile summary."""
+    shares = ", ".join(f"{name} {share:.0%}" for name, share in summary["categories"].items())
+    click.echo(
+        f"Profil: {summary['wall_sec']:.1f}s Wandzeit, {summary['cpu_sec']:.1f}s CPU, "
+        f"{summary['threads']} Threads, Speicher-Spitze {summary['memory_peak_mb']:.1f} MiB"
+        f"\nZeitanteile (Stack-Samples): {shares}"
+    )
+    for spot in summary["hot_spots"][:5]:
+        click.echo(f"  {spot['tottime']:8.3f}s  {spot['calls']:>7}x  {spot['function']}")
+    click.echo(f"Details: {summary['dir']}/")
+
+
 @click.command()
 @click.option(
     "--company",
@@ -53,37 +244,245 @@ def slugify(text: str) -> str:
     default=False,
     help="JSONL output for machine consumption (used by backend)",
 )
-def main(company: str, output_dir: str, parallel: int, page_set: str, jsonl: bool):
+@click.option(
+    "--regenerate",
+    "regenerate",
+    multiple=True,
+    metavar="SLUG:N[,N...]",
+    help="Nur einzelne Content-Elemente einer bereits generierten Seite neu generieren, "
+    "z.B. 'ueber-uns:2,3' (mehrfach angebbar)",
+)
+@click.option(
+    "--response-mode",
+    type=click.Choice(RESPONSE_MODES, case_sensitive=False),
+    default="markers",
+    help="Antwortformat des Modells: markers (===CE:N=== Trenner, Standard) "
+    "oder tool (strukturierte Ausgabe per Tool-Call mit JSON-Schema)",
+)
+@click.option(
+    "--cache-dir",
+    envvar="T3_CACHE_DIR",
+    default=None,
+    help="Seiten-Cache: identische Seiten werden wiederverwendet und parallele Läufe "
+    "generieren dieselbe Seite nur einmal (Env: T3_CACHE_DIR)",
+)
+@click.option(
+    "--refresh-cache",
+    is_flag=True,
+    default=False,
+    help="Seiten neu generieren statt sie aus dem Seiten-Cache zu nehmen; die neuen Seiten ersetzen "
+    "die zwischengespeicherten (benötigt --cache-dir)",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["markdown", "bundle", "both"], case_sensitive=False),
+    default="markdown",
+    help="Ausgabeformat: markdown (eine .md-Datei pro Seite, Standard), bundle "
+    f"({BUNDLE_FILENAME}, ein JSON-Datensatz pro Seite für den TYPO3-Import) oder both",
+)
+@click.option(
+    "--index-db",
+    envvar="T3_INDEX_DB",
+    default=None,
+    help="Suchindex (SQLite-Datei): jede geschriebene Seite wird darin volltextdurchsuchbar "
+    "abgelegt (Env: T3_INDEX_DB)",
+)
+@click.option(
+    "--reuse-similar",
+    is_flag=True,
+    default=False,
+    help="Firmenneutrale Seiten (z.B. AGB, Datenschutz, Sitemap) aus dem Seiten-Cache einer "
+    "sehr ähnlichen, früher generierten Firma übernehmen statt neu zu generieren (benötigt --cache-dir)",
+)
+@click.option(
+    "--reuse-threshold",
+    type=click.FloatRange(0, 1),
+    default=0.7,
+    envvar="T3_REUSE_THRESHOLD",
+    help="Mindest-Ähnlichkeit (Jaccard, 0-1) der Firmenbeschreibungen für --reuse-similar "
+    "(Standard: 0.7, Env: T3_REUSE_THRESHOLD)",
+)
+@click.option(
+    "--languages",
+    default=SOURCE_LANGUAGE,
+    help="Sprachen, kommagetrennt, z.B. 'de,en,fr'. Deutsch wird einmal generiert, jede fertige Seite "
+    "wird sofort in die übrigen Sprachen übersetzt; Ausgabe dann in einem Unterverzeichnis pro Sprache "
+    f"(verfügbar: {', '.join(LANGUAGES)}, Standard: de)",
+)
+@click.option(
+    "--variants",
+    default=None,
+    metavar="STIL[,STIL...]|all",
+    help="Jede Seite in mehreren Stilvarianten aus config/styles/ generieren, z.B. 'warm,modern' "
+    "oder 'all'. Alle Varianten einer Seite entstehen in einem API-Aufruf; Ausgabe in einem "
+    "Unterverzeichnis pro Stil",
+)
+@click.option(
+    "--personalize",
+    "library_dir",
+    default=None,
+    metavar="BIBLIOTHEK",
+    help="Seiten nicht generieren, sondern aus einer vorab generierten Branchen-Bibliothek "
+    f"(Verzeichnis mit {LIBRARY_MANIFEST}) übernehmen und deren Platzhalter durch Name und Ort "
+    "der Firma ersetzen. Kostet einen kurzen API-Aufruf statt einem pro Seite",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    help=f"Lauf profilieren (cProfile aller Threads, Stack-Sampling, tracemalloc); Ergebnisse in "
+    f"<Ausgabe>/{PROFILE_DIRNAME}/, Zusammenfassung der Hot Spots im complete-Event",
+)
+def main(
+    company: str,
+    output_dir: str,
+    parallel: int,
+    page_set: str,
+    jsonl: bool,
+    regenerate: tuple[str, ...],
+    response_mode: str,
+    cache_dir: str | None,
+    refresh_cache: bool,
+    output_format: str,
+    index_db: str | None,
+    reuse_similar: bool,
+    reuse_threshold: float,
+    languages: str,
+    variants: str | None,
+    library_dir: str | None,
+    profile: bool,
+):
     """Generiert TYPO3-Beispielseiten mit Content von Claude."""
+    if profile and (regenerate or library_dir):
+        raise click.UsageError("--profile gilt nur für Generierungsläufe, nicht für --regenerate oder --personalize")
+    profiler = RunProfiler() if profile else None
+    profiled = profiler.wrap if profiler else (lambda fn: fn)
+
+    from dotenv import load_dotenv
+
     load_dotenv()
 
     structure_dir = os.path.join(os.path.dirname(__file__), "..", "config", "structure")
-    structures = load_all_structures(structure_dir, page_set=page_set)
+    languages = parse_languages(languages)
+    style_dir = os.path.join(os.path.dirname(__file__), "..", "config", "styles")
+    styles = parse_variants(variants, load_styles(style_dir)) if variants else {}
+    if styles and (regenerate or len(languages) > 1 or response_mode != "markers"):
+        raise click.UsageError(
+            "--variants kann nicht mit --regenerate, mehreren --languages oder --response-mode tool "
+            "kombiniert werden"
+        )
+    if regenerate:
+        structures = load_all_structures(structure_dir)
+        targets = []
+        for value in regenerate:
+            slug, numbers = parse_regenerate_target(value)
+            structure = find_structure(structures, slug)
+            if structure is None:
+                raise click.BadParameter(f"Unknown page '{slug}'", param_hint="--regenerate")
+            targets.append((structure, numbers))
+        regenerate_pages(
+            company, output_dir, parallel, jsonl, targets, response_mode, cache_dir, index_db, structures
+        )
+        return
+
+    if reuse_similar and not cache_dir:
+        raise click.UsageError("--reuse-similar benötigt --cache-dir")
+    if refresh_cache and not cache_dir:
+        raise click.UsageError("--refresh-cache benötigt --cache-dir")
+    if refresh_cache and reuse_similar:
+        raise click.UsageError("--refresh-cache und --reuse-similar schließen sich aus")
+
+    # Profiled before the profiler starts, so a run rejected below leaves nothing running
+    structures = profiled(load_all_structures)(structure_dir, page_set=page_set)
+    if reuse_similar:
+        # Company-agnostic pages are written without the company's name, so
+        # they can be taken over by similar companies later
+        structures = [reusable_structure(structure) for structure in structures]
 
     if not structures:
         click.echo("Keine Seitenstrukturen gefunden in config/structure/")
         raise SystemExit(1)
 
+    if library_dir:
+        if styles or len(languages) > 1:
+            raise click.UsageError(
+                "--personalize kann nicht mit --variants oder mehreren --languages kombiniert werden"
+            )
+        if personalize_pages(company, output_dir, jsonl, library_dir, structures, output_format, index_db):
+            return
+
+    try:
+        graph = dependency_graph(structures)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    by_id = {structure["id"]: structure for structure in structures}
+    if profiler:
+        profiler.start()
+
     slug = slugify(company)
     dest = os.path.join(output_dir, slug)
-    os.makedirs(dest, exist_ok=True)
+    multilingual = len(languages) > 1
+    if styles:
+        # One directory per style variant, side by side
+        dests = {key: os.path.join(dest, key) for key in styles}
+    else:
+        # One directory per language with identical filenames, or dest itself
+        dests = {lang: os.path.join(dest, lang) if multilingual else dest for lang in languages}
+    for path in dests.values():
+        os.makedirs(path, exist_ok=True)
 
-    total = len(structures)
+    total = len(structures) * len(dests)
     lock = threading.Lock()
     counter = [0]
+    cached_pages = [0]
+    reused_pages = [0]
     total_input_tokens = [0]
     total_output_tokens = [0]
-    client = anthropic.Anthropic()
+    saved_input_tokens = [0]
+    saved_output_tokens = [0]
+    stages = {"generate": new_stage(), "translate": new_stage()}
+    durations = {}
+    translations = []
+    cancelled = []
+    get_client, close_client = client_factory()
+    cache = PageCache(cache_dir) if cache_dir else None
+    companies = CompanyIndex(os.path.join(cache_dir, COMPANY_INDEX)) if cache_dir else None
+    similar = companies.find(company, reuse_threshold) if reuse_similar else []
+    write_markdown = output_format in ("markdown", "both")
+    bundles = {
+        output: BundleWriter(os.path.join(path, BUNDLE_FILENAME))
+        for output, path in dests.items()
+    } if output_format != "markdown" else {}
+    index = SearchIndex(index_db) if index_db else None
     start_time = time.time()
 
     def emit(data):
         if jsonl:
-            click.echo(json.dumps(data, ensure_ascii=False))
+            click.echo(dumps(data))
         else:
             if data.get("event") == "page_done":
-                click.echo(f"[{data['done']}/{data['total']}] {data['title']} ok")
+                suffix = " (Cache)" if data.get("cached") else ""
+                if data.get("reused_from"):
+                    suffix = f" (übernommen von \"{data['reused_from']}\")"
+                label = f" [{data['language']}]" if multilingual else ""
+                if data.get("style"):
+                    label = f" [{data['style']}]"
+                click.echo(f"[{data['done']}/{data['total']}] {data['title']}{label} ok{suffix}")
             elif data.get("event") == "start":
-                click.echo(f"Generiere {data['total']} Seiten für \"{company}\" ({parallel}x parallel)...")
+                in_languages = f" in {len(languages)} Sprachen" if multilingual else ""
+                if styles:
+                    in_languages = f" in {len(styles)} Stilvarianten"
+                click.echo(
+                    f"Generiere {len(structures)} Seiten{in_languages} für \"{company}\" ({parallel}x parallel)..."
+                )
+            elif data.get("event") == "cancelled":
+                click.echo(
+                    f"\nAbgebrochen nach {data['done']}/{data['total']} Seiten, fertige Seiten bleiben in {dest}/"
+                    f"\nTokens: {data['total_input_tokens']:,} input / {data['total_output_tokens']:,} output"
+                    f"\nKosten: ${data['cost_usd']:.4f} | Dauer: {data['duration_sec']:.1f}s",
+                    err=True,
+                )
             elif data.get("event") == "complete":
                 cost = data['cost_usd']
                 click.echo(
@@ -91,18 +490,426 @@ def main(company: str, output_dir: str, parallel: int, page_set: str, jsonl: boo
                     f"\nTokens: {data['total_input_tokens']:,} input / {data['total_output_tokens']:,} output"
                     f"\nKosten: ${cost:.4f} | Dauer: {data['duration_sec']:.1f}s"
                 )
+                if data["reused_pages"]:
+                    click.echo(
+                        f"Übernommen: {data['reused_pages']} Seiten, gespart: "
+                        f"{data['saved_input_tokens']:,} input / {data['saved_output_tokens']:,} output "
+                        f"(${data['saved_cost_usd']:.4f})"
+                    )
+                schedule = data["schedule"]
+                if len(schedule["critical_path"]) > 1:
+                    click.echo(
+                        f"Kritischer Pfad: {schedule['critical_path_sec']:.1f}s "
+                        f"({' → '.join(schedule['critical_path'])}) von {schedule['wall_sec']:.1f}s Generierung"
+                    )
+                if data["profile"]:
+                    print_profile(data["profile"])
+                if multilingual:
+                    for name, label in (("generate", "Generieren"), ("translate", "Übersetzen")):
+                        stage = data["stages"][name]
+                        click.echo(
+                            f"{label}: {stage['pages']} Seiten, {stage['pages_per_min']:.1f} Seiten/min, "
+                            f"{stage['input_tokens']:,} input / {stage['output_tokens']:,} output"
+                        )
 
-    emit({"event": "start", "total": total, "parallel": parallel})
+    emit({
+        "event": "start",
+        "total": total,
+        "parallel": parallel,
+        "languages": languages,
+        "variants": list(styles),
+        "similar_companies": [{"company": c, "similarity": score} for c, score in similar],
+    })
+
+    def write_page(output, page, content_elements, image_keywords):
+        """Write a page to the directory of output, a language or a style key."""
+        if multilingual:
+            page = dict(page, language=output)
+        elif styles:
+            page = dict(page, style=output)
+        if write_markdown:
+            markdown = render_page(page, content_elements, company, image_keywords=image_keywords)
+            filepath = os.path.join(dests[output], page_filename(page))
+            with open(filepath, "w", encoding="utf-8") as f:
+                f.write(markdown)
+        if bundles:
+            bundles[output].write(
+                render_bundle_record(page, content_elements, company, image_keywords=image_keywords)
+            )
+        if index:
+            index.add_page(dests[output], page_filename(page), page, content_elements, company, image_keywords)
+
+    def page_done(stage, started, page, language, usage, cached, reused_from=None, saved=None, style=None):
+        with lock:
+            record_stage(stages[stage], started, usage)
+            counter[0] += 1
+            cached_pages[0] += cached
+            total_input_tokens[0] += usage["input_tokens"]
+            total_output_tokens[0] += usage["output_tokens"]
+            if reused_from:
+                reused_pages[0] += 1
+                saved_input_tokens[0] += saved["input_tokens"]
+                saved_output_tokens[0] += saved["output_tokens"]
+            if cancelled:
+                # The cancelled event stays the last line of the run
+                return
+            emit({
+                "event": "page_done",
+                "title": page["title"],
+                "language": language,
+                "style": style,
+                "done": counter[0],
+                "total": total,
+                "input_tokens": usage["input_tokens"],
+                "output_tokens": usage["output_tokens"],
+                "cached": cached,
+                "reused_from": reused_from,
+            })
+
+    def generate(structure, context):
+        if styles:
+            variants, usage, image_keywords = generate_variants_for_page(
+                structure, company, styles, client=get_client(), context=context
+            )
+            return {"variants": variants, "image_keywords": image_keywords, "usage": usage}
+        content_elements, usage, image_keywords = generate_content_for_page(
+            structure, company, client=get_client(), response_mode=response_mode, context=context
+        )
+        return {"content_elements": content_elements, "image_keywords": image_keywords, "usage": usage}
 
-    def process_page(structure):
+    def reuse(structure, context):
+        """Cached copy of a company-agnostic page from the most similar earlier company."""
+        if not structure.get("company_agnostic"):
+            return None, None
+        for other, _ in similar:
+            value = cache.get(page_cache_key(structure, other, DEFAULT_MODEL, response_mode, styles, context))
+            if value is not None:
+                return value, other
+        return None, None
+
+    def process_page(structure, upstream):
+        """Generate, write and translate one page. Returns its summary for dependent pages."""
+        started = time.time()
         page = structure["page"]
-        content_elements, usage, image_keywords = generate_content_for_page(structure, company, client=client)
-        markdown = render_page(page, content_elements, company, image_keywords=image_keywords)
+        reused_from = None
+        # Dependencies are done, their summaries keep this page consistent with them
+        context = "\n\n".join(upstream[dep] for dep in graph[structure["id"]]) or None
+        if cache:
+            key = page_cache_key(structure, company, DEFAULT_MODEL, response_mode, styles, context)
+            result, created = (None if refresh_cache else cache.get(key)), False
+            if result is None and similar:
+                result, reused_from = reuse(structure, context)
+                if result is not None:
+                    cache.put(key, result)
+            if result is None:
+                result, created = cache.get_or_create(
+                    key, lambda: generate(structure, context), refresh=refresh_cache
+                )
+        else:
+            result, created = generate(structure, context), True
+        image_keywords = result["image_keywords"]
+        no_usage = {"input_tokens": 0, "output_tokens": 0}
+        usage = result["usage"] if created else no_usage
+
+        if styles:
+            # The variants share one call, its tokens count for the first one
+            for i, key in enumerate(styles):
+                write_page(key, page, result["variants"][key], image_keywords)
+                page_done(
+                    "generate", started, page, SOURCE_LANGUAGE, usage if i == 0 else no_usage,
+                    not created and not reused_from, reused_from, result["usage"] if i == 0 else no_usage,
+                    style=key,
+                )
+            with lock:
+                durations[structure["id"]] = time.time() - started
+            return summarize_page(page, result["variants"][next(iter(styles))])
+
+        content_elements = result["content_elements"]
+
+        write_page(SOURCE_LANGUAGE, page, content_elements, image_keywords)
+        # Translations start right away, while other pages are still generated
+        for language in languages[1:]:
+            translations.append(
+                translator.submit(profiled(translate), page, content_elements, image_keywords, language)
+            )
+        # A reused page saves what generating it cost the earlier company
+        page_done(
+            "generate", started, page, SOURCE_LANGUAGE, usage, not created and not reused_from,
+            reused_from, result["usage"],
+        )
+        with lock:
+            durations[structure["id"]] = time.time() - started
+        return summarize_page(page, content_elements)
+
+    def translate(page, content_elements, image_keywords, language):
+        started = time.time()
+
+        def create():
+            translated, elements, usage = translate_page(
+                page, content_elements, language, client=get_client()
+            )
+            return {"title": translated["title"], "content_elements": elements, "usage": usage}
+
+        if cache:
+            key = translation_cache_key(page, content_elements, language, DEFAULT_MODEL)
+            result, created = cache.get_or_create(key, create, refresh=refresh_cache)
+        else:
+            result, created = create(), True
+        usage = result["usage"] if created else {"input_tokens": 0, "output_tokens": 0}
+
+        translated_page = dict(page, title=result["title"])
+        write_page(language, translated_page, result["content_elements"], image_keywords)
+        page_done("translate", started, translated_page, language, usage, not created)
+
+    executor = ThreadPoolExecutor(max_workers=parallel)
+    translator = ThreadPoolExecutor(max_workers=parallel)
+
+    def stop():
+        for pool in (executor, translator):
+            pool.shutdown(wait=False, cancel_futures=True)
+        close_client()
+
+    def cancel(signum):
+        if cancelled:
+            return
+        cancelled.append(signum)
+        # The interrupted main thread may hold an executor's lock right now,
+        # so queued pages are dropped and the client closed from another thread
+        threading.Thread(target=stop, daemon=True).start()
+        raise RunCancelled(signum)
+
+    restore_signals = handle_cancel_signals(cancel)
+    try:
+        generate_start = time.time()
+        # Pages run as soon as the pages they depend on are done
+        run_graph(executor, graph, profiled(lambda node, upstream: process_page(by_id[node], upstream)))
+        generate_wall = time.time() - generate_start
+        # All pages are generated, so no more translations get queued
+        for future in as_completed(translations):
+            future.result()
+    except Exception:
+        # Pages aborted by the cancellation fail in all sorts of ways
+        if not cancelled:
+            raise
+    finally:
+        restore_signals()
+        # After a cancel, pages still in flight are not waited for
+        for pool in (executor, translator):
+            pool.shutdown(wait=not cancelled, cancel_futures=bool(cancelled))
+        for bundle in bundles.values():
+            bundle.close()
+        if index:
+            index.close()
+        # Written for failed and cancelled runs too, those are the ones worth a look
+        profile_summary = profiler.write(os.path.join(dest, PROFILE_DIRNAME)) if profiler else None
+
+    if cancelled:
+        # Finished pages stay; tokens of aborted API calls are not reported back
+        with lock:
+            emit({
+                "event": "cancelled",
+                "done": counter[0],
+                "total": total,
+                "cached_pages": cached_pages[0],
+                "reused_pages": reused_pages[0],
+                "total_input_tokens": total_input_tokens[0],
+                "total_output_tokens": total_output_tokens[0],
+                "cost_usd": round(token_cost(total_input_tokens[0], total_output_tokens[0]), 6),
+                "duration_sec": round(time.time() - start_time, 1),
+                "profile": profile_summary,
+            })
+        raise SystemExit(128 + cancelled[0])
+
+    if companies:
+        # Only complete runs, their pages are all in the cache
+        companies.add(company)
+        companies.close()
+
+    duration = time.time() - start_time
+    cost = token_cost(total_input_tokens[0], total_output_tokens[0])
+    path_sec, path = critical_path(graph, durations)
+
+    emit({
+        "event": "complete",
+        "total": total,
+        "languages": languages,
+        "variants": list(styles),
+        "cached_pages": cached_pages[0],
+        "reused_pages": reused_pages[0],
+        "total_input_tokens": total_input_tokens[0],
+        "total_output_tokens": total_output_tokens[0],
+        "saved_input_tokens": saved_input_tokens[0],
+        "saved_output_tokens": saved_output_tokens[0],
+        "cost_usd": round(cost, 6),
+        "saved_cost_usd": round(token_cost(saved_input_tokens[0], saved_output_tokens[0]), 6),
+        "duration_sec": round(duration, 1),
+        "stages": {name: stage_summary(stage) for name, stage in stages.items()},
+        # The generation phase cannot finish faster than its longest dependency chain
+        "schedule": {
+            "critical_path": path,
+            "critical_path_sec": round(path_sec, 1),
+            "wall_sec": round(generate_wall, 1),
+        },
+        "profile": profile_summary,
+    })
+
+
+def read_output_page(out_dir: str, page: dict) -> tuple[dict, list[dict], list[str]] | None:
+    """Read a written page back: (page meta, content elements, image keywords).
+
+    Prefers the Markdown file and falls back to the bundle record; None if
+    the page exists in neither.
+    """
+    filepath = os.path.join(out_dir, page_filename(page))
+    if os.path.exists(filepath):
+        with open(filepath, "r", encoding="utf-8") as f:
+            frontmatter, content_elements, image_keywords = parse_page(f.read())
+        meta = {key: frontmatter[key] for key in PAGE_META_KEYS if key in frontmatter}
+        return meta, content_elements, image_keywords
+    bundle_path = os.path.join(out_dir, BUNDLE_FILENAME)
+    record = find_bundle_record(bundle_path, page["slug"]) if os.path.exists(bundle_path) else None
+    if record:
+        meta = {key: record["page"][key] for key in PAGE_META_KEYS if key in record["page"]}
+        return meta, record["content_elements"], record["images"]["search_keywords"]
+    return None
+
+
+def regenerate_pages(
+    company: str,
+    output_dir: str,
+    parallel: int,
+    jsonl: bool,
+    targets: list[tuple[dict, list[int]]],
+    response_mode: str = "markers",
+    cache_dir: str | None = None,
+    index_db: str | None = None,
+    structures: list[dict] | None = None,
+):
+    """Re-generate selected content elements of already generated pages.
+
+    Each page is read back from disk (its Markdown file, or its record in the
+    bundle), the targeted elements are replaced and the page is written again
+    in every format it exists in; all other elements stay untouched. A cached
+    copy of the page is updated as well, so later cache hits get the fix.
+    In multilingual output the source language is regenerated and only the
+    new elements are translated into the other languages. Pages that depend
+    on others (depends_on) get the summaries of those pages as read from
+    disk; structures are all known structures, to look them up.
+    """
+    dest = os.path.join(output_dir, slugify(company))
+    if os.path.isdir(os.path.join(dest, SOURCE_LANGUAGE)):
+        dests = {
+            language: os.path.join(dest, language)
+            for language in LANGUAGES
+            if os.path.isdir(os.path.join(dest, language))
+        }
+    else:
+        dests = {SOURCE_LANGUAGE: dest}
 
-        filename = f"{page['slug'].strip('/').replace('/', '-') or 'index'}.md"
-        filepath = os.path.join(dest, filename)
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(markdown)
+    for structure, _ in targets:
+        for language, out_dir in dests.items():
+            filepath = os.path.join(out_dir, page_filename(structure["page"]))
+            try:
+                found = read_output_page(out_dir, structure["page"])
+            except ValueError as e:
+                # e.g. frontmatter written before titles were escaped
+                raise click.ClickException(f"Seite kann nicht neu generiert werden: {filepath} ({e})")
+            if found is None and language == SOURCE_LANGUAGE:
+                click.echo(f"Seite nicht gefunden: {filepath}", err=True)
+                raise SystemExit(1)
+
+    total = len(targets)
+    lock = threading.Lock()
+    counter = [0]
+    total_input_tokens = [0]
+    total_output_tokens = [0]
+    get_client, _ = client_factory()
+    cache = PageCache(cache_dir) if cache_dir else None
+    index = SearchIndex(index_db) if index_db else None
+    by_id = {structure["id"]: structure for structure in structures or []}
+    start_time = time.time()
+
+    def page_context(structure):
+        summaries = []
+        for dep in structure.get("depends_on", []):
+            found = read_output_page(dests[SOURCE_LANGUAGE], by_id[dep]["page"]) if dep in by_id else None
+            if found:
+                summaries.append(summarize_page(by_id[dep]["page"], found[1]))
+        return "\n\n".join(summaries) or None
+
+    def emit(data):
+        if jsonl:
+            click.echo(dumps(data))
+        elif data.get("event") == "page_done":
+            elements = ", ".join(str(n) for n in data["elements"])
+            click.echo(f"[{data['done']}/{data['total']}] {data['title']} (CE {elements}) ok")
+        elif data.get("event") == "complete":
+            click.echo(
+                f"\nTokens: {data['total_input_tokens']:,} input / {data['total_output_tokens']:,} output"
+                f"\nKosten: ${data['cost_usd']:.4f} | Dauer: {data['duration_sec']:.1f}s"
+            )
+
+    emit({"event": "start", "total": total, "parallel": parallel})
+
+    def write_page(out_dir, page, content_elements, image_keywords):
+        filepath = os.path.join(out_dir, page_filename(page))
+        if os.path.exists(filepath):
+            markdown = render_page(page, content_elements, company, image_keywords=image_keywords)
+            with open(filepath, "w", encoding="utf-8") as f:
+                f.write(markdown)
+        bundle_path = os.path.join(out_dir, BUNDLE_FILENAME)
+        if os.path.exists(bundle_path):
+            record = render_bundle_record(page, content_elements, company, image_keywords=image_keywords)
+            with lock:
+                replace_bundle_record(bundle_path, page["slug"], record)
+        if index:
+            index.add_page(out_dir, page_filename(page), page, content_elements, company, image_keywords)
+
+    def process_page(structure, numbers):
+        existing = {
+            language: read_output_page(out_dir, structure["page"])
+            for language, out_dir in dests.items()
+        }
+        for language, found in existing.items():
+            if found and len(found[1]) != len(structure["content_elements"]):
+                raise click.ClickException(
+                    f"{os.path.join(dests[language], page_filename(structure['page']))} has "
+                    f"{len(found[1])} content elements, structure defines {len(structure['content_elements'])}"
+                )
+        page, content_elements, image_keywords = existing[SOURCE_LANGUAGE]
+        context = page_context(structure)
+
+        try:
+            new_elements, usage = regenerate_elements(
+                structure, company, numbers, client=get_client(), response_mode=response_mode, context=context
+            )
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--regenerate")
+        for n, ce in new_elements.items():
+            content_elements[n - 1] = ce
+
+        if cache:
+            key = page_cache_key(structure, company, DEFAULT_MODEL, response_mode, context=context)
+            cached = cache.get(key)
+            if cached is not None:
+                cached["content_elements"] = content_elements
+                cache.put(key, cached)
+
+        write_page(dests[SOURCE_LANGUAGE], page, content_elements, image_keywords)
+
+        # Other languages keep their translation of the untouched elements
+        for language, found in existing.items():
+            if language == SOURCE_LANGUAGE or found is None:
+                continue
+            translated_page, translated_elements, _ = found
+            for n, ce in new_elements.items():
+                translated_elements[n - 1] = ce
+            translated_page, translated_elements, translate_usage = translate_page(
+                translated_page, translated_elements, language, client=get_client(), numbers=sorted(new_elements)
+            )
+            usage["input_tokens"] += translate_usage["input_tokens"]
+            usage["output_tokens"] += translate_usage["output_tokens"]
+            write_page(dests[language], translated_page, translated_elements, image_keywords)
 
         with lock:
             counter[0] += 1
@@ -111,22 +918,26 @@ def main(company: str, output_dir: str, parallel: int, page_set: str, jsonl: boo
             emit({
                 "event": "page_done",
                 "title": page["title"],
+                "slug": page["slug"],
+                "elements": sorted(new_elements),
+                "languages": [language for language, found in existing.items() if found],
                 "done": counter[0],
                 "total": total,
                 "input_tokens": usage["input_tokens"],
                 "output_tokens": usage["output_tokens"],
             })
 
-    with ThreadPoolExecutor(max_workers=parallel) as executor:
-        futures = [executor.submit(process_page, s) for s in structures]
-        for future in as_completed(futures):
-            future.result()
+    try:
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            futures = [executor.submit(process_page, *target) for target in targets]
+            for future in as_completed(futures):
+                future.result()
+    finally:
+        if index:
+            index.close()
 
     duration = time.time() - start_time
-    cost = (
-        total_input_tokens[0] / 1_000_000 * PRICING["input"]
-        + total_output_tokens[0] / 1_000_000 * PRICING["output"]
-    )
+    cost = token_cost(total_input_tokens[0], total_output_tokens[0])
 
     emit({
         "event": "complete",
@@ -136,3 +947,143 @@ def main(company: str, output_dir: str, parallel: int, page_set: str, jsonl: boo
         "cost_usd": round(cost, 6),
         "duration_sec": round(duration, 1),
     })
+
+
+def personalize_pages(
+    company: str,
+    output_dir: str,
+    jsonl: bool,
+    library_dir: str,
+    structures: list[dict],
+    output_format: str = "markdown",
+    index_db: str | None = None,
+):
+    """Write the pages of a pre-generated library, personalized for company.
+
+    The library's manifest (LIBRARY_MANIFEST) names the directory holding
+    its pages, the placeholders its generic company description uses for
+    name and city ({"name": ..., "city": ...}) and the tokens generating it
+    cost. One short API call extracts name and city from company; every
+    page is then copied with the placeholders replaced. The copied pages
+    count as reused, saving what the library cost.
+
+    Returns False without writing anything if the company's name (or
+    another fact with a placeholder) cannot be extracted; the caller then
+    generates the pages as usual.
+    """
+    manifest_path = os.path.join(library_dir, LIBRARY_MANIFEST)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        raise click.ClickException(f"Keine gültige Bibliothek: {manifest_path} ({e})")
+    pages_dir = os.path.join(library_dir, manifest["pages_dir"])
+    pages = []
+    for structure in structures:
+        found = read_output_page(pages_dir, structure["page"])
+        if found is None:
+            raise click.ClickException(
+                f"Seite fehlt in der Bibliothek: {os.path.join(pages_dir, page_filename(structure['page']))}"
+            )
+        pages.append(found)
+
+    start_time = time.time()
+    get_client, _ = client_factory()
+    facts, usage = extract_company_facts(company, client=get_client())
+    missing = [fact for fact in manifest["placeholders"] if fact not in facts]
+    if missing:
+        if jsonl:
+            click.echo(dumps({"event": "personalize_skipped", "missing": missing}))
+        else:
+            click.echo(f"Angaben fehlen in der Firmenbeschreibung ({', '.join(missing)}), generiere regulär...")
+        return False
+    replacements = {
+        placeholder: facts[fact]
+        for fact, placeholder in manifest["placeholders"].items()
+    }
+
+    dest = os.path.join(output_dir, slugify(company))
+    os.makedirs(dest, exist_ok=True)
+    total = len(pages)
+
+    def emit(data):
+        if jsonl:
+            click.echo(dumps(data))
+        elif data.get("event") == "page_done":
+            click.echo(f"[{data['done']}/{data['total']}] {data['title']} ok (Bibliothek)")
+        elif data.get("event") == "start":
+            click.echo(f"Personalisiere {total} Seiten aus \"{manifest['company']}\" für \"{company}\"...")
+        elif data.get("event") == "complete":
+            click.echo(
+                f"\n{data['total']} Seiten personalisiert in {dest}/"
+                f"\nTokens: {data['total_input_tokens']:,} input / {data['total_output_tokens']:,} output"
+                f"\nKosten: ${data['cost_usd']:.4f} | Dauer: {data['duration_sec']:.1f}s"
+                f"\nGespart: {data['saved_input_tokens']:,} input / {data['saved_output_tokens']:,} output "
+                f"(${data['saved_cost_usd']:.4f})"
+            )
+
+    emit({
+        "event": "start",
+        "total": total,
+        "parallel": 1,
+        "languages": [SOURCE_LANGUAGE],
+        "variants": [],
+        "similar_companies": [],
+        "library": manifest["company"],
+    })
+
+    bundle = BundleWriter(os.path.join(dest, BUNDLE_FILENAME)) if output_format != "markdown" else None
+    index = SearchIndex(index_db) if index_db else None
+    try:
+        for done, (page, content_elements, image_keywords) in enumerate(pages, 1):
+            page, content_elements = personalize_page(page, content_elements, replacements)
+            if output_format in ("markdown", "both"):
+                markdown = render_page(page, content_elements, company, image_keywords=image_keywords)
+                with open(os.path.join(dest, page_filename(page)), "w", encoding="utf-8") as f:
+                    f.write(markdown)
+            if bundle:
+                bundle.write(render_bundle_record(page, content_elements, company, image_keywords=image_keywords))
+            if index:
+                index.add_page(dest, page_filename(page), page, content_elements, company, image_keywords)
+            emit({
+                "event": "page_done",
+                "title": page["title"],
+                "language": SOURCE_LANGUAGE,
+                "style": None,
+                "done": done,
+                "total": total,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "cached": False,
+                "reused_from": manifest["company"],
+            })
+    finally:
+        if bundle:
+            bundle.close()
+        if index:
+            index.close()
+
+    # A library may hold more pages than this page set, only the share used counts as saved
+    share = total / max(manifest.get("pages", total), 1)
+    saved_input = round(manifest.get("input_tokens", 0) * share)
+    saved_output = round(manifest.get("output_tokens", 0) * share)
+    emit({
+        "event": "complete",
+        "total": total,
+        "languages": [SOURCE_LANGUAGE],
+        "variants": [],
+        "cached_pages": 0,
+        "reused_pages": total,
+        "total_input_tokens": usage["input_tokens"],
+        "total_output_tokens": usage["output_tokens"],
+        "saved_input_tokens": saved_input,
+        "saved_output_tokens": saved_output,
+        "cost_usd": round(token_cost(usage["input_tokens"], usage["output_tokens"]), 6),
+        "saved_cost_usd": round(token_cost(saved_input, saved_output), 6),
+        "duration_sec": round(time.time() - start_time, 1),
+        "stages": {},
+        "schedule": {"critical_path": [], "critical_path_sec": 0.0, "wall_sec": 0.0},
+        "library": manifest["company"],
+        "facts": facts,
+    })
+    return True
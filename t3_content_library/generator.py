@@ -1,7 +1,15 @@
+from __future__ import annotations
+
 import os
-import re
+from typing import TYPE_CHECKING
+
+from t3_content_library._lazy import LazyModule
+from t3_content_library.response_parser import ResponseParser, VariantParser
 
-import anthropic
+if TYPE_CHECKING:
+    import anthropic
+else:
+    anthropic = LazyModule("anthropic")
 
 
 DEFAULT_MODEL = os.environ.get("ANTHROPIC_MODEL", "claude-sonnet-4-5-20250929")
@@ -12,6 +20,51 @@ Antworte NUR mit dem angeforderten Content, ohne Erklärungen oder Kommentare.
 Verwende Markdown-Formatierung wo passend.
 Wenn nach Bild-Suchbegriffen gefragt, liefere passende englische Suchbegriffe für Stockfoto-Plattformen wie Unsplash."""
 
+# How the model returns the content elements of a page:
+#   markers - plain text separated by ===CE:N=== / ===IMAGES=== lines
+#   tool    - a forced tool call whose input follows a JSON schema
+RESPONSE_MODES = ("markers", "tool")
+
+PAGE_TOOL_NAME = "write_page"
+
+IMAGES_TOOL_DESCRIPTION = (
+    "1-3 englische Suchbegriffe für Stockfoto-Plattformen (z.B. Unsplash), "
+    "die zum Thema und Inhalt dieser Seite passen. "
+    "Die Begriffe sollen spezifisch und beschreibend sein (z.B. 'italian restaurant interior warm lighting' "
+    "statt nur 'restaurant')."
+)
+
+IMAGES_PROMPT = (
+    "Darunter liste 1-3 englische Suchbegriffe für Stockfoto-Plattformen (z.B. Unsplash), "
+    "die zum Thema und Inhalt dieser Seite passen. "
+    "Ein Suchbegriff pro Zeile, ohne Nummerierung oder Aufzählungszeichen. "
+    "Die Begriffe sollen spezifisch und beschreibend sein (z.B. 'italian restaurant interior warm lighting' "
+    "statt nur 'restaurant')."
+)
+
+# All variants of a page come back in one response; it is streamed, so the
+# SDK's limit for non-streaming requests does not apply, the cap bounds the
+# cost of one call.
+VARIANT_MAX_TOKENS = 4096
+VARIANT_MAX_TOKENS_TOTAL = 20000
+
+# Content is always generated in SOURCE_LANGUAGE, other languages are
+# translated from it
+SOURCE_LANGUAGE = "de"
+LANGUAGES = {
+    "de": "Deutsch",
+    "en": "Englisch",
+    "fr": "Französisch",
+    "it": "Italienisch",
+    "es": "Spanisch",
+    "nl": "Niederländisch",
+}
+
+TRANSLATION_SYSTEM_PROMPT = """Du bist ein professioneller Übersetzer für Website-Content.
+Übersetze den Text natürlich und idiomatisch, nicht Wort für Wort.
+Behalte Markdown-Formatierung, Platzhalter, Firmen- und Produktnamen unverändert bei.
+Antworte NUR mit den übersetzten Abschnitten, jeweils nach ihrer ===CE:N=== Zeile."""
+
 # Pricing per million tokens (Claude Sonnet 4.5)
 PRICING = {
     "input": 3.00,
@@ -19,80 +72,489 @@ PRICING = {
 }
 
 
+def _stream_response(client: anthropic.Anthropic, parser=None, **request):
+    """Send a request as a stream and return the final message.
+
+    Every text delta is fed to parser (a ResponseParser or VariantParser)
+    as it arrives, so parsing overlaps with the response being generated;
+    the parser is closed at the end. Usage and non-text blocks (tool calls)
+    are taken from the final message.
+    """
+    with client.messages.stream(**request) as stream:
+        if parser is not None:
+            for text in stream.text_stream:
+                parser.feed(text)
+            parser.close()
+        return stream.get_final_message()
+
+
+def _build_ce_parts(content_elements: list[dict], company_description: str, numbers: list[int]) -> list[str]:
+    """Build the numbered [CE:N] prompt lines for the given element numbers (1-based)."""
+    parts = []
+    for n in numbers:
+        prompt = content_elements[n - 1]["prompt"].replace("{company}", company_description)
+        parts.append(f"[CE:{n}] {prompt}")
+    return parts
+
+
+def style_instruction(style: dict) -> str:
+    """Describe a content style (config/styles/*.yaml) for the prompt."""
+    return f"{style['name']}: {style['prompt']} Sprich die Leser mit \"{style['address']}\" an."
+
+
+def system_prompt(style: dict | None = None) -> str:
+    """The system prompt, with the instructions of a content style if given."""
+    if style is None:
+        return SYSTEM_PROMPT
+    return f"{SYSTEM_PROMPT}\n\nStil: {style_instruction(style)}"
+
+
+def summarize_page(page: dict, content_elements: list[dict], max_chars: int = 160) -> str:
+    """Compact summary of a generated page, used as context for pages depending on it.
+
+    Lists the first line of every element, without Markdown markup and
+    shortened to max_chars, so a dependent prompt grows by a few hundred
+    characters instead of the whole page.
+    """
+    lines = [f"Seite \"{page['title']}\" (/{page['slug'].strip('/')}):"]
+    for ce in content_elements:
+        text = next((line for line in ce["content"].splitlines() if line.strip()), "")
+        text = " ".join(text.lstrip("#>*-0123456789. ").replace("**", "").split())
+        if len(text) > max_chars:
+            text = text[:max_chars].rsplit(" ", 1)[0] + " …"
+        if text:
+            lines.append(f"- {text}")
+    return "\n".join(lines)
+
+
+def _context_block(context: str | None) -> str:
+    """Prompt section with the summaries of the pages a page depends on."""
+    if not context:
+        return ""
+    return (
+        "Bereits generierte Seiten, auf die sich diese Seite bezieht. Bleibe konsistent mit ihnen "
+        "(dieselben Leistungen, Projekte und Themen, keine neuen erfinden):\n"
+        f"{context}\n\n"
+    )
+
+
+def _build_result(ce: dict, content_text: str) -> dict:
+    """Combine generated text with the CE definition's type and metadata."""
+    result = {"type": ce["type"], "content": content_text}
+    for key in ("subtype", "image", "image_position"):
+        if key in ce:
+            result[key] = ce[key]
+    return result
+
+
+def build_page_tool(structure: dict, numbers: list[int], with_images: bool = True) -> dict:
+    """Build the tool definition whose JSON schema describes the requested CEs.
+
+    The schema is derived from the structure YAML: one array entry per
+    requested element with its number, its CE type and the Markdown content.
+    """
+    content_elements = structure["content_elements"]
+    properties = {
+        "content_elements": {
+            "type": "array",
+            "description": "Ein Eintrag pro angefordertem Content-Element, in der angegebenen Reihenfolge.",
+            "minItems": len(numbers),
+            "maxItems": len(numbers),
+            "items": {
+                "type": "object",
+                "properties": {
+                    "number": {"type": "integer", "enum": numbers},
+                    "type": {
+                        "type": "string",
+                        "enum": sorted({content_elements[n - 1]["type"] for n in numbers}),
+                    },
+                    "content": {"type": "string", "description": "Der Content als Markdown."},
+                },
+                "required": ["number", "type", "content"],
+            },
+        },
+    }
+    required = ["content_elements"]
+    if with_images:
+        properties["image_keywords"] = {
+            "type": "array",
+            "description": IMAGES_TOOL_DESCRIPTION,
+            "minItems": 1,
+            "maxItems": 3,
+            "items": {"type": "string"},
+        }
+        required.append("image_keywords")
+
+    return {
+        "name": PAGE_TOOL_NAME,
+        "description": "Speichert die generierten Content-Elemente einer Seite.",
+        "input_schema": {"type": "object", "properties": properties, "required": required},
+    }
+
+
+def validate_tool_input(data, structure: dict, numbers: list[int]) -> tuple[dict[int, str], list[str]]:
+    """Validate a write_page tool input against the requested elements.
+
+    Entries with an unknown number, a type that does not match the structure
+    or empty content are dropped, so they count as missing. Returns
+    ({number: content}, image_keywords).
+    """
+    content_elements = structure["content_elements"]
+    texts = {}
+    if not isinstance(data, dict):
+        return texts, []
+
+    entries = data.get("content_elements")
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        n = entry.get("number")
+        content = entry.get("content")
+        if n not in numbers or n in texts:
+            continue
+        if entry.get("type") != content_elements[n - 1]["type"]:
+            continue
+        if isinstance(content, str) and content.strip():
+            texts[n] = content.strip()
+
+    keywords = data.get("image_keywords")
+    image_keywords = [
+        k.strip() for k in (keywords if isinstance(keywords, list) else [])
+        if isinstance(k, str) and k.strip()
+    ]
+    return texts, image_keywords
+
+
+def _request_elements(
+    structure: dict,
+    company_description: str,
+    numbers: list[int],
+    model: str,
+    client: anthropic.Anthropic,
+    response_mode: str,
+    regenerate: bool = False,
+    style: dict | None = None,
+    context: str | None = None,
+) -> tuple[dict[int, str], list[str], dict]:
+    """Request the given elements in one API call and parse the response.
+
+    Returns ({number: content} for every element that came back valid,
+    image_keywords, usage). Image keywords are only requested for a full page.
+    """
+    if response_mode not in RESPONSE_MODES:
+        raise ValueError(f"Unknown response mode: {response_mode}. Available: {', '.join(RESPONSE_MODES)}")
+
+    content_elements = structure["content_elements"]
+    page_title = structure["page"]["title"]
+    parts = _build_ce_parts(content_elements, company_description, numbers)
+
+    if regenerate:
+        intro = _context_block(context) + (
+            f"Generiere neuen Content für ausgewählte Elemente der Seite \"{page_title}\".\n\n"
+            f"Erstelle die folgenden {len(numbers)} Content-Elemente. "
+        )
+    else:
+        intro = _context_block(context) + (
+            f"Generiere Content für die Seite \"{page_title}\".\n\n"
+            f"Erstelle die folgenden {len(content_elements)} Content-Elemente. "
+        )
+
+    kwargs = {}
+    if response_mode == "tool":
+        prompt = (
+            intro
+            + f"Rufe das Werkzeug {PAGE_TOOL_NAME} auf, mit einem Eintrag pro Element "
+            "(Nummer, Typ und Content als Markdown).\n\n"
+            + "\n".join(parts)
+        )
+        kwargs["tools"] = [build_page_tool(structure, numbers, with_images=not regenerate)]
+        kwargs["tool_choice"] = {"type": "tool", "name": PAGE_TOOL_NAME}
+    elif regenerate:
+        marker_list = ", ".join(f"===CE:{n}===" for n in numbers)
+        prompt = (
+            intro
+            + f"Beginne jedes Element mit einer eigenen Zeile die NUR seinen Marker enthält "
+            f"({marker_list}).\n\n"
+            + "\n".join(parts)
+        )
+    else:
+        prompt = (
+            intro
+            + f"Trenne jedes Element mit einer eigenen Zeile die NUR ===CE:N=== enthält "
+            f"(N = Nummer des Elements). Beginne mit ===CE:1===\n\n"
+            + "\n".join(parts)
+            + "\n\nGanz am Ende, nach allen Content-Elementen, füge eine Zeile ===IMAGES=== ein. "
+            + IMAGES_PROMPT
+        )
+
+    parser = ResponseParser(numbers) if response_mode == "markers" else None
+    response = _stream_response(
+        client,
+        parser,
+        model=model,
+        max_tokens=4096,
+        system=system_prompt(style),
+        messages=[{"role": "user", "content": prompt}],
+        **kwargs,
+    )
+
+    usage = {
+        "input_tokens": response.usage.input_tokens,
+        "output_tokens": response.usage.output_tokens,
+    }
+
+    if response_mode == "tool":
+        data = next(
+            (block.input for block in response.content
+             if getattr(block, "type", None) == "tool_use" and block.name == PAGE_TOOL_NAME),
+            None,
+        )
+        texts, image_keywords = validate_tool_input(data, structure, numbers)
+    else:
+        texts, image_keywords = parser.elements, parser.image_keywords
+
+    return texts, image_keywords, usage
+
+
 def generate_content_for_page(
     structure: dict,
     company_description: str,
     model: str = DEFAULT_MODEL,
     client: anthropic.Anthropic | None = None,
+    response_mode: str = "markers",
+    style: dict | None = None,
+    context: str | None = None,
 ) -> tuple[list[dict], dict, list[str]]:
     """Generate content for all content elements of a page in a single API call.
 
     Returns (content_elements, usage, image_keywords) where usage contains
     token counts and image_keywords is a list of English search terms for
-    stock photo platforms.
+    stock photo platforms. Elements missing from the response (no ===CE:N===
+    section, or no valid tool entry in "tool" mode) are re-requested once
+    via regenerate_elements. With a style (see load_styles), its tone and
+    form of address are added to the system prompt; context (summaries of
+    the pages this one depends on, see summarize_page) is put before the
+    element prompts.
     """
     if client is None:
         client = anthropic.Anthropic()
 
+    content_elements = structure["content_elements"]
+    numbers = list(range(1, len(content_elements) + 1))
+
+    texts, image_keywords, usage = _request_elements(
+        structure, company_description, numbers, model, client, response_mode, style=style, context=context
+    )
+
+    # Re-request only the elements that are missing or empty
+    missing = [n for n in numbers if n not in texts]
+    if missing:
+        repaired, repair_usage = regenerate_elements(
+            structure, company_description, missing, model=model, client=client,
+            response_mode=response_mode, style=style, context=context,
+        )
+        for n, ce in repaired.items():
+            texts[n] = ce["content"]
+        usage["input_tokens"] += repair_usage["input_tokens"]
+        usage["output_tokens"] += repair_usage["output_tokens"]
+
+    results = [
+        _build_result(ce, texts.get(n, ""))
+        for n, ce in enumerate(content_elements, 1)
+    ]
+
+    return results, usage, image_keywords
+
+
+def regenerate_elements(
+    structure: dict,
+    company_description: str,
+    numbers: list[int],
+    model: str = DEFAULT_MODEL,
+    client: anthropic.Anthropic | None = None,
+    response_mode: str = "markers",
+    style: dict | None = None,
+    context: str | None = None,
+) -> tuple[dict[int, dict], dict]:
+    """Re-generate only the selected content elements of a page.
+
+    numbers are 1-based element positions as used in the ===CE:N=== markers.
+    Only the prompts of the targeted elements are sent, so the call costs
+    just the tokens for those elements. Returns ({number: content_element}, usage).
+    """
+    content_elements = structure["content_elements"]
+    numbers = sorted(set(numbers))
+    for n in numbers:
+        if not 1 <= n <= len(content_elements):
+            raise ValueError(
+                f"Element {n} does not exist on page \"{structure['page']['title']}\" "
+                f"(1-{len(content_elements)})"
+            )
+
+    if client is None:
+        client = anthropic.Anthropic()
+
+    texts, _, usage = _request_elements(
+        structure, company_description, numbers, model, client, response_mode,
+        regenerate=True, style=style, context=context,
+    )
+
+    results = {
+        n: _build_result(content_elements[n - 1], texts.get(n, ""))
+        for n in numbers
+    }
+    return results, usage
+
+
+def generate_variants_for_page(
+    structure: dict,
+    company_description: str,
+    styles: dict[str, dict],
+    model: str = DEFAULT_MODEL,
+    client: anthropic.Anthropic | None = None,
+    context: str | None = None,
+) -> tuple[dict[str, list[dict]], dict, list[str]]:
+    """Generate one variant of a page per content style in a single API call.
+
+    The element prompts and instructions are sent once and every variant
+    comes back in its own ===VARIANT:key=== section, so each additional
+    variant only costs its output tokens. Image keywords are requested once
+    for all variants. Elements missing from a variant are re-requested once
+    via regenerate_elements with that variant's style. Only the markers
+    response format is supported. Returns ({style key: content_elements},
+    usage, image_keywords).
+    """
+    if not styles:
+        raise ValueError("At least one style is required")
+    if client is None:
+        client = anthropic.Anthropic()
+
     content_elements = structure["content_elements"]
     page_title = structure["page"]["title"]
+    numbers = list(range(1, len(content_elements) + 1))
+    keys = list(styles)
+    parts = _build_ce_parts(content_elements, company_description, numbers)
+    variant_lines = [f"===VARIANT:{key}=== {style_instruction(style)}" for key, style in styles.items()]
 
-    # Build batched prompt for all CEs
-    parts = []
-    for i, ce in enumerate(content_elements, 1):
-        prompt = ce["prompt"].replace("{company}", company_description)
-        parts.append(f"[CE:{i}] {prompt}")
-
-    batched_prompt = (
-        f"Generiere Content für die Seite \"{page_title}\".\n\n"
-        f"Erstelle die folgenden {len(content_elements)} Content-Elemente. "
-        f"Trenne jedes Element mit einer eigenen Zeile die NUR ===CE:N=== enthält "
-        f"(N = Nummer des Elements). Beginne mit ===CE:1===\n\n"
+    prompt = _context_block(context) + (
+        f"Generiere Content für die Seite \"{page_title}\" in {len(keys)} Stilvarianten.\n\n"
+        f"Jede Variante enthält dieselben {len(content_elements)} Content-Elemente mit denselben Fakten, "
+        "unterscheidet sich aber in Tonalität, Ansprache und Formulierung:\n"
+        + "\n".join(variant_lines)
+        + "\n\nBeginne jede Variante mit einer eigenen Zeile die NUR ihren Marker ===VARIANT:...=== enthält, "
+        f"in der angegebenen Reihenfolge. Trenne darin jedes Element mit einer eigenen Zeile die NUR "
+        f"===CE:N=== enthält (N = Nummer des Elements), beginnend mit ===CE:1===\n\n"
         + "\n".join(parts)
-        + "\n\nGanz am Ende, nach allen Content-Elementen, füge eine Zeile ===IMAGES=== ein. "
-        "Darunter liste 1-3 englische Suchbegriffe für Stockfoto-Plattformen (z.B. Unsplash), "
-        "die zum Thema und Inhalt dieser Seite passen. "
-        "Ein Suchbegriff pro Zeile, ohne Nummerierung oder Aufzählungszeichen. "
-        "Die Begriffe sollen spezifisch und beschreibend sein (z.B. 'italian restaurant interior warm lighting' "
-        "statt nur 'restaurant')."
+        + "\n\nGanz am Ende, nach allen Varianten, füge einmal eine Zeile ===IMAGES=== ein. "
+        + IMAGES_PROMPT
     )
 
-    response = client.messages.create(
+    parser = VariantParser(keys, numbers)
+    response = _stream_response(
+        client,
+        parser,
         model=model,
-        max_tokens=4096,
+        max_tokens=min(VARIANT_MAX_TOKENS * len(keys), VARIANT_MAX_TOKENS_TOTAL),
         system=SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": batched_prompt}],
+        messages=[{"role": "user", "content": prompt}],
     )
-
-    raw = response.content[0].text
-
     usage = {
         "input_tokens": response.usage.input_tokens,
         "output_tokens": response.usage.output_tokens,
     }
 
-    # Split off ===IMAGES=== section
-    image_keywords = []
-    if "===IMAGES===" in raw:
-        raw, images_section = raw.split("===IMAGES===", 1)
-        raw = raw.strip()
-        image_keywords = [
-            line.strip()
-            for line in images_section.strip().splitlines()
-            if line.strip()
+    variants = {}
+    for key in keys:
+        texts = dict(parser.variants[key].elements)
+        missing = [n for n in numbers if n not in texts]
+        if missing:
+            repaired, repair_usage = regenerate_elements(
+                structure, company_description, missing, model=model, client=client,
+                style=styles[key], context=context,
+            )
+            for n, ce in repaired.items():
+                texts[n] = ce["content"]
+            usage["input_tokens"] += repair_usage["input_tokens"]
+            usage["output_tokens"] += repair_usage["output_tokens"]
+        variants[key] = [
+            _build_result(ce, texts.get(n, ""))
+            for n, ce in enumerate(content_elements, 1)
         ]
 
-    # Parse response by ===CE:N=== markers
-    sections = re.split(r"===CE:\d+===\s*", raw)
-    sections = [s.strip() for s in sections if s.strip()]
+    return variants, usage, parser.image_keywords
 
-    results = []
-    for i, ce in enumerate(content_elements):
-        content_text = sections[i] if i < len(sections) else ""
-        result = {"type": ce["type"], "content": content_text}
-        for key in ("subtype", "image", "image_position"):
-            if key in ce:
-                result[key] = ce[key]
-        results.append(result)
 
-    return results, usage, image_keywords
+def translate_elements(
+    texts: dict[int, str],
+    language: str,
+    model: str = DEFAULT_MODEL,
+    client: anthropic.Anthropic | None = None,
+) -> tuple[dict[int, str], dict]:
+    """Translate numbered text sections from the source language.
+
+    The prompt contains nothing but the sections under their ===CE:N===
+    markers, so a translation costs a fraction of generating the page.
+    Sections missing from the response are requested once more; sections
+    still missing keep their source text. Returns ({number: text}, usage).
+    """
+    if language not in LANGUAGES:
+        raise ValueError(f"Unknown language: {language}. Available: {', '.join(LANGUAGES)}")
+    if client is None:
+        client = anthropic.Anthropic()
+
+    translated = {}
+    usage = {"input_tokens": 0, "output_tokens": 0}
+    pending = sorted(n for n, text in texts.items() if text.strip())
+    for _ in range(2):
+        if not pending:
+            break
+        sections = "\n".join(f"===CE:{n}===\n{texts[n]}" for n in pending)
+        parser = ResponseParser(pending)
+        response = _stream_response(
+            client,
+            parser,
+            model=model,
+            max_tokens=4096,
+            system=TRANSLATION_SYSTEM_PROMPT,
+            messages=[{
+                "role": "user",
+                "content": f"Übersetze ins {LANGUAGES[language]}:\n\n{sections}",
+            }],
+        )
+        usage["input_tokens"] += response.usage.input_tokens
+        usage["output_tokens"] += response.usage.output_tokens
+        translated.update(parser.elements)
+        pending = parser.missing
+
+    return {n: translated.get(n, text) for n, text in texts.items()}, usage
+
+
+def translate_page(
+    page: dict,
+    content_elements: list[dict],
+    language: str,
+    model: str = DEFAULT_MODEL,
+    client: anthropic.Anthropic | None = None,
+    numbers: list[int] | None = None,
+) -> tuple[dict, list[dict], dict]:
+    """Translate a generated page: its title (as element 0) and CE bodies.
+
+    With numbers, only those elements (1-based) are translated and the
+    title is kept. Slug and all CE metadata stay the same, so translated
+    pages line up with the source page. Returns (page, content_elements, usage).
+    """
+    texts = {
+        n: ce["content"]
+        for n, ce in enumerate(content_elements, 1)
+        if numbers is None or n in numbers
+    }
+    if numbers is None:
+        texts[0] = page["title"]
+    translated, usage = translate_elements(texts, language, model=model, client=client)
+
+    page = dict(page, title=translated.get(0, page["title"]))
+    results = [
+        dict(ce, content=translated[n]) if n in translated else dict(ce)
+        for n, ce in enumerate(content_elements, 1)
+    ]
+    return page, results, usage
@@ -0,0 +1,37 @@
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# JSON for events, job status and listings: orjson when installed (several
+# times faster, encodes straight to bytes), else the standard library.
+# T3_JSON=json forces the standard library. Both write compact UTF-8 JSON
+# with non-ASCII characters unescaped, so their output is interchangeable.
+if os.environ.get("T3_JSON") == "json":
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def dumpb(obj) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(obj) -> str:
+    """Serialize obj to a JSON string."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads(data: str | bytes):
+    """Parse JSON from a string or UTF-8 bytes. Raises ValueError on invalid input."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
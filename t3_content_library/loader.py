@@ -1,15 +1,18 @@
 import os
-import yaml
 
 
 def load_page_structure(filepath: str) -> dict:
     """Load a single page structure definition from a YAML file."""
+    import yaml
+
     with open(filepath, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
 
 def load_page_sets(config_dir: str) -> dict:
     """Load page set definitions from page_sets.yaml."""
+    import yaml
+
     filepath = os.path.join(config_dir, "page_sets.yaml")
     with open(filepath, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
@@ -19,6 +22,11 @@ def load_all_structures(directory: str, page_set: str | None = None) -> list[dic
     """Load all page structure YAML files from a directory, sorted by filename.
 
     If page_set is specified and not "full", only loads pages matching that set.
+    Each structure gets an "id", its filename without extension, which is how
+    page_sets.yaml and the depends_on lists of other pages refer to it.
+    Structures marked company_agnostic can be reused for other companies;
+    the prompts they are then generated from (see reusable_structure) must
+    not name the company.
     """
     if page_set and page_set != "full":
         config_dir = os.path.dirname(directory)
@@ -35,6 +43,38 @@ def load_all_structures(directory: str, page_set: str | None = None) -> list[dic
         if filename.endswith(".yaml") or filename.endswith(".yml"):
             if allowed_filenames and filename not in allowed_filenames:
                 continue
-            filepath = os.path.join(directory, filename)
-            structures.append(load_page_structure(filepath))
+            structure = load_page_structure(os.path.join(directory, filename))
+            structure["id"] = os.path.splitext(filename)[0]
+            if structure.get("company_agnostic") and any(
+                "{company}" in ce["prompt"] for ce in reusable_structure(structure)["content_elements"]
+            ):
+                raise ValueError(
+                    f"{filename}: company_agnostic page needs a reusable_prompt without {{company}} "
+                    "for every element that names the company"
+                )
+            structures.append(structure)
     return structures
+
+
+def reusable_structure(structure: dict) -> dict:
+    """The structure with the prompts a page is reused from, if it is company_agnostic.
+
+    Elements of a company_agnostic page take their reusable_prompt (if set)
+    in place of prompt, so the page does not name the company and can be
+    handed on to a similar one. Other structures are returned unchanged.
+    """
+    if not structure.get("company_agnostic"):
+        return structure
+    return dict(structure, content_elements=[
+        dict(ce, prompt=ce.get("reusable_prompt", ce["prompt"])) for ce in structure["content_elements"]
+    ])
+
+
+def load_styles(directory: str) -> dict[str, dict]:
+    """Load content style definitions from a directory, keyed by filename stem."""
+    styles = {}
+    for filename in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(filename)
+        if ext in (".yaml", ".yml"):
+            styles[stem] = load_page_structure(os.path.join(directory, filename))
+    return styles
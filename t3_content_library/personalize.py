@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING
+
+from t3_content_library._lazy import LazyModule
+from t3_content_library.generator import DEFAULT_MODEL
+from t3_content_library.similarity import normalize_company
+
+if TYPE_CHECKING:
+    import anthropic
+else:
+    anthropic = LazyModule("anthropic")
+
+# Facts of a company description that replace an archetype's placeholders,
+# with what is used when the description does not name them
+FACTS = {
+    "name": ("Name des Unternehmens", None),
+    "city": ("Ort", "Ihrer Region"),
+}
+
+FACTS_SYSTEM_PROMPT = """Du extrahierst Angaben aus einer Firmenbeschreibung.
+Antworte ausschließlich mit einer Zeile pro Angabe im Format "schlüssel: wert".
+Ist eine Angabe nicht in der Beschreibung enthalten, lass die Zeile weg."""
+
+FACT_LINE = re.compile(r"^\s*(\w+)\s*:\s*(.+?)\s*$", re.MULTILINE)
+
+
+def match_archetype(company: str, archetypes: dict[str, dict]) -> str | None:
+    """Key of the first archetype matching a word of the company description, or None.
+
+    A word matches if it equals one of the archetype's keywords or ends with
+    one of its suffixes: "anwaltskanzlei" as suffix matches
+    "Rechtsanwaltskanzlei" but not "Steuerberatungskanzlei", and the keyword
+    "restaurant" does not match "Restaurantbedarf".
+    """
+    words = normalize_company(company).split()
+    for key, archetype in archetypes.items():
+        keywords = {normalize_company(keyword) for keyword in archetype.get("keywords", [])}
+        suffixes = tuple(normalize_company(suffix) for suffix in archetype.get("suffixes", []))
+        for word in words:
+            if word in keywords or (suffixes and word.endswith(suffixes)):
+                return key
+    return None
+
+
+def extract_company_facts(
+    company_description: str,
+    model: str = DEFAULT_MODEL,
+    client: anthropic.Anthropic | None = None,
+) -> tuple[dict[str, str], dict]:
+    """Name and city of a company description, from one short API call.
+
+    Facts the description does not contain get their fallback; the name has
+    none and is left out then. Returns ({fact: value}, usage).
+    """
+    if client is None:
+        client = anthropic.Anthropic()
+    wanted = "\n".join(f"{key}: {label}" for key, (label, _) in FACTS.items())
+    response = client.messages.create(
+        model=model,
+        max_tokens=200,
+        system=FACTS_SYSTEM_PROMPT,
+        messages=[{
+            "role": "user",
+            "content": f"Angaben:\n{wanted}\n\nFirmenbeschreibung: {company_description}",
+        }],
+    )
+    usage = {
+        "input_tokens": response.usage.input_tokens,
+        "output_tokens": response.usage.output_tokens,
+    }
+    text = "".join(block.text for block in response.content if block.type == "text")
+    found = {key.lower(): value for key, value in FACT_LINE.findall(text)}
+    facts = {}
+    for key, (_, fallback) in FACTS.items():
+        value = found.get(key) or fallback
+        if value:
+            facts[key] = value
+    return facts, usage
+
+
+def personalize_text(text: str, replacements: dict[str, str]) -> str:
+    """Replace every placeholder in text, longest placeholder first.
+
+    Names take no case endings, so a placeholder in the genitive is replaced
+    with its ending ("des Musterhauses" -> "des La Bella Vista"), and one
+    starting a compound keeps the rest behind a hyphen ("Musterstadtbesuch"
+    -> "München-Besuch").
+    """
+    for placeholder in sorted(replacements, key=len, reverse=True):
+        value = replacements[placeholder]
+        pattern = re.compile(rf"(?<!\w){re.escape(placeholder)}(?:e?s\b|(\w+))?")
+        text = pattern.sub(
+            lambda m: f"{value}-{m[1][0].upper()}{m[1][1:]}" if m[1] else value,
+            text,
+        )
+    return text
+
+
+def personalize_page(
+    page: dict,
+    content_elements: list[dict],
+    replacements: dict[str, str],
+) -> tuple[dict, list[dict]]:
+    """Copy of a library page with its placeholders replaced in title and CE bodies.
+
+    Slug and CE metadata stay the same, so the page lines up with a
+    generated one. Returns (page, content_elements).
+    """
+    page = dict(page, title=personalize_text(page["title"], replacements))
+    results = [
+        dict(ce, content=personalize_text(ce["content"], replacements))
+        for ce in content_elements
+    ]
+    return page, results
@@ -0,0 +1,224 @@
+import cProfile
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+# Sampled stacks are attributed to the innermost frame from one of these
+# module prefixes; stacks without one count as "python" (our own code, or
+# waiting for the GIL while another thread runs it).
+CATEGORIES = (
+    ("api", ("anthropic", "httpx", "httpcore", "h11", "ssl", "socket")),
+    ("yaml", ("yaml",)),
+    ("jinja", ("jinja2", "t3_content_library.renderer")),
+    ("json", ("json",)),
+    ("cache", ("t3_content_library.cache",)),
+)
+# A thread whose innermost frame is in one of these waits for work
+IDLE_MODULES = ("threading", "queue", "concurrent.futures", "selectors", "asyncio")
+
+PROFILE_DIRNAME = "_profile"
+
+# Up to 3.11 cProfile hooks into each thread separately (sys.setprofile).
+# From 3.12 it uses sys.monitoring, which covers all threads and allows one
+# active profiler per interpreter: enabling a second one raises ValueError.
+PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+
+def _in_modules(label: str, prefixes: tuple[str, ...]) -> bool:
+    module = label.partition(":")[0]
+    return any(module == prefix or module.startswith(prefix + ".") for prefix in prefixes)
+
+
+def category(stack: list[str]) -> str:
+    """Category of a sampled stack (outermost frame first, "module:function" labels)."""
+    if stack and _in_modules(stack[-1], IDLE_MODULES):
+        return "idle"
+    for label in reversed(stack):
+        for name, prefixes in CATEGORIES:
+            if _in_modules(label, prefixes):
+                return name
+    return "python"
+
+
+def _thread_label(name: str) -> str:
+    # Workers of one pool share a label: ThreadPoolExecutor-0_3 -> ThreadPoolExecutor-0
+    return re.sub(r"_\d+$", "", name).replace(";", "_")
+
+
+class RunProfiler:
+    """cProfile, stack sampling and tracemalloc for one run, across threads.
+
+    Up to Python 3.11 cProfile only sees the thread that enabled it, so the
+    starting thread gets one profile and every function run through wrap()
+    enables the profile of its worker thread; all are merged when written.
+    From 3.12 the starting thread's profile covers every thread. If another
+    profiler is already active, cProfile is left out and the summary says
+    so ("cprofile": false); sampling and tracemalloc still run. A sampler
+    thread records the stacks of all threads every interval seconds, which
+    shows where wall time goes (API latency, YAML, Jinja, waiting) where
+    cProfile only counts CPU-bound calls well. tracemalloc tracks the
+    allocations made between start() and stop().
+    """
+
+    def __init__(self, interval: float = 0.005, top: int = 10):
+        self.interval = interval
+        self.top = top
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles = []
+        self._stacks = Counter()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._started = None
+        self._stopped = None
+        self._cprofile = True
+
+    def _thread_profile(self) -> cProfile.Profile:
+        profile = getattr(self._local, "profile", None)
+        if profile is None:
+            profile = self._local.profile = cProfile.Profile()
+            with self._lock:
+                self._profiles.append(profile)
+        return profile
+
+    def _enable(self, profile: cProfile.Profile) -> bool:
+        """Enable profile unless cProfile is unavailable; False if it is."""
+        if not self._cprofile:
+            return False
+        try:
+            profile.enable()
+        except ValueError:
+            # "Another profiling tool is already active" (Python 3.12+)
+            self._cprofile = False
+            return False
+        return True
+
+    def start(self) -> None:
+        self._started = (time.perf_counter(), time.process_time())
+        tracemalloc.start(1)
+        self._snapshot = tracemalloc.take_snapshot()
+        self._sampler = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        self._sampler.start()
+        self._main = self._thread_profile()
+        self._enable(self._main)
+
+    def wrap(self, fn):
+        """fn, profiled in whatever thread it runs in."""
+        if not PER_THREAD_PROFILES:
+            return fn
+
+        def run(*args, **kwargs):
+            profile = self._thread_profile()
+            if not self._enable(profile):
+                return fn(*args, **kwargs)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+
+        return run
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    module = frame.f_globals.get("__name__", "?")
+                    stack.append(f"{module}:{frame.f_code.co_name}")
+                    frame = frame.f_back
+                stack.append(_thread_label(names.get(ident, "thread")))
+                self._stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        """Stop collecting. Idempotent."""
+        if self._stopped is not None:
+            return
+        self._main.disable()
+        self._stop.set()
+        self._sampler.join()
+        self._final_snapshot = tracemalloc.take_snapshot()
+        _, self._peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self._stopped = (time.perf_counter(), time.process_time())
+
+    def write(self, directory: str) -> dict:
+        """Stop, write the results into directory and return a summary of the hot spots.
+
+        Files: profile.pstats (merged cProfile stats, e.g. for snakeviz),
+        stacks.txt (collapsed stacks, one "frame;frame;... count" line each,
+        for flamegraph.pl or speedscope), memory.txt (allocations by line)
+        and summary.json (the returned summary).
+        """
+        self.stop()
+        os.makedirs(directory, exist_ok=True)
+
+        with self._lock:
+            # Profiles that never got enabled hold nothing
+            profiles = [profile for profile in self._profiles if profile.getstats()]
+        stats = pstats.Stats()
+        for profile in profiles:
+            stats.add(profile)
+        stats.dump_stats(os.path.join(directory, "profile.pstats"))
+
+        with open(os.path.join(directory, "stacks.txt"), "w", encoding="utf-8") as f:
+            for stack, count in sorted(self._stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+        allocations = self._final_snapshot.compare_to(self._snapshot, "lineno")
+        with open(os.path.join(directory, "memory.txt"), "w", encoding="utf-8") as f:
+            f.write(f"Peak traced memory: {self._peak / 1024 / 1024:.1f} MiB\n\n")
+            for stat in allocations[:50]:
+                f.write(f"{stat}\n")
+
+        samples = sum(self._stacks.values())
+        categories = Counter()
+        for stack, count in self._stacks.items():
+            categories[category(stack.split(";")[1:])] += count
+
+        hot_spots = []
+        for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            if "_lsprof" in function or filename == __file__:
+                continue
+            hot_spots.append({
+                "function": pstats.func_std_string((filename, line, function)),
+                "calls": calls,
+                "tottime": round(tottime, 4),
+                "cumtime": round(cumtime, 4),
+            })
+        hot_spots.sort(key=lambda spot: -spot["tottime"])
+
+        summary = {
+            "dir": directory,
+            "wall_sec": round(self._stopped[0] - self._started[0], 3),
+            # Close to wall_sec with many threads busy means they queue for the GIL
+            "cpu_sec": round(self._stopped[1] - self._started[1], 3),
+            "cprofile": self._cprofile,
+            "threads": len(profiles),
+            "samples": samples,
+            "categories": {
+                name: round(count / samples, 3) for name, count in categories.most_common()
+            } if samples else {},
+            "hot_spots": hot_spots[:self.top],
+            "memory_peak_mb": round(self._peak / 1024 / 1024, 1),
+            "top_allocations": [
+                {
+                    "where": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_kb": round(stat.size_diff / 1024, 1),
+                    "count": stat.count_diff,
+                }
+                for stat in allocations[:5]
+            ],
+        }
+        with open(os.path.join(directory, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        return summary
@@ -1,15 +1,23 @@
+import json
 import os
+import re
+from functools import lru_cache
 
-from jinja2 import Environment, FileSystemLoader
 
+CE_MARKER = re.compile(r"^<!-- CE: (.*?) -->$", re.MULTILINE)
+
+# Page meta carried in the frontmatter and the bundle record
+PAGE_META_KEYS = ("title", "slug", "parent", "nav_position", "language", "style")
+
+# Keys in CE annotations that differ from the content element keys
+CE_ANNOTATION_KEYS = {"position": "image_position"}
+
+
+@lru_cache(maxsize=None)
+def _page_template():
+    """Load the page template once; Jinja2 is only imported when rendering."""
+    from jinja2 import Environment, FileSystemLoader
 
-def render_page(
-    page_meta: dict,
-    content_elements: list[dict],
-    company_name: str,
-    image_keywords: list[str] | None = None,
-) -> str:
-    """Render a page to Markdown with YAML frontmatter."""
     templates_dir = os.path.join(os.path.dirname(__file__), "..", "templates")
     env = Environment(
         loader=FileSystemLoader(templates_dir),
@@ -17,11 +25,85 @@ def render_page(
         trim_blocks=True,
         lstrip_blocks=True,
     )
-    template = env.get_template("page.md.j2")
+    # A JSON string is a valid double-quoted YAML scalar, so quotes, colons
+    # and backslashes in titles or company names keep the frontmatter parseable
+    env.filters["yaml_str"] = lambda value: json.dumps(str(value), ensure_ascii=False)
+    return env.get_template("page.md.j2")
 
-    return template.render(
+
+def render_page(
+    page_meta: dict,
+    content_elements: list[dict],
+    company_name: str,
+    image_keywords: list[str] | None = None,
+) -> str:
+    """Render a page to Markdown with YAML frontmatter."""
+    return _page_template().render(
         page=page_meta,
         content_elements=content_elements,
         company_name=company_name,
         image_keywords=image_keywords or [],
     )
+
+
+def render_bundle_record(
+    page_meta: dict,
+    content_elements: list[dict],
+    company_name: str,
+    image_keywords: list[str] | None = None,
+) -> str:
+    """Render a page as one JSON Lines record for the TYPO3 import bundle.
+
+    Carries the same data as the Markdown frontmatter and CE annotations, so
+    an importer can create pages and tt_content records without parsing.
+    """
+    page = {key: page_meta[key] for key in PAGE_META_KEYS if key in page_meta}
+    page["seo"] = {"title": f"{page_meta['title']} - {company_name}"}
+    record = {
+        "page": page,
+        "images": {"search_keywords": image_keywords or []},
+        "content_elements": [
+            {key: ce[key] for key in ("type", "subtype", "image", "image_position", "content") if key in ce}
+            for ce in content_elements
+        ],
+    }
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def parse_page(markdown: str) -> tuple[dict, list[dict], list[str]]:
+    """Parse a page rendered by render_page back into its parts.
+
+    Returns (frontmatter, content_elements, image_keywords). Content elements
+    are split on the <!-- CE: ... --> annotations and carry the same keys
+    (type, subtype, image, image_position, content) that render_page consumes.
+    Raises ValueError if the frontmatter is not valid YAML.
+    """
+    import yaml
+
+    frontmatter = {}
+    body = markdown
+    if markdown.startswith("---"):
+        parts = markdown.split("---", 2)
+        if len(parts) >= 3:
+            try:
+                frontmatter = yaml.safe_load(parts[1]) or {}
+            except yaml.YAMLError as e:
+                raise ValueError(f"Invalid frontmatter: {e}") from e
+            body = parts[2]
+
+    image_keywords = (frontmatter.get("images") or {}).get("search_keywords") or []
+
+    content_elements = []
+    markers = list(CE_MARKER.finditer(body))
+    for i, match in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(body)
+        fields = [f.strip() for f in match.group(1).split(",")]
+        ce = {"type": fields[0]}
+        for field in fields[1:]:
+            key, _, value = field.partition(":")
+            key = key.strip()
+            ce[CE_ANNOTATION_KEYS.get(key, key)] = value.strip()
+        ce["content"] = body[match.end():end].strip()
+        content_elements.append(ce)
+
+    return frontmatter, content_elements, image_keywords
@@ -0,0 +1,194 @@
+import re
+
+
+MARKER = re.compile(r"===CE:(\d+)===|===IMAGES===")
+VARIANT_MARKER = re.compile(r"===VARIANT:([\w-]+)===|===IMAGES===")
+
+# Section ids besides element numbers
+PREAMBLE = "preamble"
+IMAGES = "images"
+DISCARD = "discard"
+
+
+class ResponseParser:
+    """Incremental parser for the ===CE:N=== / ===IMAGES=== response format.
+
+    Text can be fed in arbitrary chunks (e.g. straight from a streamed
+    response); only a trailing partial marker is held back between chunks.
+    Content is mapped by the number in each marker, not by position, so a
+    missing or reordered marker never shifts content into the wrong element.
+
+    After close():
+      elements        {number: text} for every non-empty expected element
+      image_keywords  lines of the ===IMAGES=== section
+      missing         expected numbers without content
+      duplicates      numbers whose marker appeared more than once (first wins)
+      unexpected      marker numbers that were not requested
+    """
+
+    def __init__(self, expected: list[int]):
+        self.expected = list(expected)
+        self.elements: dict[int, str] = {}
+        self.image_keywords: list[str] = []
+        self.missing: list[int] = []
+        self.duplicates: list[int] = []
+        self.unexpected: list[int] = []
+        self._expected_set = set(self.expected)
+        self._parts: dict = {PREAMBLE: [], IMAGES: []}
+        self._current = PREAMBLE
+        self._pending = ""
+        self._closed = False
+
+    def feed(self, chunk: str) -> None:
+        """Consume the next chunk of response text."""
+        if self._closed:
+            raise ValueError("feed() called after close()")
+        if not self._pending and "=" not in chunk:
+            # Fast path: plain text, no marker can start in this chunk
+            self._append(chunk)
+            return
+        data = self._pending + chunk
+        # A marker never spans a newline, so everything up to the last
+        # newline can be consumed. Of the rest, only text from the first "="
+        # on might be the start of a marker that is still incomplete.
+        cut = data.rfind("\n") + 1
+        hold = data.find("=", cut)
+        if hold == -1:
+            hold = len(data)
+        self._consume(data[:hold])
+        self._pending = data[hold:]
+
+    def close(self) -> "ResponseParser":
+        """Flush buffered text and compute elements, keywords and problems."""
+        if self._closed:
+            return self
+        self._consume(self._pending)
+        self._pending = ""
+        self._closed = True
+
+        for n in self.expected:
+            text = "".join(self._parts.get(n, ())).strip()
+            if text:
+                self.elements[n] = text
+
+        # Text before the first marker (e.g. when the model leaves out the
+        # leading ===CE:1===) belongs to the first requested element.
+        preamble = "".join(self._parts[PREAMBLE]).strip()
+        if preamble and self.expected and self.expected[0] not in self.elements:
+            self.elements[self.expected[0]] = preamble
+
+        self.image_keywords = [
+            line.strip()
+            for line in "".join(self._parts[IMAGES]).splitlines()
+            if line.strip()
+        ]
+        self.missing = [n for n in self.expected if n not in self.elements]
+        return self
+
+    def _consume(self, text: str) -> None:
+        pos = 0
+        for match in MARKER.finditer(text):
+            self._append(text[pos:match.start()])
+            pos = match.end()
+            if match.group(1) is None:
+                self._current = IMAGES
+                continue
+            n = int(match.group(1))
+            if n not in self._expected_set:
+                self.unexpected.append(n)
+                self._current = DISCARD
+            elif n in self._parts:
+                self.duplicates.append(n)
+                self._current = DISCARD
+            else:
+                self._parts[n] = []
+                self._current = n
+        self._append(text[pos:])
+
+    def _append(self, text: str) -> None:
+        if text and self._current != DISCARD:
+            self._parts[self._current].append(text)
+
+
+class VariantParser:
+    """Incremental parser for several variants of the same elements.
+
+    The response consists of ===VARIANT:key=== sections, each holding the
+    usual ===CE:N=== markers; every section is handed to its own
+    ResponseParser. Text before the first variant marker belongs to the
+    first variant, sections of unknown or repeated keys are dropped. The
+    ===IMAGES=== section (normally once, at the end) applies to all variants.
+
+    After close():
+      variants        {key: closed ResponseParser} for every expected key
+      image_keywords  lines of the ===IMAGES=== section
+      missing         expected keys without any variant marker
+      unexpected      variant keys that were not requested (or repeated)
+    """
+
+    def __init__(self, keys: list[str], expected: list[int]):
+        self.keys = list(keys)
+        self.variants = {key: ResponseParser(expected) for key in self.keys}
+        self.image_keywords: list[str] = []
+        self.missing: list[str] = []
+        self.unexpected: list[str] = []
+        self._images = ResponseParser([])
+        self._seen: set[str] = set()
+        self._current = self.variants[self.keys[0]] if self.keys else None
+        self._pending = ""
+        self._closed = False
+
+    def feed(self, chunk: str) -> None:
+        """Consume the next chunk of response text."""
+        if self._closed:
+            raise ValueError("feed() called after close()")
+        data = self._pending + chunk
+        # Same hold-back rule as ResponseParser: only text from the first
+        # "=" after the last newline can be an incomplete marker.
+        cut = data.rfind("\n") + 1
+        hold = data.find("=", cut)
+        if hold == -1:
+            hold = len(data)
+        self._consume(data[:hold])
+        self._pending = data[hold:]
+
+    def close(self) -> "VariantParser":
+        """Flush buffered text and close every variant."""
+        if self._closed:
+            return self
+        self._consume(self._pending)
+        self._pending = ""
+        self._closed = True
+        for parser in self.variants.values():
+            parser.close()
+        self.image_keywords = self._images.close().image_keywords
+        self.missing = [key for key in self.keys if key not in self._seen]
+        return self
+
+    def _consume(self, text: str) -> None:
+        pos = 0
+        for match in VARIANT_MARKER.finditer(text):
+            self._append(text[pos:match.start()])
+            pos = match.end()
+            key = match.group(1)
+            if key is None:
+                self._current = self._images
+                self._images.feed("===IMAGES===\n")
+            elif key in self.variants and key not in self._seen:
+                self._seen.add(key)
+                self._current = self.variants[key]
+            else:
+                self.unexpected.append(key)
+                self._current = None
+        self._append(text[pos:])
+
+    def _append(self, text: str) -> None:
+        if text and self._current is not None:
+            self._current.feed(text)
+
+
+def parse_response(text: str, expected: list[int]) -> ResponseParser:
+    """Parse a complete response text in one go."""
+    parser = ResponseParser(expected)
+    parser.feed(text)
+    return parser.close()
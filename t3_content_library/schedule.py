@@ -0,0 +1,117 @@
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+
+
+def dependency_graph(structures: list[dict]) -> dict[str, list[str]]:
+    """Map each page id to the ids of the pages it depends on (depends_on).
+
+    Dependencies on pages outside the given structures (e.g. not part of the
+    page set) are dropped, such pages are generated without that context.
+    Raises ValueError if the dependencies contain a cycle.
+    """
+    ids = [structure["id"] for structure in structures]
+    known = set(ids)
+    graph = {
+        structure["id"]: [dep for dep in structure.get("depends_on", []) if dep in known]
+        for structure in structures
+    }
+    topological_order(graph)
+    return graph
+
+
+def topological_order(graph: dict[str, list[str]]) -> list[str]:
+    """Page ids ordered so that every page comes after its dependencies."""
+    order = []
+    state = {}
+
+    def visit(node, path):
+        if state.get(node) == "done":
+            return
+        if state.get(node) == "visiting":
+            cycle = " -> ".join(path[path.index(node):] + [node])
+            raise ValueError(f"Cyclic page dependencies: {cycle}")
+        state[node] = "visiting"
+        for dep in graph[node]:
+            visit(dep, path + [node])
+        state[node] = "done"
+        order.append(node)
+
+    for node in graph:
+        visit(node, [])
+    return order
+
+
+def heights(graph: dict[str, list[str]]) -> dict[str, int]:
+    """Number of pages on the longest chain from each page to a page nothing depends on."""
+    dependents = {node: [] for node in graph}
+    for node, deps in graph.items():
+        for dep in deps:
+            dependents[dep].append(node)
+    result = {}
+    for node in reversed(topological_order(graph)):
+        result[node] = 1 + max((result[d] for d in dependents[node]), default=0)
+    return result
+
+
+def critical_path(graph: dict[str, list[str]], durations: dict[str, float]) -> tuple[float, list[str]]:
+    """Longest chain of dependent pages by duration: (seconds, page ids).
+
+    This is the shortest possible wall time of the run with unlimited
+    parallelism; the gap to the actual wall time is queueing behind --parallel.
+    """
+    finish = {}
+    previous = {}
+    for node in topological_order(graph):
+        start, before = 0.0, None
+        for dep in graph[node]:
+            if finish[dep] > start:
+                start, before = finish[dep], dep
+        finish[node] = start + durations.get(node, 0.0)
+        previous[node] = before
+    if not finish:
+        return 0.0, []
+    node = max(finish, key=finish.get)
+    length = finish[node]
+    path = []
+    while node is not None:
+        path.append(node)
+        node = previous[node]
+    return length, path[::-1]
+
+
+def run_graph(executor: Executor, graph: dict[str, list[str]], fn) -> dict:
+    """Run fn(node, {dep: result}) for every node once all its dependencies are done.
+
+    Independent nodes run fully in parallel. Ready nodes are submitted
+    longest remaining chain first, so with a bounded executor the pages
+    that others wait for are not stuck behind leaf pages. The first
+    exception stops further submissions and is raised. Returns {node: result}.
+    """
+    priority = heights(graph)
+    waiting = {node: set(deps) for node, deps in graph.items()}
+    dependents = {node: [] for node in graph}
+    for node, deps in graph.items():
+        for dep in deps:
+            dependents[dep].append(node)
+
+    results = {}
+    running = {}
+
+    def submit_ready(nodes):
+        for node in sorted(nodes, key=lambda n: -priority[n]):
+            del waiting[node]
+            upstream = {dep: results[dep] for dep in graph[node]}
+            running[executor.submit(fn, node, upstream)] = node
+
+    submit_ready([node for node, deps in waiting.items() if not deps])
+    while running:
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        ready = []
+        for future in done:
+            node = running.pop(future)
+            results[node] = future.result()
+            for dependent in dependents[node]:
+                waiting[dependent].discard(node)
+                if not waiting[dependent]:
+                    ready.append(dependent)
+        submit_ready(ready)
+    return results
@@ -0,0 +1,187 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    title TEXT NOT NULL,
+    company TEXT NOT NULL,
+    ce_types TEXT NOT NULL,
+    content TEXT NOT NULL,
+    image_keywords TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (source, slug)
+);
+
+-- External-content FTS table: the text lives once, in pages
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+    title, company, ce_types, content, image_keywords,
+    content='pages', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS pages_ai AFTER INSERT ON pages BEGIN
+    INSERT INTO pages_fts (rowid, title, company, ce_types, content, image_keywords)
+    VALUES (NEW.id, NEW.title, NEW.company, NEW.ce_types, NEW.content, NEW.image_keywords);
+END;
+CREATE TRIGGER IF NOT EXISTS pages_ad AFTER DELETE ON pages BEGIN
+    INSERT INTO pages_fts (pages_fts, rowid, title, company, ce_types, content, image_keywords)
+    VALUES ('delete', OLD.id, OLD.title, OLD.company, OLD.ce_types, OLD.content, OLD.image_keywords);
+END;
+CREATE TRIGGER IF NOT EXISTS pages_au AFTER UPDATE ON pages BEGIN
+    INSERT INTO pages_fts (pages_fts, rowid, title, company, ce_types, content, image_keywords)
+    VALUES ('delete', OLD.id, OLD.title, OLD.company, OLD.ce_types, OLD.content, OLD.image_keywords);
+    INSERT INTO pages_fts (rowid, title, company, ce_types, content, image_keywords)
+    VALUES (NEW.id, NEW.title, NEW.company, NEW.ce_types, NEW.content, NEW.image_keywords);
+END;
+"""
+
+# bm25 column weights: title, company, ce_types, content, image_keywords
+RANK = "bm25(pages_fts, 10.0, 4.0, 1.0, 1.0, 2.0)"
+
+# An update (not a REPLACE) so the FTS triggers see the old row
+UPSERT = """
+ON CONFLICT (source, slug) DO UPDATE SET
+    filename=excluded.filename, title=excluded.title,
+    company=excluded.company, ce_types=excluded.ce_types,
+    content=excluded.content, image_keywords=excluded.image_keywords,
+    updated_at=excluded.updated_at
+"""
+
+# Pages of a directory and its subdirectories
+UNDER = "(source = :src OR substr(source, 1, length(:src) + 1) = :src || :sep)"
+
+TOKEN = re.compile(r"\w+")
+
+
+def match_query(text: str) -> str:
+    """Turn free text into an FTS5 query: every word must match as a prefix.
+
+    Quoting each word keeps FTS5 syntax characters in user input harmless.
+    """
+    return " ".join(f'"{token}"*' for token in TOKEN.findall(text))
+
+
+class SearchIndex:
+    """SQLite FTS5 index over generated pages, one row per page.
+
+    Pages are keyed by (source, slug), source being the output directory
+    relative to the index file, so indexing a page again replaces it and an
+    index moved together with its outputs stays valid. Safe to share between
+    threads; other processes may read and write the same file concurrently.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+
+    def source(self, output_dir: str) -> str:
+        """Key under which pages of output_dir are stored."""
+        return os.path.relpath(os.path.abspath(output_dir), os.path.dirname(self.path))
+
+    def add_page(
+        self,
+        output_dir: str,
+        filename: str,
+        page: dict,
+        content_elements: list[dict],
+        company_name: str,
+        image_keywords: list[str] | None = None,
+    ) -> None:
+        """Index (or re-index) one page, filename being relative to output_dir."""
+        types = []
+        for ce in content_elements:
+            for name in (ce["type"], ce.get("subtype")):
+                if name and name not in types:
+                    types.append(name)
+        row = (
+            self.source(output_dir),
+            page["slug"],
+            filename,
+            page["title"],
+            company_name,
+            " ".join(types),
+            "\n\n".join(ce["content"] for ce in content_elements),
+            "\n".join(image_keywords or []),
+            time.time(),
+        )
+        with self._lock, self._db:
+            self._db.execute(
+                f"""
+                INSERT INTO pages (
+                    source, slug, filename, title, company, ce_types,
+                    content, image_keywords, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                {UPSERT}
+                """,
+                row,
+            )
+
+    def copy_source(self, src_dir: str, dst_dir: str) -> None:
+        """Index the pages under src_dir again under dst_dir (for copied outputs)."""
+        src, dst = self.source(src_dir), self.source(dst_dir)
+        with self._lock, self._db:
+            self._db.execute(
+                f"""
+                INSERT INTO pages (
+                    source, slug, filename, title, company, ce_types,
+                    content, image_keywords, updated_at
+                )
+                SELECT :dst || substr(source, length(:src) + 1), slug, filename, title, company, ce_types,
+                       content, image_keywords, updated_at
+                FROM pages WHERE {UNDER}
+                {UPSERT}
+                """,
+                {"src": src, "dst": dst, "sep": os.sep},
+            )
+
+    def remove_source(self, output_dir: str) -> int:
+        """Drop all pages under output_dir. Returns the number removed."""
+        src = self.source(output_dir)
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                f"DELETE FROM pages WHERE {UNDER}", {"src": src, "sep": os.sep}
+            )
+            return cursor.rowcount
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> list[dict]:
+        """Best matching pages for a free-text query, best first.
+
+        Each hit has source, slug, filename, title, company, ce_types, a
+        snippet with matches wrapped in <mark> and its bm25 score (lower is
+        better).
+        """
+        expression = match_query(query)
+        if not expression:
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                f"""
+                SELECT p.source, p.slug, p.filename, p.title, p.company, p.ce_types,
+                       snippet(pages_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet,
+                       {RANK} AS score
+                FROM pages_fts JOIN pages p ON p.id = pages_fts.rowid
+                WHERE pages_fts MATCH ?
+                ORDER BY score
+                LIMIT ? OFFSET ?
+                """,
+                (expression, limit, offset),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
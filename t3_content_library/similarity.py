@@ -0,0 +1,140 @@
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import struct
+import threading
+
+# 128 hash functions in 32 bands of 4 rows: pairs with a Jaccard similarity
+# of 0.6 share at least one band with ~99% probability, pairs below 0.2
+# rarely do. Candidates are then verified with the exact Jaccard similarity.
+NUM_PERM = 128
+BANDS = 32
+SHINGLE_SIZE = 3
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240101)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+WORD = re.compile(r"\w+")
+
+
+def normalize_company(text: str) -> str:
+    """Lowercase words only, so punctuation and spacing never matter."""
+    return " ".join(WORD.findall(text.casefold()))
+
+
+def shingles(text: str, k: int = SHINGLE_SIZE) -> set[str]:
+    """Character k-grams of the normalized text."""
+    normalized = normalize_company(text)
+    if len(normalized) <= k:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + k] for i in range(len(normalized) - k + 1)}
+
+
+def jaccard(a: str, b: str) -> float:
+    """Exact Jaccard similarity of the shingle sets of two company descriptions."""
+    sa, sb = shingles(a), shingles(b)
+    if not sa or not sb:
+        return 0.0
+    return len(sa & sb) / len(sa | sb)
+
+
+def minhash(text: str) -> list[int]:
+    """MinHash signature of the shingle set (stable across processes)."""
+    hashes = [
+        struct.unpack("<Q", hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest())[0]
+        for s in shingles(text)
+    ]
+    if not hashes:
+        return [_PRIME] * NUM_PERM
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def lsh_bands(signature: list[int]) -> list[str]:
+    """One bucket key per band; similar signatures share at least one key."""
+    rows = len(signature) // BANDS
+    keys = []
+    for band in range(BANDS):
+        chunk = signature[band * rows:(band + 1) * rows]
+        digest = hashlib.blake2b(struct.pack(f"<{rows}Q", *chunk), digest_size=8).hexdigest()
+        keys.append(f"{band}:{digest}")
+    return keys
+
+
+class CompanyIndex:
+    """Persistent near-duplicate index over company descriptions.
+
+    Stores the LSH band keys of every company added, so find() only compares
+    against companies sharing a band instead of scanning all of them. Safe to
+    share between threads and processes.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._db.executescript(
+                """
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS companies (
+                    id INTEGER PRIMARY KEY,
+                    normalized TEXT NOT NULL UNIQUE,
+                    company TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS company_bands (
+                    band TEXT NOT NULL,
+                    company_id INTEGER NOT NULL REFERENCES companies (id),
+                    PRIMARY KEY (band, company_id)
+                ) WITHOUT ROWID;
+                """
+            )
+
+    def add(self, company: str) -> None:
+        """Remember a company description (no-op if already known)."""
+        normalized = normalize_company(company)
+        if not normalized:
+            return
+        bands = lsh_bands(minhash(company))
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO companies (normalized, company) VALUES (?, ?)",
+                (normalized, company),
+            )
+            if cursor.rowcount:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO company_bands (band, company_id) VALUES (?, ?)",
+                    [(band, cursor.lastrowid) for band in bands],
+                )
+
+    def find(self, company: str, threshold: float, limit: int = 5) -> list[tuple[str, float]]:
+        """Known companies with a Jaccard similarity >= threshold, most similar first.
+
+        The company itself (same normalized text) is not included.
+        """
+        normalized = normalize_company(company)
+        bands = lsh_bands(minhash(company))
+        with self._lock:
+            rows = self._db.execute(
+                f"""
+                SELECT DISTINCT c.company, c.normalized FROM company_bands b
+                JOIN companies c ON c.id = b.company_id
+                WHERE b.band IN ({", ".join("?" * len(bands))})
+                """,
+                bands,
+            ).fetchall()
+        matches = []
+        for candidate, candidate_normalized in rows:
+            if candidate_normalized == normalized:
+                continue
+            score = jaccard(company, candidate)
+            if score >= threshold:
+                matches.append((candidate, round(score, 3)))
+        matches.sort(key=lambda m: -m[1])
+        return matches[:limit]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,646 @@
+import asyncio
+import json
+import os
+from collections import OrderedDict
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("aiosqlite")
+
+from backend import app as backend_app  # noqa: E402
+from backend import db, storage, warm_pool  # noqa: E402
+from t3_content_library.cli import LIBRARY_MANIFEST  # noqa: E402
+
+# Stands in for generate.py: records its arguments, prints the events in
+# FAKE_EVENTS (a JSON list in the environment of the test) and exits. With
+# FAKE_SLEEP it then runs that many seconds and notes in "overlap" if another
+# fake run was active meanwhile. SIGTERM prints FAKE_TERM_EVENTS and exits,
+# unless FAKE_IGNORE_TERM is set.
+FAKE_CLI = """
+import json, os, signal, sys, time
+here = os.path.dirname(os.path.abspath(__file__))
+
+
+def on_term(signum, frame):
+    if os.environ.get("FAKE_IGNORE_TERM"):
+        return
+    for event in json.loads(os.environ.get("FAKE_TERM_EVENTS", "[]")):
+        print(json.dumps(event), flush=True)
+    sys.exit(1)
+
+
+signal.signal(signal.SIGTERM, on_term)
+with open(os.path.join(here, "argv.jsonl"), "a", encoding="utf-8") as f:
+    f.write(json.dumps(sys.argv[1:]) + "\\n")
+for event in json.loads(os.environ.get("FAKE_EVENTS", "[]")):
+    print(json.dumps(event), flush=True)
+if os.environ.get("FAKE_SLEEP"):
+    busy = os.path.join(here, "busy")
+    if os.path.exists(busy):
+        open(os.path.join(here, "overlap"), "w").close()
+    open(busy, "w").close()
+    time.sleep(float(os.environ["FAKE_SLEEP"]))
+    os.remove(busy)
+"""
+
+# Runs the real CLI (indexing, output, events) with the API calls replaced:
+# every element reads "<page title> bei <company>.", the Kontakt page
+# also names the opening hours and Über uns asks to get in touch
+INDEXING_CLI = """
+from unittest.mock import patch
+
+from t3_content_library.cli import main
+
+EXTRA = {"kontakt": " Öffnungszeiten: Mo-Fr 6-18 Uhr.", "ueber-uns": " Nehmen Sie Kontakt mit uns auf."}
+
+
+def generate(structure, company, client=None, response_mode="markers", context=None):
+    page = structure["page"]
+    text = f"{page['title']} bei {company}." + EXTRA.get(page["slug"], "")
+    elements = [{"type": ce["type"], "content": text} for ce in structure["content_elements"]]
+    return elements, {"input_tokens": 10, "output_tokens": 20}, ["bakery"]
+
+
+with patch("t3_content_library.cli.anthropic"), \\
+        patch("t3_content_library.cli.generate_content_for_page", side_effect=generate):
+    main()
+"""
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    """The backend with its database, output and CLI (a fake generate.py) in tmp_path."""
+    lib = tmp_path / "lib"
+    (lib / "config" / "styles").mkdir(parents=True)
+    (lib / "generate.py").write_text(FAKE_CLI, encoding="utf-8")
+    output_base = tmp_path / "outputs"
+    output_base.mkdir()
+
+    monkeypatch.setattr(db, "OUTPUT_BASE", str(output_base))
+    monkeypatch.setattr(db, "DB_PATH", str(output_base / "t3_jobs.db"))
+    monkeypatch.setattr(storage, "OUTPUT_BASE", str(output_base))
+    monkeypatch.setattr(storage, "BLOB_DIR", str(output_base / "blobs"))
+    monkeypatch.setattr(backend_app, "T3_LIB_PATH", str(lib))
+    monkeypatch.setattr(backend_app, "OUTPUT_BASE", str(output_base))
+    monkeypatch.setattr(backend_app, "PAGE_CACHE_DIR", str(output_base / "page-cache"))
+    monkeypatch.setattr(backend_app, "SEARCH_INDEX_DB", str(output_base / "search.db"))
+    monkeypatch.setattr(backend_app, "WARM_POOL", {})
+    monkeypatch.setattr(warm_pool, "readers", {})
+    monkeypatch.setattr(backend_app, "jobs", {})
+    monkeypatch.setattr(backend_app, "inflight", {})
+    monkeypatch.setattr(backend_app, "job_cache", OrderedDict())
+    monkeypatch.setattr(backend_app, "search_index", [])
+    monkeypatch.setattr(backend_app, "regenerate_locks", {})
+    monkeypatch.delenv("FAKE_EVENTS", raising=False)
+    monkeypatch.delenv("FAKE_SLEEP", raising=False)
+    monkeypatch.delenv("FAKE_TERM_EVENTS", raising=False)
+    monkeypatch.delenv("FAKE_IGNORE_TERM", raising=False)
+    asyncio.run(db.init_db())
+    return lib
+
+
+async def _get(path: str, query: str = "", headers: dict | None = None) -> tuple[int, dict, bytes]:
+    """GET path from the ASGI app: (status code, headers, body)."""
+    return await _request("GET", path, query, headers)
+
+
+async def _request(
+    method: str, path: str, query: str = "", headers: dict | None = None
+) -> tuple[int, dict, bytes]:
+    """Send a bodyless request to the ASGI app: (status code, headers, body)."""
+    scope = {
+        "type": "http", "method": method, "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": query.encode(), "http_version": "1.1", "scheme": "http",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "server": ("testserver", 80), "client": ("testclient", 50000),
+    }
+    messages = []
+    requested = []
+    done = asyncio.Event()
+
+    async def receive():
+        # The request, then a disconnect once the response is complete
+        if not requested:
+            requested.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body"):
+            done.set()
+
+    await backend_app.app(scope, receive, send)
+    start = messages[0]
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}, body
+
+
+def _argv(lib) -> list[list[str]]:
+    """Arguments of every fake CLI run so far."""
+    with open(lib / "argv.jsonl", "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+async def _generate(**fields) -> "backend_app.JobStatus":
+    """Start a job and wait until it is finished and persisted."""
+    job = await backend_app.start_generation(backend_app.GenerateRequest(**fields))
+    await backend_app.jobs[job.job_id]["task"]
+    return backend_app.jobs[job.job_id]["status"]
+
+
+def test_fresh_job_refreshes_page_cache_without_reuse(backend):
+    async def run():
+        await _generate(company="Testfirma", page_set="small")
+        await _generate(company="Testfirma", page_set="small", fresh=True)
+
+    asyncio.run(run())
+
+    default, fresh = _argv(backend)
+    assert "--cache-dir" in default and "--refresh-cache" not in default
+    assert "--reuse-similar" in default
+    assert "--cache-dir" in fresh and "--refresh-cache" in fresh
+    assert "--reuse-similar" not in fresh
+
+
+def test_regenerate_uses_response_mode_of_stored_job(backend, tmp_path):
+    """A job known only from the database is regenerated in the mode it was generated in."""
+    output_dir = tmp_path / "outputs" / "ABC123"
+    (output_dir / "testfirma").mkdir(parents=True)
+    (output_dir / "testfirma" / "ueber-uns.md").write_text("---\ntitle: \"Über uns\"\n---\n", encoding="utf-8")
+    status = backend_app.JobStatus(
+        job_id="ABC123", status="completed", progress=100, output_dir=str(output_dir),
+        created_at="2026-01-01T10:00:00", response_mode="tool",
+    )
+
+    async def run():
+        await db.save_job("ABC123", "Testfirma", "small", status)
+        return await backend_app.regenerate_element("ABC123", "ueber-uns", 2)
+
+    result = asyncio.run(run())
+
+    argv = _argv(backend)[-1]
+    assert argv[argv.index("--response-mode") + 1] == "tool"
+    # The regenerated page replaces its copy in the page cache
+    assert argv[argv.index("--cache-dir") + 1] == backend_app.PAGE_CACHE_DIR
+    assert result["job"].response_mode == "tool"
+
+
+def test_regenerations_of_one_job_run_one_after_another(backend, tmp_path, monkeypatch):
+    output_dir = tmp_path / "outputs" / "ABC123"
+    (output_dir / "testfirma").mkdir(parents=True)
+    (output_dir / "testfirma" / "ueber-uns.md").write_text("---\ntitle: \"Über uns\"\n---\n", encoding="utf-8")
+    status = backend_app.JobStatus(
+        job_id="ABC123", status="completed", progress=100, output_dir=str(output_dir),
+        created_at="2026-01-01T10:00:00",
+    )
+    monkeypatch.setenv("FAKE_SLEEP", "0.3")
+    monkeypatch.setenv("FAKE_EVENTS", json.dumps([{"event": "complete", "total_input_tokens": 10}]))
+
+    async def run():
+        await db.save_job("ABC123", "Testfirma", "small", status)
+        await asyncio.gather(
+            backend_app.regenerate_element("ABC123", "ueber-uns", 1),
+            backend_app.regenerate_element("ABC123", "ueber-uns", 2),
+        )
+        return await db.get_job("ABC123")
+
+    row = asyncio.run(run())
+
+    assert len(_argv(backend)) == 2
+    assert not (backend / "overlap").exists()
+    # Each regeneration adds to what the previous one stored
+    assert row["input_tokens"] == 20
+
+
+def test_regenerate_unknown_job(backend):
+    with pytest.raises(backend_app.HTTPException) as e:
+        asyncio.run(backend_app.regenerate_element("NOPE12", "ueber-uns", 1))
+    assert e.value.status_code == 404
+    assert backend_app.regenerate_locks == {}
+
+
+def test_search_finds_pages_of_generated_job(backend, monkeypatch):
+    """Pages the CLI indexes during a job are found by /api/search, umlauts folded."""
+    (backend / "generate.py").write_text(INDEXING_CLI, encoding="utf-8")
+    monkeypatch.setenv("PYTHONPATH", os.path.abspath(REPO_ROOT))
+
+    async def run():
+        job = await _generate(company="Bäckerei Müller in Köln", page_set="small", reuse_similar=False)
+        searches = {}
+        for q in ("kontakt", "offnungszeiten", "backerei mull"):
+            status, _, body = await _get("/api/search", f"q={q}")
+            assert status == 200
+            searches[q] = json.loads(body)["results"]
+        return job, searches
+
+    job, searches = asyncio.run(run())
+
+    assert job.status == "completed", job.error
+    kontakt = searches["kontakt"]
+    # The title outweighs a mention in the body
+    assert [hit["slug"] for hit in kontakt] == ["kontakt", "ueber-uns"]
+    assert kontakt[0]["job_id"] == job.job_id
+    assert kontakt[0]["path"] == os.path.join("bäckerei-müller-in-köln", "kontakt.md")
+    assert kontakt[0]["score"] < kontakt[1]["score"]
+
+    hours = searches["offnungszeiten"]
+    assert len(hours) == 1
+    assert "<mark>Öffnungszeiten</mark>" in hours[0]["snippet"]
+
+    # Prefix and folded umlauts match the company on every page
+    assert len(searches["backerei mull"]) == 8
+    assert all(hit["company"] == "Bäckerei Müller in Köln" for hit in searches["backerei mull"])
+
+
+def _bundle_job(tmp_path, outputs: dict, **fields) -> "backend_app.JobStatus":
+    """A completed job with one bundle per output directory below testfirma/."""
+    output_dir = tmp_path / "outputs" / "ABC123"
+    for output, records in outputs.items():
+        (output_dir / "testfirma" / output).mkdir(parents=True)
+        lines = "".join(json.dumps(record) + "\n" for record in records)
+        (output_dir / "testfirma" / output / "bundle.jsonl").write_text(lines, encoding="utf-8")
+    status = backend_app.JobStatus(
+        job_id="ABC123", status="completed", progress=100, output_dir=str(output_dir),
+        created_at="2026-01-01T10:00:00", **fields,
+    )
+    asyncio.run(db.save_job("ABC123", "Testfirma", "small", status))
+    return status
+
+
+def test_bundle_of_multilingual_job(backend, tmp_path):
+    _bundle_job(
+        tmp_path,
+        {lang: [{"page": {"title": "AGB", "language": lang}}] for lang in ("de", "en")},
+        languages=["de", "en"],
+    )
+
+    async def run():
+        return {
+            lang: await _get("/api/jobs/ABC123/bundle", f"lang={lang}" if lang else "")
+            for lang in (None, "de", "en", "fr")
+        }
+
+    responses = asyncio.run(run())
+
+    def languages(body):
+        return [json.loads(line)["page"]["language"] for line in body.splitlines()]
+
+    status, headers, body = responses[None]
+    assert status == 200
+    assert sorted(languages(body)) == ["de", "en"]
+    for lang in ("de", "en"):
+        status, headers, body = responses[lang]
+        assert status == 200
+        assert languages(body) == [lang]
+        assert f"t3-content-ABC123-{lang}.jsonl" in headers["content-disposition"]
+    assert responses["fr"][0] == 404
+
+
+def test_bundle_of_variant_job(backend, tmp_path):
+    _bundle_job(
+        tmp_path,
+        {style: [{"page": {"title": "AGB", "style": style}}] for style in ("professionell", "warm")},
+        variants=["professionell", "warm"],
+    )
+
+    async def run():
+        return {
+            style: await _get("/api/jobs/ABC123/bundle", f"style={style}" if style else "")
+            for style in (None, "professionell", "warm", "modern")
+        }
+
+    responses = asyncio.run(run())
+
+    def styles(body):
+        return [json.loads(line)["page"]["style"] for line in body.splitlines()]
+
+    assert sorted(styles(responses[None][2])) == ["professionell", "warm"]
+    for style in ("professionell", "warm"):
+        status, headers, body = responses[style]
+        assert status == 200
+        assert styles(body) == [style]
+        assert f"t3-content-ABC123-{style}.jsonl" in headers["content-disposition"]
+    assert responses["modern"][0] == 404
+
+
+PAGE_DONE = {"event": "page_done", "done": 1, "total": 8, "title": "Startseite",
+             "input_tokens": 100, "output_tokens": 200}
+
+
+async def _until(condition, timeout: float = 10):
+    """Wait until condition() holds."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+
+async def _start_running(**fields) -> str:
+    """Start a job and wait until its CLI has reported the first page."""
+    job = await backend_app.start_generation(backend_app.GenerateRequest(**fields))
+    await _until(lambda: backend_app.jobs[job.job_id]["run_status"].pages_done)
+    return job.job_id
+
+
+def test_cancel_reports_tokens_spent_so_far(backend, monkeypatch):
+    monkeypatch.setenv("FAKE_EVENTS", json.dumps([PAGE_DONE]))
+    monkeypatch.setenv("FAKE_SLEEP", "30")
+    monkeypatch.setenv("FAKE_TERM_EVENTS", json.dumps([
+        {"event": "cancelled", "total_input_tokens": 150, "total_output_tokens": 250, "cost_usd": 0.5},
+    ]))
+
+    async def run():
+        job_id = await _start_running(company="Testfirma", page_set="small")
+        status = await backend_app.cancel_job(job_id)
+        return status, await db.get_job(job_id)
+
+    status, row = asyncio.run(run())
+
+    assert status.status == "cancelled"
+    assert (status.input_tokens, status.output_tokens, status.cost_usd) == (150, 250, 0.5)
+    assert status.pages_done == 1
+    assert row["status"] == "cancelled"
+    assert row["input_tokens"] == 150
+
+
+def test_cancel_kills_cli_that_ignores_sigterm(backend, monkeypatch):
+    monkeypatch.setattr(backend_app, "CANCEL_GRACE_SEC", 0.2)
+    monkeypatch.setenv("FAKE_EVENTS", json.dumps([PAGE_DONE]))
+    monkeypatch.setenv("FAKE_SLEEP", "30")
+    monkeypatch.setenv("FAKE_IGNORE_TERM", "1")
+
+    async def run():
+        job_id = await _start_running(company="Testfirma", page_set="small")
+        status = await backend_app.cancel_job(job_id)
+        return status, backend_app.jobs[job_id]["process"]
+
+    status, process = asyncio.run(run())
+
+    assert process.returncode == -9
+    assert status.status == "cancelled"
+    # No cancelled event, the cost is estimated from the pages reported so far
+    assert status.input_tokens == 100
+    assert status.cost_usd > 0
+
+
+def test_cancel_follower_detaches_from_running_job(backend, monkeypatch):
+    monkeypatch.setenv("FAKE_EVENTS", json.dumps([PAGE_DONE]))
+    monkeypatch.setenv("FAKE_SLEEP", "0.5")
+
+    async def run():
+        leader_id = await _start_running(company="Testfirma", page_set="small")
+        follower = await backend_app.start_generation(
+            backend_app.GenerateRequest(company="Testfirma", page_set="small")
+        )
+        assert follower.coalesced_with == leader_id
+        cancelled = await backend_app.cancel_job(follower.job_id)
+        assert backend_app.jobs[leader_id]["followers"] == []
+        assert backend_app.jobs[leader_id]["process"].returncode is None
+        await backend_app.jobs[leader_id]["task"]
+        return cancelled, await db.get_job(leader_id), await db.get_job(follower.job_id)
+
+    cancelled, leader_row, follower_row = asyncio.run(run())
+
+    assert cancelled.status == "cancelled"
+    assert leader_row["status"] == "completed"
+    assert follower_row["status"] == "cancelled"
+    assert len(_argv(backend)) == 1
+
+
+def test_cancel_leader_keeps_run_going_for_its_followers(backend, monkeypatch):
+    monkeypatch.setenv("FAKE_EVENTS", json.dumps([PAGE_DONE]))
+    monkeypatch.setenv("FAKE_SLEEP", "0.5")
+
+    async def run():
+        leader_id = await _start_running(company="Testfirma", page_set="small")
+        follower = await backend_app.start_generation(
+            backend_app.GenerateRequest(company="Testfirma", page_set="small")
+        )
+        code, _, body = await _request("DELETE", f"/api/jobs/{leader_id}")
+        assert code == 200
+        assert backend_app.jobs[leader_id]["process"].returncode is None
+        await backend_app.jobs[leader_id]["task"]
+        return (
+            json.loads(body), backend_app.jobs[follower.job_id]["status"],
+            await db.get_job(leader_id), await db.get_job(follower.job_id),
+        )
+
+    cancelled, follower, leader_row, follower_row = asyncio.run(run())
+
+    assert cancelled["status"] == "cancelled"
+    assert follower.status == "completed"
+    assert leader_row["status"] == "cancelled"
+    assert follower_row["status"] == "completed"
+
+
+def test_cancel_last_follower_stops_run_of_cancelled_leader(backend, monkeypatch):
+    monkeypatch.setenv("FAKE_EVENTS", json.dumps([PAGE_DONE]))
+    monkeypatch.setenv("FAKE_SLEEP", "30")
+
+    async def run():
+        leader_id = await _start_running(company="Testfirma", page_set="small")
+        follower = await backend_app.start_generation(
+            backend_app.GenerateRequest(company="Testfirma", page_set="small")
+        )
+        await backend_app.cancel_job(leader_id)
+        await backend_app.cancel_job(follower.job_id)
+        await backend_app.jobs[leader_id]["task"]
+        return backend_app.jobs[leader_id]["process"], await db.get_job(leader_id)
+
+    process, leader_row = asyncio.run(run())
+
+    assert process.returncode != 0
+    assert leader_row["status"] == "cancelled"
+
+
+def test_warm_pool_serves_only_opted_in_matching_requests(backend, tmp_path, monkeypatch):
+    """Everything but an opted-in request matching a built library is generated as usual."""
+    monkeypatch.setattr(warm_pool, "WARM_POOL_DIR", str(tmp_path / "warm-pool"))
+    monkeypatch.setattr(backend_app, "WARM_POOL", {"archetypes": {
+        "restaurant": {"company": "Restaurant Musterhaus in Musterstadt", "keywords": ["pizzeria"]},
+        "kanzlei": {"company": "Kanzlei Musterhaus in Musterstadt", "suffixes": ["anwaltskanzlei"]},
+    }})
+    library = warm_pool.library_dir("restaurant", "small")
+    os.makedirs(library)
+    with open(os.path.join(library, LIBRARY_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({"created_at": "2026-01-01T10:00:00"}, f)
+
+    async def run():
+        await _generate(company="Pizzeria Da Mario", page_set="small", use_warm_pool=True)
+        await _generate(company="Pizzeria Da Luigi", page_set="small")
+        await _generate(company="Pizzeriabedarf Meier", page_set="small", use_warm_pool=True)
+        await _generate(company="Rechtsanwaltskanzlei Weber", page_set="small", use_warm_pool=True)
+        await _generate(company="Pizzeria Da Mario", page_set="medium", use_warm_pool=True)
+
+    asyncio.run(run())
+
+    served, default, no_match, not_built, other_set = _argv(backend)
+    assert served[served.index("--personalize") + 1] == library
+    # Released once its run ended, so a rebuild can replace the library
+    assert warm_pool.readers == {}
+    for argv in (default, no_match, not_built, other_set):
+        assert "--personalize" not in argv
+
+
+async def _save(job_id: str, company: str = "Muster GmbH", page_set: str = "small", **fields):
+    """Persist a job row as the backend does when a job finishes."""
+    fields.setdefault("status", "completed")
+    fields.setdefault("progress", 100)
+    fields.setdefault("created_at", "2026-03-02T10:00:00")
+    await db.save_job(job_id, company, page_set, backend_app.JobStatus(job_id=job_id, **fields))
+
+
+def test_job_history_pages_through_equal_created_at(backend):
+    """Jobs created in the same second are split across pages without gaps or repeats."""
+    async def run():
+        await _save("job-late", created_at="2026-03-02T11:00:00")
+        for job_id in ("job-a", "job-b", "job-c", "job-d"):
+            await _save(job_id)
+        await _save("job-early", created_at="2026-03-02T09:00:00")
+        pages, cursor = [], ""
+        while True:
+            status, _, body = await _get("/api/jobs", f"limit=2{cursor}")
+            assert status == 200
+            page = json.loads(body)
+            pages.append([job["job_id"] for job in page["jobs"]])
+            if not page["next_cursor"]:
+                return pages
+            cursor = f"&cursor={page['next_cursor']}"
+
+    assert asyncio.run(run()) == [["job-late", "job-d"], ["job-c", "job-b"], ["job-a", "job-early"]]
+
+
+def test_job_history_company_filter_matches_wildcards_literally(backend):
+    """% and _ in the company filter are plain characters of the prefix."""
+    async def run():
+        await _save("job-percent", company="100% Bio GmbH")
+        await _save("job-digits", company="1000 Bio GmbH")
+        await _save("job-underscore", company="A_B Consulting")
+        await _save("job-letter", company="AxB Consulting")
+        found = {}
+        for company in ("100%", "a_b", "100"):
+            _, _, body = await _get("/api/jobs", f"company={company.replace('%', '%25')}")
+            found[company] = sorted(job["job_id"] for job in json.loads(body)["jobs"])
+        return found
+
+    assert asyncio.run(run()) == {
+        "100%": ["job-percent"],
+        "a_b": ["job-underscore"],
+        "100": ["job-digits", "job-percent"],
+    }
+
+
+def test_job_stats_follow_insert_update_and_expiry(backend):
+    """Stats count a job when it starts, take its result when it finishes and keep it after expiry."""
+    async def totals():
+        status, _, body = await _get("/api/jobs/stats", "date_from=2026-03-02&date_to=2026-03-02")
+        assert status == 200
+        return json.loads(body)["totals"]
+
+    async def run():
+        await _save("job-1", status="running", progress=0)
+        await _save("job-2", status="running", progress=0)
+        started = await totals()
+        await _save(
+            "job-1", input_tokens=1000, output_tokens=500, cost_usd=0.0105, duration_sec=30.0,
+            output_dir="/tmp/out", version=2,
+        )
+        await _save("job-2", status="failed", input_tokens=200, output_tokens=0, cost_usd=0.0006)
+        finished = await totals()
+        await db.mark_job_expired("job-1")
+        return started, finished, await totals()
+
+    started, finished, expired = asyncio.run(run())
+    assert started == {
+        "jobs": 2, "completed": 0, "failed": 0, "input_tokens": 0, "output_tokens": 0,
+        "cost_usd": 0.0, "avg_duration_sec": 0.0,
+    }
+    assert finished == {
+        "jobs": 2, "completed": 1, "failed": 1, "input_tokens": 1200, "output_tokens": 500,
+        "cost_usd": 0.0111, "avg_duration_sec": 30.0,
+    }
+    assert expired == finished
+
+
+def test_job_status_revalidates_with_etag(backend):
+    """A matching If-None-Match gets 304 without a body; a stale one gets the status."""
+    async def run():
+        job = await _generate(company="Testfirma", page_set="small")
+        first = await _get(f"/api/jobs/{job.job_id}")
+        etag = first[1]["etag"]
+        return (
+            first, etag,
+            await _get(f"/api/jobs/{job.job_id}", headers={"If-None-Match": etag}),
+            await _get(f"/api/jobs/{job.job_id}", headers={"If-None-Match": f'W/"0-pending", {etag}'}),
+            await _get(f"/api/jobs/{job.job_id}", headers={"If-None-Match": 'W/"0-pending"'}),
+        )
+
+    (status, headers, body), etag, not_modified, listed, stale = asyncio.run(run())
+    assert status == 200
+    assert etag == f'W/"{json.loads(body)["version"]}-completed"'
+    assert headers["cache-control"] == "no-cache"
+    assert not_modified[0] == 304 and not_modified[2] == b""
+    assert not_modified[1]["etag"] == etag
+    assert listed[0] == 304
+    assert stale[0] == 200 and json.loads(stale[2])["status"] == "completed"
+
+
+def test_job_status_long_poll_returns_on_change_or_after_wait(backend, monkeypatch):
+    """since + wait holds the request until the version moves on, at most wait seconds."""
+    monkeypatch.setenv("FAKE_EVENTS", json.dumps([PAGE_DONE]))
+    monkeypatch.setenv("FAKE_SLEEP", "30")
+
+    async def run():
+        job_id = await _start_running(company="Testfirma", page_set="small")
+        version = backend_app.jobs[job_id]["status"].version
+        loop = asyncio.get_running_loop()
+
+        started = loop.time()
+        _, _, body = await _get(f"/api/jobs/{job_id}", f"since={version}&wait=0.3")
+        timed_out = (loop.time() - started, json.loads(body)["version"])
+
+        poll = asyncio.create_task(_get(f"/api/jobs/{job_id}", f"since={version}&wait=30"))
+        await asyncio.sleep(0.2)
+        assert not poll.done()
+        started = loop.time()
+        backend_app._changed(job_id)
+        _, _, body = await poll
+        changed = (loop.time() - started, json.loads(body)["version"])
+
+        # An outdated since answers at once
+        started = loop.time()
+        await _get(f"/api/jobs/{job_id}", f"since={version}&wait=30")
+        outdated = loop.time() - started
+
+        too_long = await _get(f"/api/jobs/{job_id}", "since=0&wait=61")
+        await backend_app.cancel_job(job_id)
+        return version, timed_out, changed, outdated, too_long[0]
+
+    version, (waited, unchanged), (woken_after, new_version), outdated, too_long = asyncio.run(run())
+    assert 0.3 <= waited < 5 and unchanged == version
+    assert woken_after < 5 and new_version == version + 1
+    assert outdated < 5
+    assert too_long == 422
+
+
+def test_stored_job_status_cache_evicts_least_recently_used(backend, monkeypatch):
+    """Finished jobs read from the database stay cached up to JOB_CACHE_SIZE entries."""
+    monkeypatch.setattr(backend_app, "JOB_CACHE_SIZE", 2)
+
+    async def run():
+        for job_id in ("job-1", "job-2", "job-3"):
+            await _save(job_id)
+        await _save("job-running", status="running", progress=10)
+        for job_id in ("job-1", "job-2", "job-1", "job-3", "job-running"):
+            status, _, _ = await _get(f"/api/jobs/{job_id}")
+            assert status == 200
+        return list(backend_app.job_cache), (await _get("/api/jobs/job-unknown"))[0]
+
+    cached, unknown = asyncio.run(run())
+    assert cached == ["job-1", "job-3"]
+    assert unknown == 404
@@ -0,0 +1,109 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from t3_content_library.cache import PageCache, page_cache_key
+
+
+STRUCTURE = {
+    "page": {"title": "AGB", "slug": "agb", "parent": "/", "nav_position": 18},
+    "content_elements": [{"type": "header", "prompt": "AGB von {company}"}],
+}
+
+
+def test_page_cache_key_normalizes_company():
+    a = page_cache_key(STRUCTURE, "Firma  X", "model", "markers")
+    b = page_cache_key(STRUCTURE, "firma x", "model", "markers")
+    c = page_cache_key(STRUCTURE, "firma x", "model", "tool")
+    assert a == b
+    assert a != c
+
+
+def test_page_cache_key_depends_on_styles():
+    plain = page_cache_key(STRUCTURE, "Firma X", "model", "markers")
+    warm = page_cache_key(STRUCTURE, "Firma X", "model", "markers", {"warm": {"prompt": "herzlich"}})
+    edited = page_cache_key(STRUCTURE, "Firma X", "model", "markers", {"warm": {"prompt": "sehr herzlich"}})
+    assert plain == page_cache_key(STRUCTURE, "Firma X", "model", "markers", None)
+    assert len({plain, warm, edited}) == 3
+
+
+def test_get_or_create_is_single_flight(tmp_path):
+    cache = PageCache(str(tmp_path), poll_interval=0.01)
+    calls = []
+    results = []
+
+    def create():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"content_elements": [], "usage": {"input_tokens": 1, "output_tokens": 2}}
+
+    def worker():
+        results.append(cache.get_or_create("key", create))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert sorted(created for _, created in results) == [False, False, False, False, True]
+    assert not os.path.exists(tmp_path / "key.lock")
+
+
+def test_failed_create_releases_lock(tmp_path):
+    cache = PageCache(str(tmp_path))
+
+    def fail():
+        raise RuntimeError("API down")
+
+    try:
+        cache.get_or_create("key", fail)
+    except RuntimeError:
+        pass
+    value, created = cache.get_or_create("key", lambda: {"ok": True})
+    assert value == {"ok": True}
+    assert created
+
+
+def test_stale_lock_is_taken_over(tmp_path):
+    cache = PageCache(str(tmp_path), lock_timeout=0.05, poll_interval=0.01)
+    (tmp_path / "key.lock").write_text("12345")
+    value, created = cache.get_or_create("key", lambda: {"ok": True})
+    assert created
+
+
+def test_lock_of_dead_process_is_taken_over_at_once(tmp_path):
+    """A run killed while generating leaves its lock; waiters don't sit out lock_timeout."""
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    cache = PageCache(str(tmp_path), lock_timeout=600, poll_interval=0.01)
+    (tmp_path / "key.lock").write_text(str(dead.pid))
+
+    started = time.time()
+    value, created = cache.get_or_create("key", lambda: {"ok": True})
+
+    assert created
+    assert time.time() - started < 5
+    assert not os.path.exists(tmp_path / "key.lock")
+
+
+def test_lock_of_running_process_is_waited_for(tmp_path):
+    cache = PageCache(str(tmp_path), lock_timeout=0.2, poll_interval=0.01)
+    (tmp_path / "key.lock").write_text(str(os.getpid()))
+
+    started = time.time()
+    cache.get_or_create("key", lambda: {"ok": True})
+
+    assert time.time() - started >= 0.2
+
+
+def test_get_or_create_refresh_replaces_stored_value(tmp_path):
+    cache = PageCache(str(tmp_path))
+    cache.put("key", {"version": 1})
+
+    assert cache.get_or_create("key", lambda: {"version": 2}) == ({"version": 1}, False)
+    assert cache.get_or_create("key", lambda: {"version": 2}, refresh=True) == ({"version": 2}, True)
+    assert cache.get("key") == {"version": 2}
@@ -1,3 +1,4 @@
+import json
 import os
 from unittest.mock import patch, MagicMock
 from click.testing import CliRunner
@@ -51,3 +52,588 @@ def test_cli_shows_progress():
         )
 
         assert "[1/" in result.output
+
+
+def test_cli_regenerate_replaces_only_selected_element(tmp_path):
+    """--regenerate splices new content into the existing page on disk."""
+    with patch("t3_content_library.cli.generate_content_for_page") as mock_gen:
+        mock_gen.return_value = (
+            [
+                {"type": "header", "content": "# Alt 1"},
+                {"type": "textmedia", "content": "Alt 2", "image": "placeholder://about-hero.jpg", "image_position": "right"},
+                {"type": "text", "subtype": "bullets", "content": "Alt 3"},
+                {"type": "quote", "content": "Alt 4"},
+            ],
+            MOCK_USAGE,
+            MOCK_IMAGE_KEYWORDS,
+        )
+        runner = CliRunner()
+        result = runner.invoke(main, ["--company", "Testfirma", "--output-dir", str(tmp_path), "--set", "small"])
+        assert result.exit_code == 0
+
+    with patch("t3_content_library.cli.anthropic"), \
+         patch("t3_content_library.cli.regenerate_elements") as mock_regen:
+        mock_regen.return_value = ({3: {"type": "text", "subtype": "bullets", "content": "Neu 3"}}, MOCK_USAGE)
+        result = runner.invoke(
+            main,
+            ["--company", "Testfirma", "--output-dir", str(tmp_path), "--regenerate", "ueber-uns:3"],
+        )
+        assert result.exit_code == 0, result.output
+        assert mock_regen.call_args.args[2] == [3]
+
+    content = (tmp_path / "testfirma" / "ueber-uns.md").read_text(encoding="utf-8")
+    assert "Neu 3" in content
+    assert "Alt 3" not in content
+    assert "# Alt 1" in content
+    assert "Alt 4" in content
+    assert "business office modern" in content
+
+
+def test_cli_regenerate_reports_unparseable_page(tmp_path):
+    """A page whose frontmatter is not valid YAML is reported, not a traceback."""
+    page_dir = tmp_path / "testfirma"
+    page_dir.mkdir()
+    (page_dir / "ueber-uns.md").write_text(
+        '---\ntitle: "Über uns"\nseo:\n  title: "Über uns - Gasthaus "Zur Post""\n---\n\n<!-- CE: header -->\n# Alt\n',
+        encoding="utf-8",
+    )
+
+    with patch("t3_content_library.cli.anthropic"), \
+         patch("t3_content_library.cli.regenerate_elements") as mock_regen:
+        result = CliRunner().invoke(
+            main, ["--company", "Testfirma", "--output-dir", str(tmp_path), "--regenerate", "ueber-uns:1"]
+        )
+
+    assert result.exit_code == 1
+    assert "kann nicht neu generiert werden" in result.output
+    assert not mock_regen.called
+
+
+def test_cli_regenerate_unknown_page(tmp_path):
+    runner = CliRunner()
+    result = runner.invoke(
+        main,
+        ["--company", "Testfirma", "--output-dir", str(tmp_path), "--regenerate", "gibt-es-nicht:1"],
+    )
+    assert result.exit_code != 0
+    assert "Unknown page" in result.output
+
+
+def test_cli_cache_dir_reuses_pages(tmp_path):
+    """A second identical run is served from the page cache without API calls."""
+    cache_dir = tmp_path / "cache"
+    with patch("t3_content_library.cli.generate_content_for_page") as mock_gen:
+        mock_gen.return_value = (
+            [{"type": "header", "content": "# Test"}],
+            MOCK_USAGE,
+            MOCK_IMAGE_KEYWORDS,
+        )
+        runner = CliRunner()
+        args = ["--company", "Testfirma", "--set", "small", "--cache-dir", str(cache_dir), "--jsonl"]
+        first = runner.invoke(main, args + ["--output-dir", str(tmp_path / "a")])
+        assert first.exit_code == 0
+        assert mock_gen.call_count == 8
+
+        second = runner.invoke(main, args + ["--output-dir", str(tmp_path / "b")])
+        assert second.exit_code == 0
+        assert mock_gen.call_count == 8
+        complete = json.loads(second.output.splitlines()[-1])
+        assert complete["cached_pages"] == 8
+        assert complete["total_input_tokens"] == 0
+        assert len(list((tmp_path / "b").rglob("*.md"))) == 8
+
+
+def test_cli_refresh_cache_regenerates_and_replaces_cached_pages(tmp_path):
+    """--refresh-cache calls the API for every page and later runs get the new pages."""
+    cache_dir = tmp_path / "cache"
+    args = ["--company", "Testfirma", "--set", "small", "--cache-dir", str(cache_dir), "--jsonl"]
+    runner = CliRunner()
+    with patch("t3_content_library.cli.generate_content_for_page") as mock_gen:
+        mock_gen.return_value = ([{"type": "header", "content": "# Alt"}], MOCK_USAGE, MOCK_IMAGE_KEYWORDS)
+        assert runner.invoke(main, args + ["--output-dir", str(tmp_path / "a")]).exit_code == 0
+
+        mock_gen.return_value = ([{"type": "header", "content": "# Neu"}], MOCK_USAGE, MOCK_IMAGE_KEYWORDS)
+        fresh = runner.invoke(main, args + ["--output-dir", str(tmp_path / "b"), "--refresh-cache"])
+        assert fresh.exit_code == 0, fresh.output
+        assert mock_gen.call_count == 16
+        assert json.loads(fresh.output.splitlines()[-1])["cached_pages"] == 0
+
+        again = runner.invoke(main, args + ["--output-dir", str(tmp_path / "c")])
+        assert again.exit_code == 0
+        assert mock_gen.call_count == 16
+
+    assert "# Neu" in (tmp_path / "c" / "testfirma" / "index.md").read_text(encoding="utf-8")
+
+
+def test_cli_refresh_cache_needs_cache_dir(tmp_path):
+    result = CliRunner().invoke(
+        main, ["--company", "Testfirma", "--output-dir", str(tmp_path), "--refresh-cache"]
+    )
+    assert result.exit_code != 0
+    assert "--refresh-cache benötigt --cache-dir" in result.output
+
+
+def test_cli_reuse_similar_takes_company_agnostic_pages_from_cache(tmp_path):
+    """--reuse-similar copies AGB/Datenschutz of a near-duplicate company and reports saved tokens."""
+    cache_dir = str(tmp_path / "cache")
+    with patch("t3_content_library.cli.generate_content_for_page") as mock_gen:
+        mock_gen.return_value = (
+            [{"type": "header", "content": "# Test"}],
+            MOCK_USAGE,
+            MOCK_IMAGE_KEYWORDS,
+        )
+        runner = CliRunner()
+        args = [
+            "--set", "small", "--cache-dir", cache_dir, "--jsonl", "--output-dir", str(tmp_path), "--reuse-similar",
+        ]
+        first = runner.invoke(main, args + ["--company", "Italienisches Restaurant in München"])
+        assert first.exit_code == 0
+        assert mock_gen.call_count == 8
+
+        second = runner.invoke(main, args + ["--company", "Italienisches Restaurant La Bella in München"])
+        assert second.exit_code == 0
+
+    # Datenschutz and AGB are company-agnostic, the other 6 pages are generated again
+    assert mock_gen.call_count == 14
+    events = [json.loads(line) for line in second.output.splitlines()]
+    reused = {e["title"] for e in events if e["event"] == "page_done" and e["reused_from"]}
+    assert reused == {"Datenschutz", "AGB"}
+    complete = events[-1]
+    assert complete["reused_pages"] == 2
+    assert complete["saved_input_tokens"] == 2 * MOCK_USAGE["input_tokens"]
+    assert complete["saved_output_tokens"] == 2 * MOCK_USAGE["output_tokens"]
+    assert complete["total_input_tokens"] == 6 * MOCK_USAGE["input_tokens"]
+
+
+def _follow_prompts(structure, company, client=None, response_mode="markers", context=None):
+    """Like the model: every element is its prompt with the company filled in."""
+    elements = [
+        {"type": ce["type"], "content": ce["prompt"].replace("{company}", company)}
+        for ce in structure["content_elements"]
+    ]
+    return elements, MOCK_USAGE, MOCK_IMAGE_KEYWORDS
+
+
+def _pages(output_dir) -> dict[str, str]:
+    """Every file below output_dir by name, with its content."""
+    pages = {}
+    for root, _, files in os.walk(output_dir):
+        for name in files:
+            with open(os.path.join(root, name), "r", encoding="utf-8") as f:
+                pages[name] = f.read()
+    return pages
+
+
+def test_cli_reused_pages_do_not_name_the_earlier_company(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    earlier = "Italienisches Restaurant in München"
+    with patch("t3_content_library.cli.generate_content_for_page", side_effect=_follow_prompts):
+        runner = CliRunner()
+        args = ["--set", "small", "--cache-dir", cache_dir, "--jsonl"]
+        first = runner.invoke(
+            main, args + ["--company", earlier, "--reuse-similar", "--output-dir", str(tmp_path / "first")]
+        )
+        assert first.exit_code == 0
+        second = runner.invoke(
+            main,
+            args + ["--company", "Italienisches Restaurant La Bella in München", "--reuse-similar",
+                    "--output-dir", str(tmp_path / "second")],
+        )
+        assert second.exit_code == 0
+        # Without --reuse-similar the pages are written for the company itself
+        own = runner.invoke(main, args + ["--company", "Pizzeria Luigi", "--output-dir", str(tmp_path / "own")])
+        assert own.exit_code == 0
+
+    events = [json.loads(line) for line in second.output.splitlines()]
+    assert events[-1]["reused_pages"] == 2
+    pages = _pages(tmp_path / "second")
+    assert "agb.md" in pages
+    for name, content in pages.items():
+        assert earlier not in content, name
+    agb = _pages(tmp_path / "own")["agb.md"]
+    assert "Allgemeine Geschäftsbedingungen (AGB) für Pizzeria Luigi" in agb
+
+
+def test_cli_reuse_similar_requires_cache_dir(tmp_path):
+    runner = CliRunner()
+    result = runner.invoke(
+        main, ["--company", "Testfirma", "--output-dir", str(tmp_path), "--reuse-similar"]
+    )
+    assert result.exit_code != 0
+    assert "--cache-dir" in result.output
+
+
+def _fake_translate(page, content_elements, language, client=None, numbers=None):
+    translated = [
+        dict(ce, content=f"[{language}] {ce['content']}") if numbers is None or n in numbers else ce
+        for n, ce in enumerate(content_elements, 1)
+    ]
+    title = page["title"] if numbers else f"[{language}] {page['title']}"
+    return dict(page, title=title), translated, {"input_tokens": 10, "output_tokens": 20}
+
+
+def test_cli_languages_translates_every_page(tmp_path):
+    """--languages de,en,fr writes one directory per language with matching filenames."""
+    with patch("t3_content_library.cli.generate_content_for_page") as mock_gen, \
+         patch("t3_content_library.cli.translate_page", side_effect=_fake_translate) as mock_translate:
+        mock_gen.return_value = (
+            [{"type": "header", "content": "# Test"}],
+            MOCK_USAGE,
+            MOCK_IMAGE_KEYWORDS,
+        )
+        runner = CliRunner()
+        result = runner.invoke(
+            main,
+            ["--company", "Testfirma", "--output-dir", str(tmp_path), "--set", "small",
+             "--languages", "de,en,fr", "--jsonl"],
+        )
+        assert result.exit_code == 0, result.output
+
+    assert mock_gen.call_count == 8
+    assert mock_translate.call_count == 16
+    dest = tmp_path / "testfirma"
+    names = {lang: sorted(p.name for p in (dest / lang).glob("*.md")) for lang in ("de", "en", "fr")}
+    assert len(names["de"]) == 8
+    assert names["de"] == names["en"] == names["fr"]
+    english = (dest / "en" / "kontakt.md").read_text(encoding="utf-8")
+    assert 'title: "[en] Kontakt"' in english
+    assert 'slug: "kontakt"' in english
+    assert 'language: "en"' in english
+    assert "[en] # Test" in english
+
+    events = [json.loads(line) for line in result.output.splitlines()]
+    complete = events[-1]
+    assert complete["total"] == 24
+    assert complete["stages"]["generate"]["pages"] == 8
+    assert complete["stages"]["translate"]["pages"] == 16
+    assert complete["stages"]["translate"]["output_tokens"] == 16 * 20
+    assert complete["total_input_tokens"] == 8 * MOCK_USAGE["input_tokens"] + 16 * 10
+
+
+def test_cli_languages_rejects_unknown_language(tmp_path):
+    runner = CliRunner()
+    result = runner.invoke(
+        main, ["--company", "Testfirma", "--output-dir", str(tmp_path), "--languages", "de,xx"]
+    )
+    assert result.exit_code != 0
+    assert "xx" in result.output
+
+
+def test_cli_regenerate_multilingual_translates_new_elements(tmp_path):
+    def fake_generate(structure, company, **kwargs):
+        elements = [
+            {"type": ce["type"], "content": f"Alt {n}"}
+            for n, ce in enumerate(structure["content_elements"], 1)
+        ]
+        return elements, MOCK_USAGE, MOCK_IMAGE_KEYWORDS
+
+    runner = CliRunner()
+    args = ["--company", "Testfirma", "--output-dir", str(tmp_path)]
+    with patch("t3_content_library.cli.generate_content_for_page", side_effect=fake_generate), \
+         patch("t3_content_library.cli.translate_page", side_effect=_fake_translate):
+        result = runner.invoke(main, args + ["--set", "small", "--languages", "de,en"])
+        assert result.exit_code == 0, result.output
+
+    with patch("t3_content_library.cli.anthropic"), \
+         patch("t3_content_library.cli.regenerate_elements") as mock_regen, \
+         patch("t3_content_library.cli.translate_page", side_effect=_fake_translate) as mock_translate:
+        mock_regen.return_value = ({2: {"type": "text", "content": "Neu 2"}}, MOCK_USAGE)
+        result = runner.invoke(main, args + ["--regenerate", "kontakt:2"])
+        assert result.exit_code == 0, result.output
+
+    assert mock_translate.call_args.kwargs["numbers"] == [2]
+    german = (tmp_path / "testfirma" / "de" / "kontakt.md").read_text(encoding="utf-8")
+    english = (tmp_path / "testfirma" / "en" / "kontakt.md").read_text(encoding="utf-8")
+    assert "Neu 2" in german and "Alt 3" in german
+    assert "[en] Neu 2" in english and "[en] Alt 3" in english
+    assert 'title: "[en] Kontakt"' in english
+
+
+def test_cli_index_db_indexes_written_pages(tmp_path):
+    """--index-db makes every written page searchable, regenerated pages included."""
+    from t3_content_library.search import SearchIndex
+
+    index_db = str(tmp_path / "search.db")
+    with patch("t3_content_library.cli.generate_content_for_page") as mock_gen:
+        mock_gen.return_value = (
+            [{"type": "header", "content": "# Kontakt"}, {"type": "text", "content": "Alt"},
+             {"type": "text", "content": "Alt"}, {"type": "text", "content": "Alt"}],
+            MOCK_USAGE,
+            MOCK_IMAGE_KEYWORDS,
+        )
+        runner = CliRunner()
+        args = ["--company", "Testfirma", "--output-dir", str(tmp_path), "--index-db", index_db]
+        result = runner.invoke(main, args + ["--set", "small"])
+        assert result.exit_code == 0
+
+    with patch("t3_content_library.cli.anthropic"), \
+         patch("t3_content_library.cli.regenerate_elements") as mock_regen:
+        mock_regen.return_value = ({2: {"type": "text", "content": "Neue Öffnungszeiten"}}, MOCK_USAGE)
+        result = runner.invoke(main, args + ["--regenerate", "kontakt:2"])
+        assert result.exit_code == 0
+
+    index = SearchIndex(index_db)
+    assert len(index.search("business office")) == 8
+    hits = index.search("offnungszeiten")
+    assert [(h["source"], h["filename"]) for h in hits] == [("testfirma", "kontakt.md")]
+
+
+def test_cli_bundle_format(tmp_path):
+    """--format bundle writes one JSON record per page and no Markdown files."""
+    with patch("t3_content_library.cli.generate_content_for_page") as mock_gen:
+        mock_gen.return_value = (
+            [{"type": "header", "content": "# Test"}],
+            MOCK_USAGE,
+            MOCK_IMAGE_KEYWORDS,
+        )
+        runner = CliRunner()
+        result = runner.invoke(
+            main,
+            ["--company", "Testfirma", "--output-dir", str(tmp_path), "--set", "small", "--format", "bundle"],
+        )
+        assert result.exit_code == 0
+
+    assert list(tmp_path.rglob("*.md")) == []
+    lines = (tmp_path / "testfirma" / "bundle.jsonl").read_text(encoding="utf-8").splitlines()
+    records = [json.loads(line) for line in lines]
+    assert len(records) == 8
+    assert {r["page"]["slug"] for r in records} >= {"ueber-uns", "kontakt", "impressum"}
+    assert records[0]["content_elements"] == [{"type": "header", "content": "# Test"}]
+    assert records[0]["images"]["search_keywords"] == MOCK_IMAGE_KEYWORDS
+
+
+def test_cli_regenerate_updates_bundle(tmp_path):
+    def fake_generate(structure, company, **kwargs):
+        elements = [
+            {"type": ce["type"], "content": f"Alt {n}"}
+            for n, ce in enumerate(structure["content_elements"], 1)
+        ]
+        return elements, MOCK_USAGE, MOCK_IMAGE_KEYWORDS
+
+    with patch("t3_content_library.cli.generate_content_for_page", side_effect=fake_generate):
+        runner = CliRunner()
+        args = ["--company", "Testfirma", "--output-dir", str(tmp_path)]
+        result = runner.invoke(main, args + ["--set", "small", "--format", "both"])
+        assert result.exit_code == 0
+
+    with patch("t3_content_library.cli.anthropic"), \
+         patch("t3_content_library.cli.regenerate_elements") as mock_regen:
+        mock_regen.return_value = ({2: {"type": "text", "content": "Neu 2"}}, MOCK_USAGE)
+        result = runner.invoke(main, args + ["--regenerate", "kontakt:2"])
+        assert result.exit_code == 0, result.output
+
+    records = {
+        r["page"]["slug"]: r
+        for r in map(json.loads, (tmp_path / "testfirma" / "bundle.jsonl").read_text(encoding="utf-8").splitlines())
+    }
+    assert len(records) == 8
+    assert records["kontakt"]["content_elements"][1]["content"] == "Neu 2"
+    assert records["impressum"]["content_elements"][1]["content"] == "Alt 2"
+    assert "Neu 2" in (tmp_path / "testfirma" / "kontakt.md").read_text(encoding="utf-8")
+
+
+def test_cli_variants_write_one_directory_per_style(tmp_path):
+    """--variants generates every page once and writes each style side by side."""
+    def fake_variants(structure, company, styles, client=None, context=None):
+        variants = {key: [{"type": "text", "content": f"{key} Text"}] for key in styles}
+        return variants, MOCK_USAGE, MOCK_IMAGE_KEYWORDS
+
+    with patch("t3_content_library.cli.generate_variants_for_page", side_effect=fake_variants) as mock_var, \
+         patch("t3_content_library.cli.generate_content_for_page") as mock_gen:
+        runner = CliRunner()
+        result = runner.invoke(
+            main,
+            ["--company", "Testfirma", "--output-dir", str(tmp_path), "--set", "small",
+             "--variants", "warm,elegant", "--jsonl"],
+        )
+        assert result.exit_code == 0, result.output
+
+    assert mock_var.call_count == 8
+    assert mock_gen.call_count == 0
+    dest = tmp_path / "testfirma"
+    assert sorted(p.name for p in (dest / "warm").glob("*.md")) == sorted(p.name for p in (dest / "elegant").glob("*.md"))
+    page = (dest / "elegant" / "kontakt.md").read_text(encoding="utf-8")
+    assert 'style: "elegant"' in page
+    assert "elegant Text" in page
+
+    events = [json.loads(line) for line in result.output.splitlines()]
+    complete = events[-1]
+    assert complete["total"] == 16
+    assert complete["variants"] == ["warm", "elegant"]
+    # The shared call is counted once per page, not once per variant
+    assert complete["total_output_tokens"] == 8 * MOCK_USAGE["output_tokens"]
+
+
+def test_cli_variants_rejects_unknown_style(tmp_path):
+    runner = CliRunner()
+    result = runner.invoke(
+        main, ["--company", "Testfirma", "--output-dir", str(tmp_path), "--variants", "warm,schrill"]
+    )
+    assert result.exit_code != 0
+    assert "schrill" in result.output
+
+
+def test_cli_dependent_pages_get_upstream_summary(tmp_path):
+    """Detail pages are generated after their overview page, with its summary as context."""
+    import time
+
+    def fake_generate(structure, company, client=None, response_mode="markers", context=None):
+        if structure["id"] in ("05-leistungen", "06-leistung-detail-1"):
+            time.sleep(0.1)
+        return [{"type": "header", "content": f"# {structure['page']['title']} Inhalt"}], MOCK_USAGE, []
+
+    with patch("t3_content_library.cli.generate_content_for_page", side_effect=fake_generate) as mock_gen:
+        runner = CliRunner()
+        result = runner.invoke(
+            main,
+            ["--company", "Testfirma", "--output-dir", str(tmp_path), "--set", "small", "--jsonl"],
+        )
+        assert result.exit_code == 0, result.output
+
+    contexts = {call.args[0]["id"]: call.kwargs["context"] for call in mock_gen.call_args_list}
+    assert contexts["01-homepage"] is None
+    assert "Leistungen Inhalt" in contexts["06-leistung-detail-1"]
+
+    complete = json.loads(result.output.splitlines()[-1])
+    assert complete["schedule"]["critical_path"] == ["05-leistungen", "06-leistung-detail-1"]
+    assert complete["schedule"]["critical_path_sec"] >= 0.2
+    assert complete["schedule"]["critical_path_sec"] <= complete["schedule"]["wall_sec"] + 0.1
+
+
+def test_cli_sigterm_cancels_queued_pages(tmp_path):
+    """A cancel signal drops queued pages and reports the partial tokens."""
+    import signal
+    import time
+
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def fake_generate(structure, company, client=None, response_mode="markers", context=None):
+        os.kill(os.getpid(), signal.SIGTERM)
+        time.sleep(0.05)
+        return [{"type": "header", "content": "# Test"}], MOCK_USAGE, []
+
+    with patch("t3_content_library.cli.generate_content_for_page", side_effect=fake_generate) as mock_gen:
+        runner = CliRunner()
+        result = runner.invoke(
+            main,
+            ["--company", "Testfirma", "--output-dir", str(tmp_path), "--set", "small",
+             "--parallel", "1", "--jsonl"],
+        )
+
+    assert result.exit_code == 128 + signal.SIGTERM
+    assert mock_gen.call_count == 1
+    cancelled = json.loads(result.output.splitlines()[-1])
+    assert cancelled["event"] == "cancelled"
+    assert cancelled["done"] <= 1
+    assert cancelled["total"] == 8
+    assert signal.getsignal(signal.SIGTERM) is previous
+
+
+def test_cli_personalize_copies_library_with_company_facts(tmp_path):
+    """--personalize writes the library's pages with name and city swapped in, without generating."""
+    def fake_generate(structure, company, **kwargs):
+        return (
+            [{"type": "text", "content": f"{structure['page']['title']} bei Musterhaus in Musterstadt."}],
+            MOCK_USAGE,
+            MOCK_IMAGE_KEYWORDS,
+        )
+
+    library = tmp_path / "library"
+    with patch("t3_content_library.cli.generate_content_for_page", side_effect=fake_generate):
+        result = CliRunner().invoke(
+            main,
+            ["--company", "Restaurant Musterhaus in Musterstadt", "--output-dir", str(library), "--set", "small"],
+        )
+        assert result.exit_code == 0
+    (library / "library.json").write_text(json.dumps({
+        "company": "Restaurant Musterhaus in Musterstadt",
+        "pages_dir": "restaurant-musterhaus-in-musterstadt",
+        "placeholders": {"name": "Musterhaus", "city": "Musterstadt"},
+        "pages": 8,
+        "input_tokens": 800,
+        "output_tokens": 1600,
+    }))
+
+    out = tmp_path / "out"
+    with patch("t3_content_library.cli.anthropic"), \
+         patch("t3_content_library.cli.extract_company_facts") as mock_facts, \
+         patch("t3_content_library.cli.generate_content_for_page") as mock_gen:
+        mock_facts.return_value = ({"name": "La Bella Vista", "city": "München"}, {"input_tokens": 60, "output_tokens": 12})
+        result = CliRunner().invoke(
+            main,
+            ["--company", "Trattoria La Bella Vista in München", "--output-dir", str(out), "--set", "small",
+             "--personalize", str(library), "--jsonl"],
+        )
+        assert result.exit_code == 0, result.output
+        assert mock_gen.call_count == 0
+
+    events = [json.loads(line) for line in result.output.splitlines()]
+    complete = events[-1]
+    assert complete["event"] == "complete"
+    assert complete["reused_pages"] == 8
+    assert complete["total_input_tokens"] == 60
+    assert complete["saved_output_tokens"] == 1600
+    text = (out / "trattoria-la-bella-vista-in-münchen" / "ueber-uns.md").read_text(encoding="utf-8")
+    assert "bei La Bella Vista in München." in text
+    assert "Musterhaus" not in text
+
+
+def test_cli_personalize_generates_as_usual_without_company_name(tmp_path):
+    """A description whose name cannot be extracted is not personalized with a made-up name."""
+    library = tmp_path / "library"
+    library.mkdir()
+    (library / "library.json").write_text(json.dumps({
+        "company": "Restaurant Musterhaus in Musterstadt",
+        "pages_dir": "restaurant-musterhaus-in-musterstadt",
+        "placeholders": {"name": "Musterhaus", "city": "Musterstadt"},
+    }))
+    # The library's pages are only read, never personalized
+    with patch("t3_content_library.cli.read_output_page", return_value=({"title": "T"}, [], [])), \
+         patch("t3_content_library.cli.anthropic"), \
+         patch("t3_content_library.cli.extract_company_facts") as mock_facts, \
+         patch("t3_content_library.cli.generate_content_for_page") as mock_gen:
+        mock_facts.return_value = ({"city": "Bonn"}, {"input_tokens": 60, "output_tokens": 12})
+        mock_gen.return_value = ([{"type": "header", "content": "# Test"}], MOCK_USAGE, MOCK_IMAGE_KEYWORDS)
+        result = CliRunner().invoke(
+            main,
+            ["--company", "Pizzeria in Bonn", "--output-dir", str(tmp_path / "out"), "--set", "small",
+             "--personalize", str(library), "--jsonl"],
+        )
+
+    assert result.exit_code == 0, result.output
+    events = [json.loads(line) for line in result.output.splitlines()]
+    assert events[0] == {"event": "personalize_skipped", "missing": ["name"]}
+    assert mock_gen.call_count == 8
+    assert events[-1]["event"] == "complete"
+    assert events[-1]["reused_pages"] == 0
+
+
+def test_cli_personalize_requires_library_manifest(tmp_path):
+    result = CliRunner().invoke(
+        main,
+        ["--company", "Testfirma", "--output-dir", str(tmp_path), "--set", "small", "--personalize", str(tmp_path)],
+    )
+    assert result.exit_code != 0
+    assert "library.json" in result.output
+
+
+def test_cli_profile_writes_profile_next_to_output(tmp_path):
+    """--profile writes pstats, collapsed stacks and memory stats and summarizes them in the complete event."""
+    import pstats
+
+    with patch("t3_content_library.cli.generate_content_for_page") as mock_gen:
+        mock_gen.return_value = ([{"type": "header", "content": "# Test"}], MOCK_USAGE, MOCK_IMAGE_KEYWORDS)
+        result = CliRunner().invoke(
+            main,
+            ["--company", "Testfirma", "--output-dir", str(tmp_path), "--set", "small", "--jsonl", "--profile"],
+        )
+        assert result.exit_code == 0, result.output
+
+    complete = json.loads(result.output.splitlines()[-1])
+    profile = complete["profile"]
+    assert profile["dir"] == os.path.join(str(tmp_path), "testfirma", "_profile")
+    assert profile["hot_spots"]
+    assert sorted(os.listdir(profile["dir"])) == ["memory.txt", "profile.pstats", "stacks.txt", "summary.json"]
+    # YAML loading and the worker threads are part of the merged cProfile stats
+    functions = {function for _, _, function in pstats.Stats(os.path.join(profile["dir"], "profile.pstats")).stats}
+    assert {"load_all_structures", "process_page", "render_page"} <= functions
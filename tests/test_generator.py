@@ -1,14 +1,44 @@
 from unittest.mock import patch, MagicMock
-from t3_content_library.generator import generate_content_for_page
+import pytest
+from t3_content_library.generator import (
+    generate_content_for_page,
+    generate_variants_for_page,
+    regenerate_elements,
+    translate_page,
+)
 
 
-def _make_mock_response(text: str, input_tokens: int = 100, output_tokens: int = 200):
+class _FakeStream:
+    """Stands in for the SDK's message stream: the text of response in chunks of 5 characters."""
+
+    def __init__(self, response):
+        self.response = response
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @property
+    def text_stream(self):
+        for block in self.response.content:
+            if block.type == "text":
+                for i in range(0, len(block.text), 5):
+                    yield block.text[i:i + 5]
+
+    def get_final_message(self):
+        return self.response
+
+
+def _make_mock_stream(text: str, input_tokens: int = 100, output_tokens: int = 200):
     mock_response = MagicMock()
     mock_block = MagicMock()
+    mock_block.type = "text"
     mock_block.text = text
     mock_response.content = [mock_block]
     mock_response.usage = MagicMock(input_tokens=input_tokens, output_tokens=output_tokens)
-    return mock_response
+    return _FakeStream(mock_response)
 
 
 def test_generate_content_for_page():
@@ -34,7 +64,7 @@ def test_generate_content_for_page():
     with patch("t3_content_library.generator.anthropic") as mock_anthropic:
         mock_client = MagicMock()
         mock_anthropic.Anthropic.return_value = mock_client
-        mock_client.messages.create.return_value = _make_mock_response(batched_response, 150, 320)
+        mock_client.messages.stream.return_value = _make_mock_stream(batched_response, 150, 320)
 
         result, usage, image_keywords = generate_content_for_page(structure, "La Bella Vista, München")
 
@@ -43,13 +73,31 @@ def test_generate_content_for_page():
         assert "Willkommen" in result[0]["content"]
         assert result[1]["type"] == "text"
         assert "2005" in result[1]["content"]
-        assert mock_client.messages.create.call_count == 1
+        assert mock_client.messages.stream.call_count == 1
         assert usage["input_tokens"] == 150
         assert usage["output_tokens"] == 320
         assert len(image_keywords) == 3
         assert "italian restaurant interior warm lighting" in image_keywords
 
 
+def test_markers_mode_reads_only_text_blocks():
+    """Text arrives in chunks that split markers; a non-text block is skipped."""
+    structure = {
+        "page": {"title": "Test", "slug": "test", "parent": "/", "nav_position": 1},
+        "content_elements": [{"type": "header", "prompt": "Überschrift"}, {"type": "text", "prompt": "Text"}],
+    }
+    stream = _make_mock_stream("===CE:1===\n# Titel\n===CE:2===\nText.\n===IMAGES===\noffice")
+    tool_block = MagicMock(spec=["type", "name", "input"], type="tool_use")
+    stream.response.content.insert(0, tool_block)
+    mock_client = MagicMock()
+    mock_client.messages.stream.return_value = stream
+
+    result, _, image_keywords = generate_content_for_page(structure, "TestFirma", client=mock_client)
+
+    assert [ce["content"] for ce in result] == ["# Titel", "Text."]
+    assert image_keywords == ["office"]
+
+
 def test_content_element_preserves_metadata():
     """Image paths, positions etc. are passed through to results."""
     structure = {
@@ -69,7 +117,7 @@ def test_content_element_preserves_metadata():
     with patch("t3_content_library.generator.anthropic") as mock_anthropic:
         mock_client = MagicMock()
         mock_anthropic.Anthropic.return_value = mock_client
-        mock_client.messages.create.return_value = _make_mock_response(batched_response)
+        mock_client.messages.stream.return_value = _make_mock_stream(batched_response)
 
         result, usage, image_keywords = generate_content_for_page(structure, "TestFirma")
 
@@ -77,3 +125,246 @@ def test_content_element_preserves_metadata():
         assert result[0]["image_position"] == "right"
         assert usage["input_tokens"] == 100
         assert usage["output_tokens"] == 200
+
+
+def test_regenerate_elements_only_sends_selected_prompts():
+    structure = {
+        "page": {"title": "Über uns", "slug": "ueber-uns", "parent": "/", "nav_position": 2},
+        "content_elements": [
+            {"type": "header", "prompt": "Überschrift für {company}"},
+            {"type": "text", "prompt": "Einleitung über {company}"},
+            {"type": "text", "subtype": "bullets", "prompt": "Vorteile von {company}"},
+        ],
+    }
+
+    with patch("t3_content_library.generator.anthropic") as mock_anthropic:
+        mock_client = MagicMock()
+        mock_anthropic.Anthropic.return_value = mock_client
+        mock_client.messages.stream.return_value = _make_mock_stream(
+            "===CE:3===\n- Frisch\n- Regional", 40, 60
+        )
+
+        results, usage = regenerate_elements(structure, "TestFirma", [3])
+
+        prompt = mock_client.messages.stream.call_args.kwargs["messages"][0]["content"]
+        assert "[CE:3] Vorteile von TestFirma" in prompt
+        assert "[CE:1]" not in prompt
+        assert "[CE:2]" not in prompt
+        assert "===IMAGES===" not in prompt
+        assert list(results) == [3]
+        assert results[3] == {"type": "text", "subtype": "bullets", "content": "- Frisch\n- Regional"}
+        assert usage == {"input_tokens": 40, "output_tokens": 60}
+
+
+def test_regenerate_elements_rejects_unknown_element():
+    structure = {
+        "page": {"title": "Test", "slug": "test", "parent": "/", "nav_position": 1},
+        "content_elements": [{"type": "header", "prompt": "Überschrift"}],
+    }
+    with pytest.raises(ValueError, match="Element 2 does not exist"):
+        regenerate_elements(structure, "TestFirma", [2], client=MagicMock())
+
+
+def test_missing_element_is_re_requested_once():
+    structure = {
+        "page": {"title": "Test", "slug": "test", "parent": "/", "nav_position": 1},
+        "content_elements": [
+            {"type": "header", "prompt": "Überschrift"},
+            {"type": "text", "prompt": "Einleitung"},
+            {"type": "quote", "prompt": "Zitat"},
+        ],
+    }
+
+    with patch("t3_content_library.generator.anthropic") as mock_anthropic:
+        mock_client = MagicMock()
+        mock_anthropic.Anthropic.return_value = mock_client
+        mock_client.messages.stream.side_effect = [
+            _make_mock_stream("===CE:1===\n# Titel\n===CE:3===\n> Zitat\n===IMAGES===\noffice", 100, 200),
+            _make_mock_stream("===CE:2===\nNachgeliefert.", 30, 40),
+        ]
+
+        result, usage, image_keywords = generate_content_for_page(structure, "TestFirma")
+
+        assert [ce["content"] for ce in result] == ["# Titel", "Nachgeliefert.", "> Zitat"]
+        assert mock_client.messages.stream.call_count == 2
+        repair_prompt = mock_client.messages.stream.call_args.kwargs["messages"][0]["content"]
+        assert "[CE:2] Einleitung" in repair_prompt
+        assert "[CE:1]" not in repair_prompt
+        assert usage == {"input_tokens": 130, "output_tokens": 240}
+        assert image_keywords == ["office"]
+
+
+def _make_tool_stream(tool_input: dict, input_tokens: int = 100, output_tokens: int = 200):
+    mock_response = MagicMock()
+    mock_block = MagicMock()
+    mock_block.type = "tool_use"
+    mock_block.name = "write_page"
+    mock_block.input = tool_input
+    mock_response.content = [mock_block]
+    mock_response.usage = MagicMock(input_tokens=input_tokens, output_tokens=output_tokens)
+    return _FakeStream(mock_response)
+
+
+def test_generate_content_tool_mode():
+    structure = {
+        "page": {"title": "Über uns", "slug": "ueber-uns", "parent": "/", "nav_position": 2},
+        "content_elements": [
+            {"type": "header", "prompt": "Überschrift für {company}"},
+            {"type": "text", "prompt": "Text über {company}"},
+        ],
+    }
+    tool_input = {
+        "content_elements": [
+            {"number": 1, "type": "header", "content": "# Willkommen"},
+            {"number": 2, "type": "text", "content": "Seit 2005."},
+        ],
+        "image_keywords": ["italian restaurant interior"],
+    }
+
+    with patch("t3_content_library.generator.anthropic") as mock_anthropic:
+        mock_client = MagicMock()
+        mock_anthropic.Anthropic.return_value = mock_client
+        mock_client.messages.stream.return_value = _make_tool_stream(tool_input)
+
+        result, usage, image_keywords = generate_content_for_page(
+            structure, "La Bella Vista", response_mode="tool"
+        )
+
+        kwargs = mock_client.messages.stream.call_args.kwargs
+        assert kwargs["tool_choice"] == {"type": "tool", "name": "write_page"}
+        schema = kwargs["tools"][0]["input_schema"]
+        assert schema["properties"]["content_elements"]["minItems"] == 2
+        assert schema["properties"]["content_elements"]["items"]["properties"]["type"]["enum"] == ["header", "text"]
+        assert [ce["content"] for ce in result] == ["# Willkommen", "Seit 2005."]
+        assert image_keywords == ["italian restaurant interior"]
+        assert mock_client.messages.stream.call_count == 1
+
+
+def test_tool_mode_re_requests_invalid_elements():
+    structure = {
+        "page": {"title": "Test", "slug": "test", "parent": "/", "nav_position": 1},
+        "content_elements": [
+            {"type": "header", "prompt": "Überschrift"},
+            {"type": "quote", "prompt": "Zitat"},
+        ],
+    }
+
+    with patch("t3_content_library.generator.anthropic") as mock_anthropic:
+        mock_client = MagicMock()
+        mock_anthropic.Anthropic.return_value = mock_client
+        mock_client.messages.stream.side_effect = [
+            _make_tool_stream({
+                "content_elements": [
+                    {"number": 1, "type": "header", "content": "# Titel"},
+                    {"number": 2, "type": "text", "content": "falscher Typ"},
+                ],
+                "image_keywords": ["office"],
+            }),
+            _make_tool_stream({"content_elements": [{"number": 2, "type": "quote", "content": "> Zitat"}]}, 20, 30),
+        ]
+
+        result, usage, image_keywords = generate_content_for_page(structure, "TestFirma", response_mode="tool")
+
+        assert [ce["content"] for ce in result] == ["# Titel", "> Zitat"]
+        repair_tool = mock_client.messages.stream.call_args.kwargs["tools"][0]
+        assert "image_keywords" not in repair_tool["input_schema"]["properties"]
+        assert usage == {"input_tokens": 120, "output_tokens": 230}
+
+
+def test_translate_page_sends_only_ce_bodies():
+    page = {"title": "Über uns", "slug": "ueber-uns", "parent": "/", "nav_position": 2}
+    content_elements = [
+        {"type": "header", "content": "# Willkommen"},
+        {"type": "textmedia", "image": "team.jpg", "image_position": "left", "content": "Unser Team."},
+    ]
+    mock_client = MagicMock()
+    mock_client.messages.stream.side_effect = [
+        _make_mock_stream("===CE:0===\nAbout us\n===CE:1===\n# Welcome", 40, 20),
+        _make_mock_stream("===CE:2===\nOur team.", 20, 10),
+    ]
+
+    translated_page, translated, usage = translate_page(page, content_elements, "en", client=mock_client)
+
+    prompt = mock_client.messages.stream.call_args_list[0].kwargs["messages"][0]["content"]
+    assert "Unser Team." in prompt and "team.jpg" not in prompt
+    # The missing element is requested again on its own
+    retry = mock_client.messages.stream.call_args_list[1].kwargs["messages"][0]["content"]
+    assert "===CE:2===" in retry and "Willkommen" not in retry
+    assert translated_page == dict(page, title="About us")
+    assert translated[0] == {"type": "header", "content": "# Welcome"}
+    assert translated[1] == {"type": "textmedia", "image": "team.jpg", "image_position": "left", "content": "Our team."}
+    assert usage == {"input_tokens": 60, "output_tokens": 30}
+
+
+def test_translate_page_selected_elements_keep_title():
+    page = {"title": "Über uns", "slug": "ueber-uns", "parent": "/", "nav_position": 2}
+    content_elements = [{"type": "header", "content": "# Hello"}, {"type": "text", "content": "Neuer Text."}]
+    mock_client = MagicMock()
+    mock_client.messages.stream.return_value = _make_mock_stream("===CE:2===\nNew text.")
+
+    translated_page, translated, _ = translate_page(page, content_elements, "en", client=mock_client, numbers=[2])
+
+    assert translated_page["title"] == "Über uns"
+    assert [ce["content"] for ce in translated] == ["# Hello", "New text."]
+
+
+def test_translate_page_rejects_unknown_language():
+    with pytest.raises(ValueError, match="Unknown language"):
+        translate_page({"title": "T"}, [], "xx", client=MagicMock())
+
+
+STYLES = {
+    "warm": {"name": "Warm & Persönlich", "address": "Du", "prompt": "Schreibe herzlich."},
+    "elegant": {"name": "Elegant", "address": "Sie", "prompt": "Schreibe gehoben."},
+}
+
+
+def test_generate_variants_in_one_call():
+    structure = {
+        "page": {"title": "Über uns", "slug": "ueber-uns", "parent": "/", "nav_position": 2},
+        "content_elements": [
+            {"type": "header", "prompt": "Überschrift für {company}"},
+            {"type": "text", "prompt": "Text über {company}"},
+        ],
+    }
+    response = (
+        "===VARIANT:warm===\n===CE:1===\n# Hallo!\n===CE:2===\nSchön, dass du da bist.\n"
+        "===VARIANT:elegant===\n===CE:1===\n# Willkommen\n===CE:2===\nWir freuen uns auf Sie.\n"
+        "===IMAGES===\ncozy cafe interior"
+    )
+    mock_client = MagicMock()
+    mock_client.messages.stream.return_value = _make_mock_stream(response, 150, 400)
+
+    variants, usage, image_keywords = generate_variants_for_page(
+        structure, "Café Sonne", STYLES, client=mock_client
+    )
+
+    assert mock_client.messages.stream.call_count == 1
+    prompt = mock_client.messages.stream.call_args.kwargs["messages"][0]["content"]
+    assert prompt.count("Text über Café Sonne") == 1
+    assert "===VARIANT:warm=== Warm & Persönlich" in prompt
+    assert variants["warm"][1] == {"type": "text", "content": "Schön, dass du da bist."}
+    assert variants["elegant"][0]["content"] == "# Willkommen"
+    assert usage == {"input_tokens": 150, "output_tokens": 400}
+    assert image_keywords == ["cozy cafe interior"]
+
+
+def test_missing_variant_is_re_requested_with_its_style():
+    structure = {
+        "page": {"title": "Kontakt", "slug": "kontakt", "parent": "/", "nav_position": 9},
+        "content_elements": [{"type": "text", "prompt": "Kontakttext"}],
+    }
+    mock_client = MagicMock()
+    mock_client.messages.stream.side_effect = [
+        _make_mock_stream("===VARIANT:warm===\n===CE:1===\nSchreib uns!", 100, 50),
+        _make_mock_stream("===CE:1===\nWir bitten um Ihre Nachricht.", 30, 20),
+    ]
+
+    variants, usage, _ = generate_variants_for_page(structure, "Café Sonne", STYLES, client=mock_client)
+
+    assert mock_client.messages.stream.call_count == 2
+    repair = mock_client.messages.stream.call_args_list[1].kwargs
+    assert "Schreibe gehoben." in repair["system"]
+    assert variants["elegant"][0]["content"] == "Wir bitten um Ihre Nachricht."
+    assert variants["warm"][0]["content"] == "Schreib uns!"
+    assert usage == {"input_tokens": 130, "output_tokens": 70}
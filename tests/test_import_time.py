@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+
+from t3_content_library.cache import PageCache, page_cache_key
+from t3_content_library.generator import DEFAULT_MODEL, summarize_page
+from t3_content_library.loader import load_all_structures
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+# Cumulative import time budget for the CLI module in microseconds. Without
+# lazy imports the Anthropic SDK alone takes well over a second.
+CLI_IMPORT_BUDGET_US = 400_000
+
+HEAVY_MODULES = ("anthropic", "httpx", "pydantic", "jinja2", "yaml", "dotenv")
+
+
+def _importtime(code: str) -> dict[str, int]:
+    """Run code with -X importtime, return {module: cumulative microseconds}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def test_cli_import_is_lightweight():
+    modules = _importtime("import t3_content_library.cli")
+    assert not [m for m in HEAVY_MODULES if m in modules]
+    assert modules["t3_content_library.cli"] < CLI_IMPORT_BUDGET_US
+
+
+def test_cache_hit_run_does_not_import_anthropic(tmp_path):
+    structure_dir = os.path.join(REPO_ROOT, "config", "structure")
+    cache = PageCache(str(tmp_path / "cache"))
+    content_elements = [{"type": "header", "content": "# Test"}]
+    structures = {s["id"]: s for s in load_all_structures(structure_dir, page_set="small")}
+    for structure in structures.values():
+        # Dependent pages are keyed by the summaries of their dependencies
+        context = "\n\n".join(
+            summarize_page(structures[dep]["page"], content_elements) for dep in structure.get("depends_on", [])
+        ) or None
+        cache.put(
+            page_cache_key(structure, "Testfirma", DEFAULT_MODEL, "markers", context=context),
+            {
+                "content_elements": content_elements,
+                "image_keywords": [],
+                "usage": {"input_tokens": 1, "output_tokens": 1},
+            },
+        )
+
+    code = (
+        "import sys\n"
+        "from t3_content_library.cli import main\n"
+        f"main(['--company', 'Testfirma', '--output-dir', {str(tmp_path / 'out')!r}, '--set', 'small', "
+        f"'--cache-dir', {str(tmp_path / 'cache')!r}, '--jsonl'], standalone_mode=False)\n"
+    )
+    modules = _importtime(code)
+    assert "anthropic" not in modules
+    assert len(list((tmp_path / "out").rglob("*.md"))) == 8
@@ -4,13 +4,19 @@ from click.testing import CliRunner
 from t3_content_library.cli import main
 
 
-def _make_mock_response(text: str):
+def _mock_stream(text: str):
+    """A MagicMock standing in for a message stream whose response is text."""
     mock_response = MagicMock()
     mock_block = MagicMock()
+    mock_block.type = "text"
     mock_block.text = text
     mock_response.content = [mock_block]
     mock_response.usage = MagicMock(input_tokens=100, output_tokens=200)
-    return mock_response
+    stream = MagicMock()
+    stream.__enter__.return_value = stream
+    stream.text_stream = [text]
+    stream.get_final_message.return_value = mock_response
+    return stream
 
 
 def test_full_generation_with_mocked_api(tmp_path):
@@ -20,7 +26,7 @@ def test_full_generation_with_mocked_api(tmp_path):
         mock_client = MagicMock()
         mock_cli_anthropic.Anthropic.return_value = mock_client
         mock_gen_anthropic.Anthropic.return_value = mock_client
-        mock_client.messages.create.return_value = _make_mock_response(
+        mock_client.messages.stream.return_value = _mock_stream(
             "Generierter Beispielinhalt für die Webseite."
         )
 
@@ -50,7 +56,7 @@ def test_output_directory_structure(tmp_path):
         mock_client = MagicMock()
         mock_cli_anthropic.Anthropic.return_value = mock_client
         mock_gen_anthropic.Anthropic.return_value = mock_client
-        mock_client.messages.create.return_value = _make_mock_response("Inhalt.")
+        mock_client.messages.stream.return_value = _mock_stream("Inhalt.")
 
         runner = CliRunner()
         result = runner.invoke(
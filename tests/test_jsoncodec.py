@@ -0,0 +1,21 @@
+import json
+
+import pytest
+
+from t3_content_library import jsoncodec
+
+EVENT = {"event": "page_done", "title": "Über uns", "done": 3, "cached": False, "reused_from": None}
+
+
+def test_dumps_matches_compact_stdlib_json():
+    expected = json.dumps(EVENT, ensure_ascii=False, separators=(",", ":"))
+    assert jsoncodec.dumps(EVENT) == expected
+    assert jsoncodec.dumpb(EVENT) == expected.encode("utf-8")
+
+
+def test_loads_accepts_str_and_bytes_and_rejects_invalid():
+    line = jsoncodec.dumps(EVENT)
+    assert jsoncodec.loads(line) == EVENT
+    assert jsoncodec.loads(line.encode("utf-8")) == EVENT
+    with pytest.raises(ValueError):
+        jsoncodec.loads("Generiere Seite 3 von 20 ...")
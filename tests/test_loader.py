@@ -1,6 +1,8 @@
 import os
 import pytest
-from t3_content_library.loader import load_page_structure, load_all_structures, load_page_sets
+from t3_content_library.loader import (
+    load_all_structures, load_page_sets, load_page_structure, load_styles, reusable_structure,
+)
 
 
 def test_load_page_structure():
@@ -67,3 +69,47 @@ def test_load_all_structures_invalid_set():
     base = os.path.join(os.path.dirname(__file__), "..", "config", "structure")
     with pytest.raises(ValueError, match="Unknown page set"):
         load_all_structures(base, page_set="nonexistent")
+
+
+def test_load_styles_keyed_by_filename():
+    base = os.path.join(os.path.dirname(__file__), "..", "config", "styles")
+    styles = load_styles(base)
+    assert set(styles) == {"professionell", "warm", "modern", "elegant", "bodenstaendig"}
+    assert styles["warm"]["address"] == "Du"
+    assert all(style["prompt"] for style in styles.values())
+
+
+def test_structures_have_ids_and_dependencies():
+    base = os.path.join(os.path.dirname(__file__), "..", "config", "structure")
+    pages = {page["id"]: page for page in load_all_structures(base)}
+    assert "05-leistungen" in pages
+    assert pages["06-leistung-detail-1"]["depends_on"] == ["05-leistungen"]
+    for page in pages.values():
+        assert all(dep in pages for dep in page.get("depends_on", []))
+
+
+def test_company_agnostic_pages_have_reusable_prompts(tmp_path):
+    base = os.path.join(os.path.dirname(__file__), "..", "config", "structure")
+    agnostic = [s for s in load_all_structures(base) if s.get("company_agnostic")]
+    assert {s["id"] for s in agnostic} == {"17-datenschutz", "18-agb", "20-sitemap"}
+    for structure in agnostic:
+        # Regular generation keeps naming the company
+        assert any("{company}" in ce["prompt"] for ce in structure["content_elements"])
+        reusable = reusable_structure(structure)
+        assert not any("{company}" in ce["prompt"] for ce in reusable["content_elements"])
+
+    (tmp_path / "01-agb.yaml").write_text(
+        "page: {title: AGB, slug: agb}\n"
+        "company_agnostic: true\n"
+        "content_elements:\n"
+        "  - {type: header, prompt: 'AGB von {company}', reusable_prompt: 'AGB'}\n"
+        "  - {type: text, prompt: 'AGB-Text für {company}'}\n",
+        encoding="utf-8",
+    )
+    with pytest.raises(ValueError, match="01-agb.yaml"):
+        load_all_structures(str(tmp_path))
+
+
+def test_reusable_structure_leaves_other_pages_alone():
+    structure = {"page": {"title": "Über uns"}, "content_elements": [{"type": "text", "prompt": "Über {company}"}]}
+    assert reusable_structure(structure) is structure
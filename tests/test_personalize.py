@@ -0,0 +1,107 @@
+import os
+from unittest.mock import MagicMock
+
+import yaml
+
+from t3_content_library.personalize import (
+    extract_company_facts,
+    match_archetype,
+    personalize_page,
+    personalize_text,
+)
+
+ARCHETYPES = {
+    "restaurant": {"company": "Restaurant Musterhaus in Musterstadt", "keywords": ["restaurant", "pizzeria"]},
+    "kanzlei": {
+        "company": "Kanzlei Musterhaus in Musterstadt", "keywords": ["anwalt"], "suffixes": ["anwaltskanzlei"],
+    },
+}
+
+
+def _mock_client(text: str):
+    block = MagicMock()
+    block.type = "text"
+    block.text = text
+    response = MagicMock()
+    response.content = [block]
+    response.usage = MagicMock(input_tokens=60, output_tokens=12)
+    client = MagicMock()
+    client.messages.create.return_value = response
+    return client
+
+
+def test_match_archetype_matches_whole_words_and_suffixes():
+    assert match_archetype("Rechtsanwaltskanzlei Dr. Weber, Köln", ARCHETYPES) == "kanzlei"
+    assert match_archetype("Anwalt Schulz", ARCHETYPES) == "kanzlei"
+    assert match_archetype("PIZZERIA Da Mario in Bonn", ARCHETYPES) == "restaurant"
+    assert match_archetype("Zahnarztpraxis Lächeln", ARCHETYPES) is None
+
+
+def test_match_archetype_ignores_keywords_inside_other_words():
+    assert match_archetype("Steuerberatungskanzlei Weber", ARCHETYPES) is None
+    assert match_archetype("Restaurantbedarf Großhandel", ARCHETYPES) is None
+    assert match_archetype("Anwaltsbedarf Online", ARCHETYPES) is None
+
+
+def test_configured_archetypes_do_not_catch_other_industries():
+    config = os.path.join(os.path.dirname(__file__), "..", "config", "warm_pool.yaml")
+    with open(config, "r", encoding="utf-8") as f:
+        archetypes = yaml.safe_load(f)["archetypes"]
+    for company in (
+        "Reiseagentur Sonne", "Versicherungsagentur Meier", "Arbeitsagentur Köln", "Eventmarketing GmbH",
+        "Steuerberatungskanzlei Weber", "Restaurantbedarf Großhandel", "Sanitärbedarf Online-Shop",
+    ):
+        assert match_archetype(company, archetypes) is None, company
+    assert match_archetype("Italienisches Restaurant La Bella Vista", archetypes) == "restaurant"
+    assert match_archetype("Webagentur Pixel in Berlin", archetypes) == "agentur"
+
+
+def test_personalize_page_replaces_placeholders():
+    page = {"title": "Über Musterhaus", "slug": "ueber-uns"}
+    ces = [{"type": "text", "content": "Das Musterhaus in Musterstadt."}]
+    replacements = {"Musterhaus": "La Bella Vista", "Musterstadt": "München"}
+
+    new_page, new_ces = personalize_page(page, ces, replacements)
+
+    assert new_page == {"title": "Über La Bella Vista", "slug": "ueber-uns"}
+    assert new_ces == [{"type": "text", "content": "Das La Bella Vista in München."}]
+    assert ces[0]["content"] == "Das Musterhaus in Musterstadt."
+
+
+def test_personalize_text_prefers_longer_placeholders():
+    replacements = {"Muster": "X", "Musterstadt": "Köln"}
+    assert personalize_text("Muster aus Musterstadt", replacements) == "X aus Köln"
+
+
+def test_personalize_text_drops_case_endings_and_hyphenates_compounds():
+    replacements = {"Musterhaus": "La Bella Vista", "Musterstadt": "München"}
+    text = "Die Küche des Musterhauses lockt zum Musterstadtbesuch, das Musterhaus-Team freut sich."
+    assert personalize_text(text, replacements) == (
+        "Die Küche des La Bella Vista lockt zum München-Besuch, das La Bella Vista-Team freut sich."
+    )
+
+
+def test_extract_company_facts_parses_lines():
+    client = _mock_client("name: La Bella Vista\ncity: München\n")
+
+    facts, usage = extract_company_facts("Italienisches Restaurant La Bella Vista in München", client=client)
+
+    assert facts == {"name": "La Bella Vista", "city": "München"}
+    assert usage == {"input_tokens": 60, "output_tokens": 12}
+    assert client.messages.create.call_count == 1
+
+
+def test_extract_company_facts_falls_back_for_missing_facts():
+    client = _mock_client("name: Bäckerei Korn")
+
+    facts, _ = extract_company_facts("Bäckerei Korn", client=client)
+
+    assert facts == {"name": "Bäckerei Korn", "city": "Ihrer Region"}
+
+
+def test_extract_company_facts_leaves_out_missing_name():
+    client = _mock_client("city: Bonn")
+
+    facts, _ = extract_company_facts("Pizzeria in Bonn", client=client)
+
+    assert facts == {"city": "Bonn"}
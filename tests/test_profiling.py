@@ -0,0 +1,76 @@
+import json
+import os
+import pstats
+from concurrent.futures import ThreadPoolExecutor
+
+from t3_content_library import profiling
+from t3_content_library.profiling import RunProfiler, category
+
+
+def _busy(n):
+    return sum(i * i for i in range(n))
+
+
+def test_category_uses_innermost_known_module():
+    assert category(["t3_content_library.cli:process_page", "anthropic._base_client:request", "ssl:read"]) == "api"
+    assert category(["t3_content_library.cli:write_page", "t3_content_library.renderer:render_page",
+                     "jinja2.environment:render"]) == "jinja"
+    assert category(["t3_content_library.cli:main", "concurrent.futures._base:wait", "threading:wait"]) == "idle"
+    # Worker threads start in threading, that alone does not make them idle
+    assert category(["threading:_bootstrap", "concurrent.futures.thread:_worker",
+                     "t3_content_library.generator:summarize_page"]) == "python"
+
+
+def test_run_profiler_merges_worker_threads(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PER_THREAD_PROFILES", True)
+    profiler = RunProfiler()
+    profiler.start()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(profiler.wrap(_busy), [50_000, 50_000]))
+    summary = profiler.write(str(tmp_path))
+
+    assert summary["threads"] == 3
+    stats = pstats.Stats(str(tmp_path / "profile.pstats")).stats
+    assert [calls for (_, _, function), (_, calls, *_) in stats.items() if function == "_busy"] == [2]
+    assert summary["samples"] > 0
+    assert abs(sum(summary["categories"].values()) - 1) < 0.01
+    assert sorted(os.listdir(tmp_path)) == ["memory.txt", "profile.pstats", "stacks.txt", "summary.json"]
+    stacks = (tmp_path / "stacks.txt").read_text().splitlines()
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks)
+    assert json.loads((tmp_path / "summary.json").read_text()) == summary
+
+
+class _ActiveProfiler(profiling.cProfile.Profile):
+    """A profile that cannot start, as on Python 3.12+ with another profiler active."""
+
+    def enable(self, *args, **kwargs):
+        raise ValueError("Another profiling tool is already active")
+
+
+def test_run_profiler_keeps_sampling_without_cprofile(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PER_THREAD_PROFILES", True)
+    monkeypatch.setattr(profiling.cProfile, "Profile", _ActiveProfiler)
+    profiler = RunProfiler()
+    profiler.start()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert list(executor.map(profiler.wrap(_busy), [50_000, 50_000])) == [_busy(50_000)] * 2
+    summary = profiler.write(str(tmp_path))
+
+    assert summary["cprofile"] is False
+    assert summary["hot_spots"] == []
+    assert summary["samples"] > 0
+    assert sorted(os.listdir(tmp_path)) == ["memory.txt", "profile.pstats", "stacks.txt", "summary.json"]
+
+
+def test_run_profiler_uses_one_profile_from_python_3_12(tmp_path, monkeypatch):
+    """sys.monitoring allows a single profiler, which sees every thread."""
+    monkeypatch.setattr(profiling, "PER_THREAD_PROFILES", False)
+    profiler = RunProfiler()
+    assert profiler.wrap(_busy) is _busy
+    profiler.start()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(profiler.wrap(_busy), [50_000, 50_000]))
+    summary = profiler.write(str(tmp_path))
+
+    assert summary["cprofile"] is True
+    assert summary["threads"] == 1
@@ -1,4 +1,8 @@
-from t3_content_library.renderer import render_page
+import json
+
+import pytest
+
+from t3_content_library.renderer import render_page, render_bundle_record, parse_page
 
 
 def test_render_page_with_frontmatter():
@@ -74,3 +78,69 @@ def test_render_page_without_image_keywords():
 
     assert "images:" not in result
     assert "search_keywords:" not in result
+
+
+def test_parse_page_roundtrip():
+    page_meta = {"title": "Über uns", "slug": "ueber-uns", "parent": "/", "nav_position": 2}
+    content_elements = [
+        {"type": "header", "content": "# Willkommen"},
+        {
+            "type": "textmedia",
+            "content": "Seit 2005 servieren wir Küche.\n\nZweiter Absatz.",
+            "image": "placeholder://team.jpg",
+            "image_position": "right",
+        },
+        {"type": "text", "subtype": "bullets", "content": "- **Qualität**\n- **Service**"},
+    ]
+    keywords = ["business team professional"]
+
+    markdown = render_page(page_meta, content_elements, "TestFirma", image_keywords=keywords)
+    frontmatter, parsed, parsed_keywords = parse_page(markdown)
+
+    assert frontmatter["title"] == "Über uns"
+    assert frontmatter["seo"]["title"] == "Über uns - TestFirma"
+    assert parsed == content_elements
+    assert parsed_keywords == keywords
+    assert render_page(page_meta, parsed, "TestFirma", image_keywords=parsed_keywords) == markdown
+
+
+def test_parse_page_roundtrip_with_quotes_in_title_and_company():
+    page_meta = {"title": 'Speisekarte: "Klassiker"', "slug": "speisekarte", "parent": "/", "nav_position": 3}
+    content_elements = [{"type": "header", "content": "# Speisekarte"}]
+
+    markdown = render_page(page_meta, content_elements, 'Gasthaus "Zur Post"', image_keywords=['bistro "rustic"'])
+    frontmatter, parsed, parsed_keywords = parse_page(markdown)
+
+    assert frontmatter["title"] == 'Speisekarte: "Klassiker"'
+    assert frontmatter["seo"]["title"] == 'Speisekarte: "Klassiker" - Gasthaus "Zur Post"'
+    assert parsed_keywords == ['bistro "rustic"']
+
+
+def test_parse_page_invalid_frontmatter_raises_value_error():
+    markdown = '---\ntitle: "Über uns - Gasthaus "Zur Post""\n---\n\n<!-- CE: header -->\n# Über uns\n'
+
+    with pytest.raises(ValueError, match="Invalid frontmatter"):
+        parse_page(markdown)
+
+
+def test_render_bundle_record():
+    page_meta = {"title": "Über uns", "slug": "ueber-uns", "parent": "/", "nav_position": 2}
+    content_elements = [
+        {"type": "header", "content": "# Über uns"},
+        {"type": "textmedia", "content": "Text", "image": "placeholder://team.jpg", "image_position": "right"},
+    ]
+
+    line = render_bundle_record(page_meta, content_elements, "TestFirma", image_keywords=["office"])
+
+    assert line.endswith("\n")
+    assert line.count("\n") == 1
+    record = json.loads(line)
+    assert record["page"] == {
+        "title": "Über uns",
+        "slug": "ueber-uns",
+        "parent": "/",
+        "nav_position": 2,
+        "seo": {"title": "Über uns - TestFirma"},
+    }
+    assert record["images"] == {"search_keywords": ["office"]}
+    assert record["content_elements"] == content_elements
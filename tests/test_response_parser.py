@@ -0,0 +1,143 @@
+import random
+
+from t3_content_library.response_parser import ResponseParser, VariantParser, parse_response
+
+
+def _response(numbers, keywords=("cozy cafe interior",)):
+    parts = [f"===CE:{n}===\nInhalt {n} mit = Zeichen und ==Markdown==.\n\nZweiter Absatz {n}.\n" for n in numbers]
+    text = "".join(parts)
+    if keywords:
+        text += "===IMAGES===\n" + "\n".join(keywords) + "\n"
+    return text
+
+
+def _feed_in_chunks(text, expected, rng):
+    parser = ResponseParser(expected)
+    pos = 0
+    while pos < len(text):
+        size = rng.randint(1, 12)
+        parser.feed(text[pos:pos + size])
+        pos += size
+    return parser.close()
+
+
+def test_parse_maps_by_marker_number():
+    parser = parse_response(_response([2, 1, 3]), [1, 2, 3])
+    assert parser.elements[1].startswith("Inhalt 1")
+    assert parser.elements[2].startswith("Inhalt 2")
+    assert parser.elements[3].endswith("Zweiter Absatz 3.")
+    assert parser.image_keywords == ["cozy cafe interior"]
+    assert parser.missing == []
+
+
+def test_missing_marker_does_not_shift_following_elements():
+    parser = parse_response(_response([1, 3, 4]), [1, 2, 3, 4])
+    assert parser.missing == [2]
+    assert parser.elements[3].startswith("Inhalt 3")
+    assert parser.elements[4].startswith("Inhalt 4")
+
+
+def test_duplicates_and_unexpected_markers_are_reported():
+    text = "===CE:1===\nerst\n===CE:1===\nnochmal\n===CE:7===\nfremd\n===CE:2===\nzwei"
+    parser = parse_response(text, [1, 2])
+    assert parser.elements == {1: "erst", 2: "zwei"}
+    assert parser.duplicates == [1]
+    assert parser.unexpected == [7]
+
+
+def test_text_before_first_marker_belongs_to_first_element():
+    parser = parse_response("Nur ein Text ohne Marker.", [1, 2])
+    assert parser.elements == {1: "Nur ein Text ohne Marker."}
+    assert parser.missing == [2]
+
+
+def test_inline_marker_without_newlines():
+    parser = parse_response("===CE:1=== Eins ===CE:2=== Zwei ===IMAGES=== a", [1, 2])
+    assert parser.elements == {1: "Eins", 2: "Zwei"}
+    assert parser.image_keywords == ["a"]
+
+
+def test_fuzz_chunking_matches_single_feed():
+    rng = random.Random(1234)
+    for _ in range(200):
+        numbers = list(range(1, rng.randint(1, 8) + 1))
+        shuffled = numbers[:]
+        rng.shuffle(shuffled)
+        text = _response(shuffled)
+        whole = parse_response(text, numbers)
+        chunked = _feed_in_chunks(text, numbers, rng)
+        assert chunked.elements == whole.elements
+        assert chunked.image_keywords == whole.image_keywords
+        assert chunked.missing == whole.missing == []
+
+
+def test_fuzz_dropped_and_duplicated_markers_are_detected():
+    rng = random.Random(99)
+    for _ in range(200):
+        numbers = list(range(1, rng.randint(2, 8) + 1))
+        present = [n for n in numbers if rng.random() > 0.3]
+        if not present or present[0] != 1:
+            present.insert(0, 1)
+        duplicated = rng.sample(present, k=min(len(present), rng.randint(0, 2)))
+        sequence = present + duplicated
+        parser = _feed_in_chunks(_response(sequence), numbers, rng)
+        assert parser.missing == [n for n in numbers if n not in present]
+        assert sorted(parser.duplicates) == sorted(duplicated)
+        for n in present:
+            assert parser.elements[n].startswith(f"Inhalt {n} ")
+
+
+def test_fuzz_random_text_never_raises():
+    rng = random.Random(7)
+    alphabet = ["=", "===", "CE:", "1", "2", "\n", " ", "Text", "===CE:1===", "===IMAGES===", "===CE:"]
+    for _ in range(300):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        parser = _feed_in_chunks(text, [1, 2], rng)
+        assert set(parser.elements) | set(parser.missing) == {1, 2}
+
+
+def _variants_response(keys, numbers):
+    text = "".join(
+        f"===VARIANT:{key}===\n" + "".join(f"===CE:{n}===\n{key} {n} mit = Zeichen.\n" for n in numbers)
+        for key in keys
+    )
+    return text + "===IMAGES===\ncozy cafe interior\n"
+
+
+def test_variant_parser_maps_by_variant_key():
+    parser = VariantParser(["warm", "modern"], [1, 2])
+    parser.feed(_variants_response(["modern", "warm", "elegant"], [1, 2]))
+    parser.close()
+    assert parser.variants["warm"].elements == {1: "warm 1 mit = Zeichen.", 2: "warm 2 mit = Zeichen."}
+    assert parser.variants["modern"].elements[2] == "modern 2 mit = Zeichen."
+    assert parser.image_keywords == ["cozy cafe interior"]
+    assert parser.unexpected == ["elegant"]
+    assert parser.missing == []
+
+
+def test_variant_parser_reports_missing_variant():
+    parser = VariantParser(["warm", "modern"], [1, 2])
+    parser.feed("Vorspann ohne Marker\n===VARIANT:warm===\n===CE:2===\nzwei")
+    parser.close()
+    assert parser.variants["warm"].elements == {1: "Vorspann ohne Marker", 2: "zwei"}
+    assert parser.variants["modern"].missing == [1, 2]
+    assert parser.missing == ["modern"]
+
+
+def test_fuzz_variant_chunking_matches_single_feed():
+    rng = random.Random(7)
+    text = _variants_response(["warm", "modern", "elegant"], [1, 2, 3])
+    whole = VariantParser(["warm", "modern", "elegant"], [1, 2, 3])
+    whole.feed(text)
+    whole.close()
+    for _ in range(50):
+        parser = VariantParser(["warm", "modern", "elegant"], [1, 2, 3])
+        pos = 0
+        while pos < len(text):
+            size = rng.randint(1, 12)
+            parser.feed(text[pos:pos + size])
+            pos += size
+        parser.close()
+        for key in whole.variants:
+            assert parser.variants[key].elements == whole.variants[key].elements
+        assert parser.image_keywords == whole.image_keywords
@@ -0,0 +1,105 @@
+import asyncio
+import zlib
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from backend import responses  # noqa: E402
+from backend.responses import CompressionMiddleware  # noqa: E402
+
+JSON_BODY = b'{"pages": [' + b", ".join(b'{"title": "Startseite"}' for _ in range(100)) + b"]}"
+EVENTS = [b'data: {"type": "status", "progress": %d}\n\n' % progress for progress in (10, 20, 30)]
+
+
+def _app(content_type: str, chunks: list[bytes]):
+    """ASGI app sending chunks as the body of one response."""
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", content_type.encode()),
+            (b"content-length", str(sum(map(len, chunks))).encode()),
+        ]})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return app
+
+
+def _call(app, accept_encoding: str | None = "gzip", min_size: int = 1024) -> tuple[dict, list[bytes]]:
+    """Run app behind the middleware: (response headers, body chunks as sent)."""
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding is not None else []
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": headers}
+    asyncio.run(CompressionMiddleware(app, min_size=min_size)(scope, receive, send))
+    start, *bodies = messages
+    return {k.decode(): v.decode() for k, v in start["headers"]}, [m["body"] for m in bodies]
+
+
+def test_json_is_gzipped_when_accepted(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", None)
+
+    headers, bodies = _call(_app("application/json", [JSON_BODY]), "br, gzip")
+
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(bodies[0]) < len(JSON_BODY)
+    assert zlib.decompress(bodies[0], 31) == JSON_BODY
+
+
+def test_brotli_is_preferred_when_installed():
+    brotli = pytest.importorskip("brotli")
+
+    headers, bodies = _call(_app("application/json", [JSON_BODY]), "gzip, br")
+
+    assert headers["content-encoding"] == "br"
+    assert brotli.decompress(bodies[0]) == JSON_BODY
+
+
+@pytest.mark.parametrize("accept_encoding", [None, "identity", "gzip;q=0"])
+def test_body_is_unchanged_without_accepted_encoding(accept_encoding):
+    headers, bodies = _call(_app("application/json", [JSON_BODY]), accept_encoding)
+
+    assert "content-encoding" not in headers
+    assert b"".join(bodies) == JSON_BODY
+
+
+def test_small_and_binary_bodies_are_not_compressed():
+    small_headers, small = _call(_app("application/json", [b'{"ok": true}']))
+    zip_headers, binary = _call(_app("application/zip", [JSON_BODY]))
+
+    assert "content-encoding" not in small_headers
+    assert small == [b'{"ok": true}']
+    assert small_headers["content-length"] == "12"
+    assert "content-encoding" not in zip_headers
+    assert binary == [JSON_BODY]
+
+
+def test_event_stream_is_flushed_per_event():
+    """Every chunk of an SSE stream decompresses to its event as soon as it arrives."""
+    headers, bodies = _call(_app("text/event-stream", EVENTS), min_size=1_000_000)
+
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    assert len(bodies) == len(EVENTS)
+    decompressor = zlib.decompressobj(31)
+    for body, event in zip(bodies, EVENTS):
+        assert decompressor.decompress(body) == event
+    assert decompressor.eof
+
+
+def test_streamed_body_is_compressed_as_it_streams():
+    """A body sent in chunks is compressed whatever its size, without buffering it."""
+    lines = [b'{"path": "page-%d.md"}\n' % i for i in range(5)]
+
+    headers, bodies = _call(_app("application/x-ndjson", lines))
+
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    assert len(bodies) == len(lines)
+    assert zlib.decompress(b"".join(bodies), 31) == b"".join(lines)
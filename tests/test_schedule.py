@@ -0,0 +1,60 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from t3_content_library.schedule import critical_path, dependency_graph, heights, run_graph
+
+
+def _structures(deps):
+    return [{"id": node, "depends_on": upstream} for node, upstream in deps.items()]
+
+
+def test_dependency_graph_drops_pages_outside_the_set():
+    graph = dependency_graph(_structures({"05": [], "06": ["05"], "10": ["09"]}))
+    assert graph == {"05": [], "06": ["05"], "10": []}
+
+
+def test_dependency_graph_rejects_cycles():
+    with pytest.raises(ValueError, match="a -> b -> a"):
+        dependency_graph(_structures({"a": ["b"], "b": ["a"]}))
+
+
+def test_critical_path_follows_longest_chain():
+    graph = {"05": [], "06": ["05"], "07": ["05"], "15": []}
+    length, path = critical_path(graph, {"05": 3.0, "06": 1.0, "07": 2.0, "15": 4.5})
+    assert length == 5.0
+    assert path == ["05", "07"]
+    assert heights(graph) == {"05": 2, "06": 1, "07": 1, "15": 1}
+
+
+def test_run_graph_runs_dependents_after_their_dependencies():
+    graph = {"05": [], "06": ["05"], "07": ["05"], "15": [], "16": []}
+    started, lock = [], threading.Lock()
+
+    def fn(node, upstream):
+        with lock:
+            started.append(node)
+        time.sleep(0.01)
+        return f"{node}({','.join(upstream.values())})"
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        results = run_graph(executor, graph, fn)
+
+    assert results["06"] == "06(05())"
+    assert results["07"] == "07(05())"
+    # With one worker the page others wait for is started first
+    assert started[0] == "05"
+    assert started.index("06") > started.index("05")
+
+
+def test_run_graph_raises_first_error():
+    def fn(node, upstream):
+        if node == "a":
+            raise RuntimeError("boom")
+        return node
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(RuntimeError, match="boom"):
+            run_graph(executor, {"a": [], "b": ["a"]}, fn)
@@ -0,0 +1,66 @@
+from t3_content_library.search import SearchIndex, match_query
+
+
+PAGE = {"title": "Impressum", "slug": "impressum", "parent": "/", "nav_position": 16}
+ELEMENTS = [
+    {"type": "header", "content": "# Impressum"},
+    {"type": "text", "content": "Trattoria Roma GmbH, Leopoldstraße 1, 80802 München"},
+]
+
+
+def test_match_query_quotes_user_input():
+    assert match_query('impressum "AND* (x') == '"impressum"* "AND"* "x"*'
+    assert match_query("  -- ") == ""
+
+
+def test_search_finds_pages_with_prefix_and_diacritics(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.db"))
+    index.add_page(str(tmp_path / "roma"), "impressum.md", PAGE, ELEMENTS, "Trattoria Roma in München", ["law office"])
+    index.add_page(
+        str(tmp_path / "bau"), "impressum.md", PAGE,
+        [{"type": "text", "content": "Bauunternehmen Huber, Augsburg"}], "Bau Huber",
+    )
+
+    hits = index.search("impressum trattoria munchen")
+    assert [(h["source"], h["slug"]) for h in hits] == [("roma", "impressum")]
+    assert "<mark>" in hits[0]["snippet"]
+    assert hits[0]["ce_types"] == "header text"
+
+    assert {h["source"] for h in index.search("impress")} == {"roma", "bau"}
+    assert index.search("") == []
+
+
+def test_add_page_replaces_and_remove_source(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.db"))
+    out = str(tmp_path / "roma")
+    index.add_page(out, "impressum.md", PAGE, ELEMENTS, "Trattoria Roma")
+    index.add_page(out, "impressum.md", PAGE, [{"type": "text", "content": "Pizzeria Napoli"}], "Trattoria Roma")
+
+    assert index.search("Leopoldstraße") == []
+    assert len(index.search("napoli")) == 1
+
+    index.copy_source(out, str(tmp_path / "copy"))
+    assert {h["source"] for h in index.search("napoli")} == {"roma", "copy"}
+    assert index.remove_source(out) == 1
+    assert {h["source"] for h in index.search("napoli")} == {"copy"}
+
+
+def test_copy_and_remove_cover_subdirectories(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.db"))
+    index.add_page(str(tmp_path / "JOB1" / "roma"), "impressum.md", PAGE, ELEMENTS, "Trattoria Roma")
+    index.add_page(str(tmp_path / "JOB10" / "roma"), "impressum.md", PAGE, ELEMENTS, "Trattoria Roma")
+
+    index.copy_source(str(tmp_path / "JOB1"), str(tmp_path / "JOB2"))
+    assert {h["source"] for h in index.search("trattoria")} == {"JOB1/roma", "JOB10/roma", "JOB2/roma"}
+    assert index.remove_source(str(tmp_path / "JOB1")) == 1
+    assert {h["source"] for h in index.search("trattoria")} == {"JOB10/roma", "JOB2/roma"}
+
+
+def test_copy_over_existing_pages_keeps_fts_in_sync(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.db"))
+    index.add_page(str(tmp_path / "a"), "impressum.md", PAGE, ELEMENTS, "Trattoria Roma")
+    index.add_page(str(tmp_path / "b"), "impressum.md", PAGE, [{"type": "text", "content": "Veraltet"}], "X")
+    index.copy_source(str(tmp_path / "a"), str(tmp_path / "b"))
+
+    assert index.search("veraltet") == []
+    assert {h["source"] for h in index.search("trattoria")} == {"a", "b"}
@@ -0,0 +1,31 @@
+from t3_content_library.similarity import CompanyIndex, jaccard, lsh_bands, minhash, normalize_company
+
+
+def test_normalize_company_ignores_case_punctuation_and_spacing():
+    assert normalize_company("  Bäckerei Schmidt, GmbH!") == normalize_company("bäckerei  schmidt gmbh")
+
+
+def test_jaccard_separates_near_duplicates_from_unrelated():
+    base = "Italienisches Restaurant in München"
+    assert jaccard(base, "Italienisches Restaurant La Bella in München") > 0.7
+    assert jaccard(base, "Zahnarztpraxis Dr. Müller in Berlin") < 0.2
+
+
+def test_similar_signatures_share_a_band():
+    a = lsh_bands(minhash("Italienisches Restaurant in München"))
+    b = lsh_bands(minhash("Italienisches Restaurant La Bella in München"))
+    c = lsh_bands(minhash("Zahnarztpraxis Dr. Müller in Berlin"))
+    assert set(a) & set(b)
+    assert not set(a) & set(c)
+
+
+def test_company_index_find(tmp_path):
+    index = CompanyIndex(str(tmp_path / "companies.db"))
+    index.add("Italienisches Restaurant in München")
+    index.add("Zahnarztpraxis Dr. Müller in Berlin")
+    index.add("Italienisches Restaurant in München")
+
+    matches = index.find("Italienisches Restaurant La Bella in München", threshold=0.7)
+    assert [company for company, _ in matches] == ["Italienisches Restaurant in München"]
+    assert index.find("italienisches restaurant in münchen", threshold=0.7) == []
+    assert index.find("Italienisches Restaurant La Bella in München", threshold=0.9) == []
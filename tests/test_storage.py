@@ -0,0 +1,196 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from backend import db, manage, storage  # noqa: E402
+
+PAGE = "---\ntitle: \"AGB\"\n---\n\n<!-- CE: header -->\n# AGB\n"
+
+
+@pytest.fixture
+def output_base(tmp_path, monkeypatch):
+    """OUTPUT_BASE with the blob store, page cache and database of the tests."""
+    monkeypatch.setattr(storage, "OUTPUT_BASE", str(tmp_path))
+    monkeypatch.setattr(storage, "BLOB_DIR", str(tmp_path / "blobs"))
+    monkeypatch.setattr(storage, "COMPRESSION", "gzip")
+    monkeypatch.setattr(db, "OUTPUT_BASE", str(tmp_path))
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "t3_jobs.db"))
+    monkeypatch.setattr(manage, "OUTPUT_BASE", str(tmp_path))
+    monkeypatch.setattr(manage, "BLOB_DIR", str(tmp_path / "blobs"))
+    monkeypatch.setattr(manage, "PAGE_CACHE_DIR", str(tmp_path / "page-cache"))
+    monkeypatch.setattr(manage, "SEARCH_INDEX_DB", str(tmp_path / "search.db"))
+    return tmp_path
+
+
+def _write_job(output_dir, files: dict):
+    for rel_path, content in files.items():
+        path = output_dir / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def _blobs(output_base) -> list[str]:
+    return sorted(f for _, _, files in os.walk(output_base / "blobs") for f in files)
+
+
+def _age(path, seconds: float):
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+
+
+@pytest.mark.parametrize("compression", ["gzip", "none"])
+def test_ingest_and_materialize_round_trip(output_base, monkeypatch, compression):
+    monkeypatch.setattr(storage, "COMPRESSION", compression)
+    job = output_base / "JOB1"
+    files = {"firma/agb.md": PAGE, "firma/bundle.jsonl": '{"page": {"title": "AGB"}}\n'}
+    _write_job(job, files)
+
+    storage.ingest_job(str(job))
+
+    assert os.listdir(job) == [storage.MANIFEST]
+    assert storage.list_job_files(str(job)) == sorted(files)
+    assert storage.read_job_file(str(job), "firma/agb.md") == PAGE.encode("utf-8")
+    suffix = storage.SUFFIXES[compression]
+    assert all(name.endswith(suffix) for name in _blobs(output_base))
+
+    storage.materialize_job(str(job))
+
+    for rel_path, content in files.items():
+        assert (job / rel_path).read_text(encoding="utf-8") == content
+
+
+def test_identical_pages_are_stored_once(output_base):
+    for job_id in ("JOB1", "JOB2"):
+        _write_job(output_base / job_id, {"firma/agb.md": PAGE, f"firma/{job_id}.md": job_id})
+        storage.ingest_job(str(output_base / job_id))
+
+    # One AGB blob for both jobs, plus one per job-specific page
+    assert len(_blobs(output_base)) == 3
+    assert (
+        storage.load_manifest(str(output_base / "JOB1"))["firma/agb.md"]
+        == storage.load_manifest(str(output_base / "JOB2"))["firma/agb.md"]
+    )
+
+
+def test_reingest_replaces_changed_file(output_base):
+    job = output_base / "JOB1"
+    _write_job(job, {"firma/agb.md": PAGE, "firma/kontakt.md": "Kontakt"})
+    storage.ingest_job(str(job))
+
+    storage.materialize_job(str(job))
+    (job / "firma" / "agb.md").write_text("Neu", encoding="utf-8")
+    storage.ingest_job(str(job))
+
+    assert storage.read_job_file(str(job), "firma/agb.md") == b"Neu"
+    assert storage.read_job_file(str(job), "firma/kontakt.md") == b"Kontakt"
+
+
+def test_copy_job_shares_blobs_of_ingested_and_copies_loose_files(output_base):
+    src, dst = output_base / "JOB1", output_base / "JOB2"
+    _write_job(src, {"firma/agb.md": PAGE})
+    storage.ingest_job(str(src))
+    _write_job(src, {"firma/neu.md": "noch nicht ingestiert"})
+
+    storage.copy_job(str(src), str(dst))
+
+    assert storage.load_manifest(str(dst)) == storage.load_manifest(str(src))
+    assert (dst / "firma" / "neu.md").read_text(encoding="utf-8") == "noch nicht ingestiert"
+    assert storage.read_job_file(str(dst), "firma/agb.md") == PAGE.encode("utf-8")
+    assert len(_blobs(output_base)) == 1
+
+
+def test_sweep_blobs_keeps_referenced_and_recent_blobs(output_base):
+    job = output_base / "JOB1"
+    _write_job(job, {"firma/agb.md": PAGE})
+    storage.ingest_job(str(job))
+    referenced = storage.load_manifest(str(job))["firma/agb.md"]
+    orphan = storage.put_blob(b"verwaist")
+    recent = storage.put_blob(b"gerade erst geschrieben")
+    for entry in (referenced, orphan):
+        _age(storage._blob_path(entry["sha256"], entry["encoding"]), storage.GC_GRACE_SEC + 60)
+
+    assert storage.sweep_blobs(dry_run=True) == (1, os.path.getsize(
+        storage._blob_path(orphan["sha256"], orphan["encoding"])
+    ))
+    assert len(_blobs(output_base)) == 3
+
+    freed, _ = storage.sweep_blobs()
+
+    assert freed == 1
+    assert not os.path.exists(storage._blob_path(orphan["sha256"], orphan["encoding"]))
+    assert os.path.exists(storage._blob_path(referenced["sha256"], referenced["encoding"]))
+    assert os.path.exists(storage._blob_path(recent["sha256"], recent["encoding"]))
+
+
+def _old_job(output_base):
+    """A completed job older than any retention, its output ingested."""
+    from backend.app import JobStatus
+
+    job = output_base / "OLD1"
+    _write_job(job, {"firma/agb.md": PAGE})
+    storage.ingest_job(str(job))
+    status = JobStatus(
+        job_id="OLD1", status="completed", progress=100, output_dir=str(job), created_at="2020-01-01T10:00:00"
+    )
+    asyncio.run(db.init_db())
+    asyncio.run(db.save_job("OLD1", "Testfirma", "small", status))
+    for name in _blobs(output_base):
+        _age(next((output_base / "blobs").rglob(name)), storage.GC_GRACE_SEC + 60)
+    cache_entry = output_base / "page-cache" / "key.json"
+    cache_entry.parent.mkdir()
+    cache_entry.write_text("{}", encoding="utf-8")
+    _age(cache_entry, 200 * 86400)
+    return job, cache_entry
+
+
+def test_gc_dry_run_deletes_nothing(output_base, capsys):
+    job, cache_entry = _old_job(output_base)
+
+    asyncio.run(manage.gc(90, dry_run=True))
+
+    assert "1 expired jobs, 1 page cache entries, 0 blobs" in capsys.readouterr().out
+    assert storage.list_job_files(str(job)) == ["firma/agb.md"]
+    assert cache_entry.exists()
+    assert len(_blobs(output_base)) == 1
+    assert asyncio.run(db.get_job("OLD1"))["status"] == "completed"
+
+
+def test_gc_expires_old_jobs_and_sweeps_their_blobs(output_base, capsys):
+    job, cache_entry = _old_job(output_base)
+
+    asyncio.run(manage.gc(90, dry_run=False))
+
+    assert "1 expired jobs, 1 page cache entries, 1 blobs" in capsys.readouterr().out
+    assert not job.exists()
+    assert not cache_entry.exists()
+    assert _blobs(output_base) == []
+    assert asyncio.run(db.get_job("OLD1"))["status"] == "expired"
+
+
+def test_ingest_skips_jobs_that_are_still_running(output_base, capsys):
+    from backend.app import JobStatus
+
+    asyncio.run(db.init_db())
+    for job_id, status in (("DONE1", "completed"), ("LIVE1", "running"), ("WAIT1", "pending")):
+        _write_job(output_base / job_id, {"firma/agb.md": PAGE})
+        asyncio.run(db.save_job(job_id, "Testfirma", "small", JobStatus(
+            job_id=job_id, status=status, progress=0, output_dir=str(output_base / job_id),
+            created_at="2026-01-01T10:00:00",
+        )))
+    _write_job(output_base / "OLD1", {"firma/agb.md": PAGE})
+
+    asyncio.run(manage.ingest())
+
+    out = capsys.readouterr().out
+    assert "skipped LIVE1: job is running" in out
+    assert "skipped WAIT1: job is pending" in out
+    # Finished jobs and directories without a job row are ingested
+    for job_id in ("DONE1", "OLD1"):
+        assert os.listdir(output_base / job_id) == [storage.MANIFEST]
+    for job_id in ("LIVE1", "WAIT1"):
+        assert (output_base / job_id / "firma" / "agb.md").read_text(encoding="utf-8") == PAGE
+        assert not (output_base / job_id / storage.MANIFEST).exists()
@@ -0,0 +1,183 @@
+import asyncio
+import json
+from datetime import date
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from backend import db, warm_pool  # noqa: E402
+
+# Stands in for generate.py in a library build: creates the output dir,
+# records its arguments, prints the events in WARM_EVENTS and then runs
+# WARM_SLEEP seconds, unless SIGTERM ends it first
+FAKE_CLI = """
+import json, os, sys, time
+here = os.path.dirname(os.path.abspath(__file__))
+with open(os.path.join(here, "argv.jsonl"), "a", encoding="utf-8") as f:
+    f.write(json.dumps(sys.argv[1:]) + "\\n")
+os.makedirs(sys.argv[sys.argv.index("--output-dir") + 1], exist_ok=True)
+for event in json.loads(os.environ.get("WARM_EVENTS", "[]")):
+    print(json.dumps(event), flush=True)
+time.sleep(float(os.environ.get("WARM_SLEEP", "0")))
+"""
+
+CONFIG = {
+    "daily_token_budget": 1000,
+    "page_sets": ["small"],
+    "placeholders": {"name": "Musterhaus", "city": "Musterstadt"},
+    "archetypes": {
+        "restaurant": {
+            "company": "Restaurant Musterhaus in Musterstadt", "keywords": ["restaurant", "pizzeria"],
+        },
+    },
+}
+
+
+def _page_done(tokens: int) -> dict:
+    return {"event": "page_done", "title": "Startseite", "input_tokens": tokens, "output_tokens": 2 * tokens}
+
+
+COMPLETE = {"event": "complete", "total": 8, "total_input_tokens": 20, "total_output_tokens": 40}
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    """The warm pool with its CLI (a fake generate.py), libraries and database in tmp_path."""
+    lib = tmp_path / "lib"
+    lib.mkdir()
+    (lib / "generate.py").write_text(FAKE_CLI, encoding="utf-8")
+    monkeypatch.setattr(warm_pool, "T3_LIB_PATH", str(lib))
+    monkeypatch.setattr(warm_pool, "WARM_POOL_DIR", str(tmp_path / "warm-pool"))
+    monkeypatch.setattr(warm_pool, "PAGE_CACHE_DIR", str(tmp_path / "page-cache"))
+    monkeypatch.setattr(warm_pool, "current", [])
+    monkeypatch.setattr(warm_pool, "readers", {})
+    monkeypatch.setattr(warm_pool, "swapping", set())
+    monkeypatch.setattr(db, "OUTPUT_BASE", str(tmp_path))
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "t3_jobs.db"))
+    monkeypatch.delenv("WARM_EVENTS", raising=False)
+    monkeypatch.delenv("WARM_SLEEP", raising=False)
+    asyncio.run(db.init_db())
+    return lib
+
+
+def _runs(lib) -> int:
+    """Number of library builds started so far."""
+    path = lib / "argv.jsonl"
+    return len(path.read_text(encoding="utf-8").splitlines()) if path.exists() else 0
+
+
+def _tokens_today() -> int:
+    return asyncio.run(db.warm_pool_tokens(date.today().isoformat()))
+
+
+def test_build_library_counts_tokens_and_publishes_library(pool, monkeypatch):
+    monkeypatch.setenv("WARM_EVENTS", json.dumps([_page_done(10), _page_done(10), COMPLETE]))
+
+    result = asyncio.run(warm_pool.build_library(CONFIG, "restaurant", "small", 1000))
+
+    assert result == "completed"
+    assert _tokens_today() == 60
+    manifest = warm_pool.read_manifest(warm_pool.library_dir("restaurant", "small"))
+    assert manifest["placeholders"] == CONFIG["placeholders"]
+    assert (manifest["input_tokens"], manifest["output_tokens"]) == (20, 40)
+    assert warm_pool.find_library(CONFIG, "Pizzeria Da Mario in Bonn", "small") == warm_pool.library_dir(
+        "restaurant", "small"
+    )
+    assert warm_pool.find_library(CONFIG, "Pizzeria Da Mario in Bonn", "full") is None
+    assert warm_pool.current == []
+
+
+def test_rebuild_waits_for_jobs_reading_the_library(pool, monkeypatch):
+    """A rebuilt library replaces the old one only once no job reads it, and is not handed out meanwhile."""
+    monkeypatch.setattr(warm_pool, "READERS_CHECK_SEC", 0.02)
+    monkeypatch.setenv("WARM_EVENTS", json.dumps([COMPLETE]))
+    target = warm_pool.library_dir("restaurant", "small")
+    swapped = []
+    replace_dir = warm_pool._replace_dir
+
+    def record_swap(src, dst):
+        swapped.append(warm_pool.find_library(CONFIG, "Pizzeria Da Mario", "small"))
+        replace_dir(src, dst)
+
+    monkeypatch.setattr(warm_pool, "_replace_dir", record_swap)
+
+    async def run():
+        warm_pool.acquire_library(target)
+        build = asyncio.create_task(warm_pool.build_library(CONFIG, "restaurant", "small", 1000))
+        while _runs(pool) == 0:
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.3)
+        waiting = not build.done() and not swapped
+        warm_pool.release_library(target)
+        return waiting, await asyncio.wait_for(build, 10)
+
+    assert asyncio.run(run()) == (True, "completed")
+    assert swapped == [None]
+    assert warm_pool.readers == {}
+    assert warm_pool.find_library(CONFIG, "Pizzeria Da Mario", "small") == target
+
+
+def test_build_library_stops_once_budget_is_spent(pool, monkeypatch):
+    monkeypatch.setenv("WARM_EVENTS", json.dumps([_page_done(100), _page_done(100), _page_done(100)]))
+    monkeypatch.setenv("WARM_SLEEP", "30")
+
+    result = asyncio.run(warm_pool.build_library(CONFIG, "restaurant", "small", 500))
+
+    assert result == "stopped"
+    # Stopped after the second page; the third was already on its way
+    assert _tokens_today() >= 600
+    assert warm_pool.read_manifest(warm_pool.library_dir("restaurant", "small")) is None
+
+
+@pytest.mark.parametrize("started", [False, True])
+def test_yield_to_jobs_stops_build(pool, monkeypatch, started):
+    """A job arriving while the build process starts up or runs stops it."""
+    monkeypatch.setenv("WARM_EVENTS", json.dumps([_page_done(1)]))
+    monkeypatch.setenv("WARM_SLEEP", "30")
+
+    async def run():
+        build = asyncio.create_task(warm_pool.build_library(CONFIG, "restaurant", "small", 1000))
+        await asyncio.sleep(0)
+        assert warm_pool.current
+        if started:
+            while _runs(pool) == 0:
+                await asyncio.sleep(0.02)
+        warm_pool.yield_to_jobs()
+        return await asyncio.wait_for(build, 10)
+
+    assert asyncio.run(run()) == "stopped"
+    assert warm_pool.read_manifest(warm_pool.library_dir("restaurant", "small")) is None
+
+
+def _run_worker(config: dict, is_idle, seconds: float = 0.5):
+    async def run():
+        worker = asyncio.create_task(warm_pool.run_worker(config, is_idle))
+        await asyncio.sleep(seconds)
+        worker.cancel()
+
+    asyncio.run(run())
+
+
+def test_worker_builds_when_idle_within_budget(pool, monkeypatch):
+    monkeypatch.setattr(warm_pool, "CHECK_SEC", 0.01)
+    monkeypatch.setattr(warm_pool, "IDLE_SEC", 0)
+    monkeypatch.setenv("WARM_EVENTS", json.dumps([_page_done(10), COMPLETE]))
+
+    _run_worker(CONFIG, lambda: True)
+
+    # One build; the library is then fresh and nothing is left to do
+    assert _runs(pool) == 1
+    assert warm_pool.read_manifest(warm_pool.library_dir("restaurant", "small")) is not None
+
+
+def test_worker_waits_while_busy_or_out_of_budget(pool, monkeypatch):
+    monkeypatch.setattr(warm_pool, "CHECK_SEC", 0.01)
+    monkeypatch.setattr(warm_pool, "IDLE_SEC", 0)
+
+    _run_worker(CONFIG, lambda: False, 0.2)
+    assert _runs(pool) == 0
+
+    asyncio.run(db.add_warm_pool_usage(date.today().isoformat(), 400, 600))
+    _run_worker(CONFIG, lambda: True, 0.2)
+    assert _runs(pool) == 0